@@ -1,3 +1,5 @@
+import typing as t
+
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
@@ -98,6 +100,16 @@ class EvaluatedGoal(Goal):
     is_complete: bool
     output: str | None
 
+    # Columns of `EvaluatedGoalModel` that make up an `EvaluatedGoal`, the rest doesn't need to be loaded.
+    MODEL_COLUMNS: t.ClassVar[tuple[str, ...]] = (
+        "goal",
+        "motivation",
+        "completion_criteria",
+        "is_complete",
+        "reasoning",
+        "output",
+    )
+
     def __str__(self) -> str:
         return (
             f"Goal: {self.goal}\n"
@@ -162,10 +174,11 @@ class GoalManager:
         )
 
     def get_latest_evaluated_goals_from_memory(self, limit: int) -> list[EvaluatedGoal]:
-        evaluated_goal_models = self.table_handler.get_latest_evaluated_goals(
-            limit=limit
+        # Plain rows of only the needed columns, without the ORM overhead.
+        rows = self.table_handler.get_latest_evaluated_goals(
+            limit=limit, columns=EvaluatedGoal.MODEL_COLUMNS
         )
-        return [EvaluatedGoal.from_model(model) for model in evaluated_goal_models]
+        return [EvaluatedGoal.model_validate(row._asdict()) for row in rows]
 
     @observe()
     def generate_goal(self, latest_evaluated_goals: list[EvaluatedGoal]) -> Goal:
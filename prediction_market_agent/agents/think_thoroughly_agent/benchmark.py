@@ -135,13 +135,19 @@ def main(
 
     logger.debug(f"Found {len(markets_deduplicated)} markets.")
 
+    think_thoroughly = ThinkThoroughlyBenchmark(
+        agent_name="think-thoroughly",
+        max_workers=max_workers,
+    )
+    # Looks up the nearest markets of all the questions at once, both variants are then served from the shared cache.
+    think_thoroughly.agent.get_correlated_markets_batch(
+        [m.question for m in markets_deduplicated]
+    )
+
     benchmarker = Benchmarker(
         markets=markets_deduplicated,
         agents=[
-            ThinkThoroughlyBenchmark(
-                agent_name="think-thoroughly",
-                max_workers=max_workers,
-            ),
+            think_thoroughly,
             ThinkThoroughlyProphetResearchBenchmark(
                 agent_name="think-thoroughly-prophet-research",
                 max_workers=max_workers,
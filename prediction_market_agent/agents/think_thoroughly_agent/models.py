@@ -1,6 +1,7 @@
 from eth_typing import HexAddress
 from prediction_market_agent_tooling.gtypes import Probability
 from prediction_market_agent_tooling.markets.omen.data_models import OmenMarket
+from prediction_market_agent_tooling.tools.utils import DatetimeUTC
 from pydantic import BaseModel
 
 
@@ -28,3 +29,11 @@ class CorrelatedMarketInput(BaseModel):
             current_p_yes=omen_market.current_p_yes,
             question_title=omen_market.question_title,
         )
+
+
+class FinalDecisionContext(BaseModel):
+    """Inputs of the final decision that don't depend on the scenarios, so they can be prepared while the scenarios run."""
+
+    correlated_markets: list[CorrelatedMarketInput]
+    event_date: DatetimeUTC | None
+    research_report: str | None = None
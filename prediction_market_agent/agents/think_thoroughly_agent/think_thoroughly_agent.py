@@ -1,13 +1,24 @@
+import asyncio
+import contextvars
+import functools
+import math
+import threading
 import typing as t
 from abc import ABC
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import timedelta
 from uuid import UUID, uuid4
 
 from crewai import Agent, Crew, Process, Task
 from crewai.llm import LLM
 from crewai.tools import tool
+from eth_typing import HexAddress
+from loky import ProcessPoolExecutor
 from prediction_market_agent_tooling.deploy.agent import initialize_langfuse
 from prediction_market_agent_tooling.loggers import logger, patch_logger
 from prediction_market_agent_tooling.markets.data_models import ProbabilisticAnswer
+from prediction_market_agent_tooling.markets.omen.data_models import OmenMarket
 from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
     OmenSubgraphHandler,
 )
@@ -16,7 +27,6 @@ from prediction_market_agent_tooling.tools.openai_utils import (
     OpenAIModel,
     get_openai_provider,
 )
-from prediction_market_agent_tooling.tools.parallelism import par_generator, par_map
 from prediction_market_agent_tooling.tools.tavily.tavily_search import tavily_search
 from prediction_market_agent_tooling.tools.utils import (
     LLM_SUPER_LOW_TEMPERATURE,
@@ -36,6 +46,7 @@ from prediction_market_agent.agents.identifiers import (
 from prediction_market_agent.agents.microchain_agent.memory import AnswerWithScenario
 from prediction_market_agent.agents.think_thoroughly_agent.models import (
     CorrelatedMarketInput,
+    FinalDecisionContext,
 )
 from prediction_market_agent.agents.think_thoroughly_agent.prompts import (
     CREATE_HYPOTHETICAL_SCENARIOS_FROM_SCENARIO_PROMPT,
@@ -53,18 +64,53 @@ from prediction_market_agent.agents.utils import get_event_date_from_question
 from prediction_market_agent.db.long_term_memory_table_handler import (
     LongTermMemoryTableHandler,
 )
-from prediction_market_agent.db.pinecone_handler import PineconeHandler
+from prediction_market_agent.db.pinecone_handler import build_pinecone_handler
 from prediction_market_agent.tools.prediction_prophet.research import (
     prophet_make_prediction,
     prophet_research,
 )
-from prediction_market_agent.utils import APIKeys, disable_crewai_telemetry
+from prediction_market_agent.tools.ttl_cache import TTLCache
+from prediction_market_agent.utils import disable_crewai_telemetry, get_cached_api_keys
+
+T = t.TypeVar("T")
+
+# How the scenarios of a market are run, see `ThinkThoroughlyBase.generate_scenario_predictions`.
+# Either way, they are awaited as futures by the event loop of the market, which enforces the quorum and the deadline.
+# There's no executor that runs them as coroutines directly on that loop: a scenario is a chain of blocking CrewAI calls
+# (even CrewAI's own `kickoff_async` is `kickoff` in `asyncio.to_thread`), so the in-process executor needs threads as well.
+ScenarioExecutor = t.Literal["process", "thread"]
+
+# Maximum number of LLM clients kept by each thread, see `ThinkThoroughlyBase._build_llm`.
+LLM_CACHE_SIZE = 8
+_thread_local = threading.local()
 
 
 class Scenarios(BaseModel):
     scenarios: list[str]
 
 
+class AgentTemplate(BaseModel):
+    """The parts of a CrewAI agent that don't change between tasks, the current date is prepended to the backstory when building it."""
+
+    role: str
+    goal: str
+    backstory: str
+    with_search: bool = False
+
+
+RESEARCHER_TEMPLATE = AgentTemplate(
+    role="Research Analyst",
+    goal="Research and report on some future event, giving high quality and nuanced analysis",
+    backstory="You are a senior research analyst who is adept at researching and reporting on future events.",
+    with_search=True,
+)
+PREDICTOR_TEMPLATE = AgentTemplate(
+    role="Professional Gambler",
+    goal="Predict, based on some research you are presented with, whether or not a given event will occur",
+    backstory="You are a professional gambler who is adept at predicting and betting on the outcomes of future events.",
+)
+
+
 @tool
 @observe()
 def tavily_search_tool(query: str) -> list[dict[str, str]]:
@@ -86,12 +132,39 @@ class ThinkThoroughlyBase(ABC):
     identifier: AgentIdentifier
     model: KnownModelName
     model_for_generate_prediction_for_one_outcome: KnownModelName
+    # Threads avoid pickling the arguments and the start of the workers, but CrewAI, ChromaDB and Langfuse
+    # aren't known to be thread-safe, so processes stay the default. Use "thread" only with backends that are.
+    scenario_executor: ScenarioExecutor = "process"
+    max_concurrent_scenarios: int = 5
+    # Fraction of the scenarios with a prediction after which the rest is cancelled, e.g. 0.8. `None` waits for all of them.
+    scenario_quorum: float | None = None
+    # Counted from the start of the market, scenarios still running then are cancelled.
+    scenario_deadline: timedelta | None = None
+    # With `n_iterations > 1`, stop refining once no scenario's `p_yes` or confidence moves by this much between iterations.
+    # `None` always runs all the iterations.
+    convergence_tolerance: float | None = None
+
+    # Shared by all instances in the process, so retries and both variants answering the same question reuse the lookups.
+    # Nearest markets of a question change only as new markets get indexed, but their prices move all the time.
+    correlated_market_addresses_cache: TTLCache[str, list[HexAddress]] = TTLCache(
+        ttl=timedelta(hours=6)
+    )
+    correlated_market_inputs_cache: TTLCache[
+        HexAddress, CorrelatedMarketInput
+    ] = TTLCache(ttl=timedelta(minutes=5))
 
     def __init__(self, enable_langfuse: bool, memory: bool = True) -> None:
         self.enable_langfuse = enable_langfuse
         self.subgraph_handler = OmenSubgraphHandler()
-        self.pinecone_handler = PineconeHandler()
+        self.pinecone_handler = build_pinecone_handler()
         self.memory = memory
+        # Created on first use and kept for all the markets, see `generate_scenario_predictions`.
+        self._scenario_process_pool: ProcessPoolExecutor | None = None
+        self._scenario_thread_pool: ThreadPoolExecutor | None = None
+        # Scenarios of earlier markets still running in retired thread pools, see `_retire_scenario_pool`.
+        self._straggling_scenarios: list[
+            Future[tuple[str, AnswerWithScenario | None]]
+        ] = []
         self._long_term_memory = (
             LongTermMemoryTableHandler.from_agent_identifier(self.identifier)
             if self.memory
@@ -117,34 +190,41 @@ class ThinkThoroughlyBase(ABC):
 
     @staticmethod
     def _get_researcher(model: str) -> Agent:
-        langfuse_callback = langfuse_context.get_current_langchain_handler()
-        return Agent(
-            role="Research Analyst",
-            goal="Research and report on some future event, giving high quality and nuanced analysis",
-            backstory=f"Current date is {ThinkThoroughlyBase._get_current_date()}. You are a senior research analyst who is adept at researching and reporting on future events.",
-            verbose=True,
-            allow_delegation=False,
-            tools=[tavily_search_tool],
-            llm=ThinkThoroughlyBase._build_llm(model),
-            callbacks=[langfuse_callback] if langfuse_callback else None,
-        )
+        return ThinkThoroughlyBase._build_agent(RESEARCHER_TEMPLATE, model)
 
     @staticmethod
     def _get_predictor(model: str) -> Agent:
+        return ThinkThoroughlyBase._build_agent(PREDICTOR_TEMPLATE, model)
+
+    @staticmethod
+    def _build_agent(template: AgentTemplate, model: str) -> Agent:
+        # Agents keep the state of their current task, so every task gets its own, while the LLM client is shared.
         langfuse_callback = langfuse_context.get_current_langchain_handler()
         return Agent(
-            role="Professional Gambler",
-            goal="Predict, based on some research you are presented with, whether or not a given event will occur",
-            backstory=f"Current date is {ThinkThoroughlyBase._get_current_date()}. You are a professional gambler who is adept at predicting and betting on the outcomes of future events.",
+            role=template.role,
+            goal=template.goal,
+            backstory=f"Current date is {ThinkThoroughlyBase._get_current_date()}. {template.backstory}",
             verbose=True,
             allow_delegation=False,
+            tools=[tavily_search_tool] if template.with_search else [],
             llm=ThinkThoroughlyBase._build_llm(model),
             callbacks=[langfuse_callback] if langfuse_callback else None,
         )
 
     @staticmethod
     def _build_llm(model: str) -> LLM:
-        keys = APIKeys()
+        # One client per model in each thread, shared by the agents of that thread, together with its connection pool.
+        # Not shared across threads, `LLM.call` sets the callbacks on the instance, so it isn't thread-safe.
+        create_llm = getattr(_thread_local, "create_llm", None)
+        if create_llm is None:
+            create_llm = _thread_local.create_llm = functools.lru_cache(
+                maxsize=LLM_CACHE_SIZE
+            )(ThinkThoroughlyBase._create_llm)
+        return t.cast(LLM, create_llm(model))
+
+    @staticmethod
+    def _create_llm(model: str) -> LLM:
+        keys = get_cached_api_keys()
         # ToDo - Add Langfuse callback handler here once integration becomes clear (see
         #  https://github.com/gnosis/prediction-market-agent/issues/107)
         llm = LLM(
@@ -208,17 +288,116 @@ class ThinkThoroughlyBase(ABC):
 
     @observe()
     def get_correlated_markets(self, question: str) -> list[CorrelatedMarketInput]:
-        nearest_questions = self.pinecone_handler.find_nearest_questions_with_threshold(
-            5, text=question
-        )
+        return self.get_correlated_markets_batch([question])[0]
+
+    def get_correlated_markets_batch(
+        self, questions: list[str]
+    ) -> list[list[CorrelatedMarketInput]]:
+        """
+        Correlated markets of each of `questions`, in their order. Questions that aren't cached yet are looked up
+        in the vector index together (see `PineconeHandler.find_nearest_questions_batch`),
+        and the markets of all of them are fetched in a single subgraph request.
+        """
+        market_addresses_by_question: dict[str, list[HexAddress]] = {}
+        for question in questions:
+            cached_addresses = self.correlated_market_addresses_cache.get(question)
+            if cached_addresses is not None:
+                market_addresses_by_question[question] = cached_addresses
 
-        markets = par_map(
-            items=[q.market_address for q in nearest_questions],
-            func=lambda market_address: OmenSubgraphHandler().get_omen_market_by_market_id(
-                market_id=market_address
+        uncached_questions = [
+            q for q in dict.fromkeys(questions) if q not in market_addresses_by_question
+        ]
+        for question, nearest_questions in zip(
+            uncached_questions,
+            self.pinecone_handler.find_nearest_questions_batch(
+                uncached_questions, limit=5
             ),
+        ):
+            market_addresses = [q.market_address for q in nearest_questions]
+            self.correlated_market_addresses_cache.set(question, market_addresses)
+            market_addresses_by_question[question] = market_addresses
+
+        all_market_addresses = list(
+            dict.fromkeys(
+                a
+                for market_addresses in market_addresses_by_question.values()
+                for a in market_addresses
+            )
         )
-        return [CorrelatedMarketInput.from_omen_market(market) for market in markets]
+        correlated_markets = {
+            market_address: correlated_market
+            for market_address in all_market_addresses
+            if (
+                correlated_market := self.correlated_market_inputs_cache.get(
+                    market_address
+                )
+            )
+            is not None
+        }
+        markets = self.get_omen_markets_by_addresses(
+            [a for a in all_market_addresses if a not in correlated_markets]
+        )
+        for market in markets:
+            correlated_market = CorrelatedMarketInput.from_omen_market(market)
+            self.correlated_market_inputs_cache.set(market.id, correlated_market)
+            correlated_markets[market.id] = correlated_market
+
+        return [
+            [
+                correlated_markets[a]
+                for a in market_addresses_by_question[question]
+                if a in correlated_markets
+            ]
+            for question in questions
+        ]
+
+    def get_omen_markets_by_addresses(
+        self, market_addresses: list[HexAddress]
+    ) -> list[OmenMarket]:
+        """Fetches all the markets in a single subgraph request, markets that aren't found are skipped."""
+        if not market_addresses:
+            return []
+        return self.subgraph_handler.get_omen_markets(
+            limit=len(market_addresses),
+            id_in=[str(a) for a in market_addresses],
+            # Same as fetching by id, don't filter out anything else.
+            collateral_token_address_in=None,
+            include_scalar_markets=True,
+        )
+
+    async def prepare_final_decision_context(
+        self,
+        question: str,
+        research_report: str | None = None,
+        with_research: bool = False,
+    ) -> FinalDecisionContext:
+        """
+        Inputs of the final decision that don't depend on the scenarios. The research report is made only `with_research`
+        (and if `research_report` isn't given), because it's worth paying for only once the scenarios have succeeded.
+        """
+        correlated_markets_task = asyncio.to_thread(
+            self.get_correlated_markets, question
+        )
+        event_date_task = asyncio.to_thread(get_event_date_from_question, question)
+        if with_research and research_report is None:
+            correlated_markets, event_date, research_report = await asyncio.gather(
+                correlated_markets_task,
+                event_date_task,
+                self.research_final_decision(question),
+            )
+        else:
+            correlated_markets, event_date = await asyncio.gather(
+                correlated_markets_task, event_date_task
+            )
+        return FinalDecisionContext(
+            correlated_markets=correlated_markets,
+            event_date=event_date,
+            research_report=research_report,
+        )
+
+    async def research_final_decision(self, question: str) -> str | None:
+        """Research report of the question for the final decision, if the agent makes one."""
+        return None
 
     @observe()
     def generate_final_decision(
@@ -227,7 +406,19 @@ class ThinkThoroughlyBase(ABC):
         scenarios_with_probabilities: list[t.Tuple[str, AnswerWithScenario]],
         created_time: DatetimeUTC | None,
         research_report: str | None = None,
+        context: FinalDecisionContext | None = None,
     ) -> ProbabilisticAnswer:
+        if context is None:
+            # Called on its own, the scenarios are done already.
+            context = run_coroutine_sync(
+                self.prepare_final_decision_context(
+                    question, research_report, with_research=True
+                )
+            )
+        research_report = research_report or context.research_report
+        correlated_markets = context.correlated_markets
+        event_date = context.event_date
+
         predictor = self._get_predictor(self.model)
 
         task_final_decision = Task(
@@ -243,9 +434,6 @@ class ThinkThoroughlyBase(ABC):
 
         crew = Crew(agents=[predictor], tasks=[task_final_decision], verbose=True)
 
-        correlated_markets = self.get_correlated_markets(question)
-
-        event_date = get_event_date_from_question(question)
         n_remaining_days = (event_date - utcnow()).days if event_date else "Unknown"
         n_market_open_days = (
             (utcnow() - created_time).days if created_time else "Unknown"
@@ -284,6 +472,176 @@ class ThinkThoroughlyBase(ABC):
         )
         return answer
 
+    async def generate_scenario_predictions(
+        self,
+        unique_id: UUID,
+        question: str,
+        scenarios: list[str],
+        previous_scenarios_and_answers: list[tuple[str, AnswerWithScenario]],
+        deadline: float | None = None,
+    ) -> list[tuple[str, AnswerWithScenario | None]]:
+        """
+        Runs `generate_prediction_for_one_outcome` for all the scenarios, at most `max_concurrent_scenarios` at once,
+        the results are in the order of `scenarios`, one for each of them.
+        With the "process" executor, every scenario runs in a worker process, which isolates the backends that aren't thread-safe.
+        The "thread" executor runs them in threads of this process, it's only safe with thread-safe backends.
+        Both pools belong to the agent and are reused across markets, so the workers are started and initialized only once.
+
+        With `scenario_quorum`, returns as soon as that fraction of the scenarios has a prediction,
+        and in any case at `deadline` (in `loop.time()`), the scenarios still running are cancelled and get no prediction.
+        If some of them were already running, the pool is retired so they don't hold up the next market, see `_retire_scenario_pool`.
+        """
+        loop = asyncio.get_running_loop()
+        scenario_futures: list[Future[tuple[str, AnswerWithScenario | None]]]
+        if self.scenario_executor == "process":
+            process_pool = self._get_scenario_process_pool()
+            scenario_futures = [
+                process_pool.submit(
+                    process_scenario,
+                    (
+                        unique_id,
+                        self.model_for_generate_prediction_for_one_outcome,
+                        scenario,
+                        question,
+                        previous_scenarios_and_answers,
+                        self.generate_prediction_for_one_outcome,
+                    ),
+                )
+                for scenario in scenarios
+            ]
+        else:
+            thread_pool = self._get_scenario_thread_pool()
+            scenario_futures = [
+                thread_pool.submit(
+                    # Each scenario gets a copy of the context, so the Langfuse observations stay nested under the current one.
+                    contextvars.copy_context().run,
+                    run_scenario,
+                    unique_id,
+                    self.model_for_generate_prediction_for_one_outcome,
+                    scenario,
+                    question,
+                    previous_scenarios_and_answers,
+                    self.generate_prediction_for_one_outcome,
+                )
+                for scenario in scenarios
+            ]
+        futures = [asyncio.wrap_future(f, loop=loop) for f in scenario_futures]
+        n_required = (
+            len(futures)
+            if self.scenario_quorum is None
+            else math.ceil(self.scenario_quorum * len(futures))
+        )
+
+        def has_prediction(
+            future: asyncio.Future[tuple[str, AnswerWithScenario | None]]
+        ) -> bool:
+            return (
+                future.done()
+                and not future.cancelled()
+                and future.exception() is None
+                and future.result()[1] is not None
+            )
+
+        try:
+            pending = set(futures)
+            while pending and n_required > sum(1 for f in futures if has_prediction(f)):
+                timeout = None if deadline is None else deadline - loop.time()
+                if timeout is not None and timeout <= 0:
+                    logger.warning(
+                        f"Deadline reached with {len(pending)} scenarios still running."
+                    )
+                    break
+                _, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            # Scenarios that haven't started yet are dropped right away,
+            # the asyncio futures would cancel them only in the next iteration of the loop.
+            for scenario_future, future in zip(scenario_futures, futures):
+                scenario_future.cancel()
+                future.cancel()
+            stragglers = [f for f in scenario_futures if not f.done()]
+            if stragglers:
+                self._retire_scenario_pool(stragglers)
+
+        results: list[tuple[str, AnswerWithScenario | None]] = []
+        for scenario, future in zip(scenarios, futures):
+            if not future.done() or future.cancelled():
+                results.append((scenario, None))
+            elif (error := future.exception()) is not None:
+                # `run_scenario` catches exceptions, but not `BaseException`s (e.g. `SystemExit` in a worker),
+                # nor errors of the executor itself, those fail only their scenario, not the whole batch.
+                logger.warning(f"Error in scenario '{scenario}': {error!r}")
+                results.append((scenario, None))
+            else:
+                results.append(future.result())
+        return results
+
+    def _get_scenario_process_pool(self) -> ProcessPoolExecutor:
+        if self._scenario_process_pool is None:
+            # Not PMAT's reusable executor, that is shared with `par_map` and recreated whenever its arguments differ.
+            self._scenario_process_pool = ProcessPoolExecutor(
+                max_workers=self.max_concurrent_scenarios,
+                initializer=init_scenario_worker,
+                initargs=(self.enable_langfuse,),
+            )
+        return self._scenario_process_pool
+
+    def _get_scenario_thread_pool(self) -> ThreadPoolExecutor:
+        self._straggling_scenarios = [
+            f for f in self._straggling_scenarios if not f.done()
+        ]
+        # Together with the stragglers of earlier markets, at most `max_concurrent_scenarios` scenarios run at once.
+        max_workers = max(
+            1, self.max_concurrent_scenarios - len(self._straggling_scenarios)
+        )
+        if (
+            self._scenario_thread_pool is not None
+            and self._scenario_thread_pool._max_workers < max_workers
+        ):
+            # Created smaller while there were stragglers, those are done now.
+            self._scenario_thread_pool.shutdown(wait=False)
+            self._scenario_thread_pool = None
+        if self._scenario_thread_pool is None:
+            # Long-lived threads keep their LLM clients, see `_build_llm`.
+            # Not the default executor of the loop, `asyncio.run` would wait for the scenarios still running in it.
+            self._scenario_thread_pool = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="scenario",
+            )
+        return self._scenario_thread_pool
+
+    def _retire_scenario_pool(
+        self, stragglers: list[Future[tuple[str, AnswerWithScenario | None]]]
+    ) -> None:
+        """
+        Scenarios cut off by the quorum or the deadline that were already running would keep the workers busy
+        and delay the next market, so their pool isn't used anymore.
+        Worker processes are killed, threads can't be interrupted, they finish in the retired pool,
+        and the next pool is smaller until they are done.
+        """
+        logger.info(
+            f"Retiring the scenario pool with {len(stragglers)} straggling scenarios."
+        )
+        if self.scenario_executor == "process":
+            if self._scenario_process_pool is not None:
+                self._scenario_process_pool.shutdown(wait=False, kill_workers=True)
+                self._scenario_process_pool = None
+        else:
+            if self._scenario_thread_pool is not None:
+                self._scenario_thread_pool.shutdown(wait=False, cancel_futures=True)
+                self._scenario_thread_pool = None
+            self._straggling_scenarios.extend(stragglers)
+
+    def shutdown_scenario_pools(self) -> None:
+        """Stops the workers of the scenarios, the pools are created again if the agent is used later."""
+        if self._scenario_process_pool is not None:
+            self._scenario_process_pool.shutdown(wait=False, kill_workers=True)
+            self._scenario_process_pool = None
+        if self._scenario_thread_pool is not None:
+            self._scenario_thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._scenario_thread_pool = None
+
     @observe()
     def answer_binary_market(
         self,
@@ -291,60 +649,171 @@ class ThinkThoroughlyBase(ABC):
         n_iterations: int = 1,
         created_time: DatetimeUTC | None = None,
     ) -> ProbabilisticAnswer | None:
-        hypothetical_scenarios = self.get_hypohetical_scenarios(question)
-        conditional_scenarios = self.get_required_conditions(question)
+        # Collect all the memories from this market and write them at once at the end.
+        with (
+            self._long_term_memory.buffered_writes()
+            if self._long_term_memory
+            else nullcontext()
+        ):
+            return run_coroutine_sync(
+                self._answer_binary_market(
+                    question, n_iterations=n_iterations, created_time=created_time
+                )
+            )
+
+    async def _answer_binary_market(
+        self,
+        question: str,
+        n_iterations: int,
+        created_time: DatetimeUTC | None,
+    ) -> ProbabilisticAnswer | None:
+        deadline = (
+            asyncio.get_running_loop().time() + self.scenario_deadline.total_seconds()
+            if self.scenario_deadline is not None
+            else None
+        )
+        # The cheap part of the final decision context doesn't depend on the scenarios, so it's prepared meanwhile.
+        # It makes only plain OpenAI, Pinecone and subgraph requests, without CrewAI, so it's safe in a thread next to the kickoffs.
+        final_decision_context = asyncio.create_task(
+            self.prepare_final_decision_context(question)
+        )
+        try:
+            # One kickoff after the other, CrewAI isn't known to be thread-safe (see `scenario_executor`).
+            hypothetical_scenarios = await asyncio.to_thread(
+                self.get_hypohetical_scenarios, question
+            )
+            conditional_scenarios = await asyncio.to_thread(
+                self.get_required_conditions, question
+            )
+            scenarios_with_probs = await self._generate_scenarios_with_probs(
+                question,
+                hypothetical_scenarios,
+                conditional_scenarios,
+                n_iterations,
+                deadline,
+            )
+            # Started only now, a run whose scenarios failed doesn't pay for the research.
+            research_report = await self.research_final_decision(question)
+            context = await final_decision_context
+        except BaseException:
+            final_decision_context.cancel()
+            raise
 
+        return await asyncio.to_thread(
+            self.generate_final_decision,
+            question,
+            scenarios_with_probs,
+            created_time=created_time,
+            research_report=research_report,
+            context=context,
+        )
+
+    async def _generate_scenarios_with_probs(
+        self,
+        question: str,
+        hypothetical_scenarios: Scenarios,
+        conditional_scenarios: Scenarios,
+        n_iterations: int,
+        deadline: float | None,
+    ) -> list[tuple[str, AnswerWithScenario]]:
         unique_id = uuid4()
         observe_unique_id(unique_id)
 
-        scenarios_with_probs: list[tuple[str, AnswerWithScenario]] = []
+        all_scenarios = (
+            hypothetical_scenarios.scenarios + conditional_scenarios.scenarios
+        )
+        # Keyed by the index in `all_scenarios`, the LLM can return the same scenario more than once.
+        predictions: dict[int, AnswerWithScenario] = {}
+        unconverged_indexes = list(range(len(all_scenarios)))
         for iteration in range(n_iterations):
+            if (
+                iteration > 0
+                and deadline is not None
+                and asyncio.get_running_loop().time() >= deadline
+            ):
+                logger.warning(
+                    f"Deadline reached, using the predictions of iteration {iteration} / {n_iterations}."
+                )
+                break
             # If n_ierations is > 1, the agent will generate predictions for
             # each scenario multiple times, taking into account the previous
             # predictions. i.e. the probabilities are adjusted iteratively.
+            # With `convergence_tolerance`, only the scenarios that haven't converged yet are regenerated.
+            indexes_to_run = (
+                list(range(len(all_scenarios)))
+                if self.convergence_tolerance is None
+                else unconverged_indexes
+            )
             logger.info(
-                f"Starting to generate predictions for each scenario, iteration {iteration + 1} / {n_iterations}."
+                f"Starting to generate predictions for {len(indexes_to_run)} scenarios, iteration {iteration + 1} / {n_iterations}."
             )
 
-            all_scenarios = (
-                hypothetical_scenarios.scenarios + conditional_scenarios.scenarios
-            )
-            sub_predictions = par_generator(
-                items=[
-                    (
-                        self.enable_langfuse,
-                        unique_id,
-                        self.model_for_generate_prediction_for_one_outcome,
-                        scenario,
-                        question,
-                        scenarios_with_probs,
-                        self.generate_prediction_for_one_outcome,
-                    )
-                    for scenario in all_scenarios
-                ],
-                func=process_scenario,
+            sub_predictions = await self.generate_scenario_predictions(
+                unique_id,
+                question,
+                [all_scenarios[i] for i in indexes_to_run],
+                [(all_scenarios[i], p) for i, p in sorted(predictions.items())],
+                deadline,
             )
 
-            scenarios_with_probs = []
-            for scenario, prediction in sub_predictions:
+            previous_predictions = dict(predictions)
+            new_predictions: dict[int, AnswerWithScenario] = {}
+            for i, (scenario, prediction) in zip(indexes_to_run, sub_predictions):
                 if prediction is None:
+                    # Keeps the prediction of the previous iteration, if there's one, e.g. when the quorum cut off the re-run.
                     logger.warning(f"Could not generate prediction for '{scenario}'.")
                     continue
-                scenarios_with_probs.append((scenario, prediction))
+                new_predictions[i] = prediction
+                predictions[i] = prediction
                 logger.info(
                     f"'{scenario}' has prediction {prediction.p_yes * 100:.2f}% chance of being True, because: '{prediction.reasoning}'"
                 )
                 self.save_answer_to_long_term_memory(prediction)
 
-            if len(scenarios_with_probs) < len(all_scenarios) / 2:
+            if len(predictions) < len(all_scenarios) / 2:
                 raise ValueError(
-                    f"Too many of sub_predictions have failed, stopping the agent. Got only {len(scenarios_with_probs)} out of {len(all_scenarios)}."
+                    f"Too many of sub_predictions have failed, stopping the agent. Got only {len(predictions)} out of {len(all_scenarios)}."
                 )
 
-        final_answer = self.generate_final_decision(
-            question, scenarios_with_probs, created_time=created_time
-        )
-        return final_answer
+            if self.convergence_tolerance is not None:
+                unconverged_indexes = self._get_unconverged_scenarios(
+                    indexes_to_run, previous_predictions, new_predictions
+                )
+                if not unconverged_indexes:
+                    logger.info(
+                        f"All scenarios converged after iteration {iteration + 1} / {n_iterations}."
+                    )
+                    break
+
+        # Keep the order of the scenarios, regardless of which ones were regenerated last.
+        return [(all_scenarios[i], p) for i, p in sorted(predictions.items())]
+
+    def _get_unconverged_scenarios(
+        self,
+        indexes: list[int],
+        previous_predictions: dict[int, AnswerWithScenario],
+        predictions: dict[int, AnswerWithScenario],
+    ) -> list[int]:
+        """
+        Indexes of the scenarios whose `p_yes` or confidence moved by `convergence_tolerance` or more since the previous iteration.
+        Scenarios without a prediction in both iterations aren't converged either.
+        """
+        assert self.convergence_tolerance is not None
+        changes = {
+            i: max(
+                abs(predictions[i].p_yes - previous_predictions[i].p_yes),
+                abs(predictions[i].confidence - previous_predictions[i].confidence),
+            )
+            for i in indexes
+            if i in predictions and i in previous_predictions
+        }
+        if changes:
+            logger.info(
+                f"Maximum change of the scenario predictions is {max(changes.values()):.3f}."
+            )
+        return [
+            i for i in indexes if changes.get(i, math.inf) >= self.convergence_tolerance
+        ]
 
 
 class ThinkThoroughlyWithItsOwnResearch(ThinkThoroughlyBase):
@@ -437,7 +906,7 @@ class ThinkThoroughlyWithPredictionProphetResearch(ThinkThoroughlyBase):
                 "This agent does not support generating predictions with previous scenarios and answers in mind."
             )
 
-        api_keys = APIKeys()
+        api_keys = get_cached_api_keys()
 
         research = prophet_research(
             goal=scenario,
@@ -481,35 +950,23 @@ class ThinkThoroughlyWithPredictionProphetResearch(ThinkThoroughlyBase):
             reasoning=prediction.reasoning,
         )
 
-    def generate_final_decision(
-        self,
-        question: str,
-        scenarios_with_probabilities: list[t.Tuple[str, AnswerWithScenario]],
-        created_time: DatetimeUTC | None,
-        research_report: str | None = None,
-    ) -> ProbabilisticAnswer:
-        api_keys = APIKeys()
-        report = (
-            research_report
-            or prophet_research(
-                goal=question,
-                agent=PydanticAIAgent(
-                    OpenAIModel(
-                        self.model,
-                        provider=get_openai_provider(api_keys.openai_api_key),
-                    ),
-                    model_settings=ModelSettings(temperature=0.7),
+    async def research_final_decision(self, question: str) -> str | None:
+        return await asyncio.to_thread(self.research_question, question)
+
+    def research_question(self, question: str) -> str:
+        api_keys = get_cached_api_keys()
+        return prophet_research(
+            goal=question,
+            agent=PydanticAIAgent(
+                OpenAIModel(
+                    self.model,
+                    provider=get_openai_provider(api_keys.openai_api_key),
                 ),
-                openai_api_key=api_keys.openai_api_key,
-                tavily_api_key=api_keys.tavily_api_key,
-            ).report
-        )
-        return super().generate_final_decision(
-            question=question,
-            scenarios_with_probabilities=scenarios_with_probabilities,
-            created_time=created_time,
-            research_report=report,
-        )
+                model_settings=ModelSettings(temperature=0.7),
+            ),
+            openai_api_key=api_keys.openai_api_key,
+            tavily_api_key=api_keys.tavily_api_key,
+        ).report
 
 
 def observe_unique_id(unique_id: UUID) -> None:
@@ -521,9 +978,36 @@ def observe_unique_id(unique_id: UUID) -> None:
     )
 
 
+def run_coroutine_sync(coroutine: t.Coroutine[t.Any, t.Any, T]) -> T:
+    """
+    Runs `coroutine` to completion from synchronous code, like `asyncio.run`, but also when this thread already runs
+    an event loop (e.g. when called from a coroutine, with or without `nest_asyncio`): then on a new loop in a separate thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return _run_on_new_loop(coroutine)
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(context.run, _run_on_new_loop, coroutine).result()
+
+
+def _run_on_new_loop(coroutine: t.Coroutine[t.Any, t.Any, T]) -> T:
+    # `asyncio.Runner` instead of `asyncio.run`, which `nest_asyncio` replaces by a version that fails in threads without a loop.
+    with asyncio.Runner() as runner:
+        return runner.run(coroutine)
+
+
+def init_scenario_worker(enable_langfuse: bool) -> None:
+    # Initializer of the worker processes of the "process" scenario executor, runs once per worker.
+    # Reset Langfuse, as this is executed as a separate process and Langfuse isn't thread-safe.
+    initialize_langfuse(enable_langfuse)
+    # Same for patching logger. Force patch, because while our logger is forked patched, LiteLLM still needs patching.
+    patch_logger(force_patch=True)
+
+
 def process_scenario(
     inputs: tuple[
-        bool,
         UUID,
         KnownModelName,
         str,
@@ -541,11 +1025,10 @@ def process_scenario(
         ],
     ],
 ) -> tuple[str, AnswerWithScenario | None]:
-    # Needs to be a normal function outside of class, because `lambda` and `self` aren't pickable for processpool executor,
-    # and process pool executor is required, because ChromaDB isn't thread-safe.
-    # Input arguments needs to be as a single tuple, because par_generator requires a single argument.
+    # Used by the "process" scenario executor.
+    # Needs to be a normal function outside of class, because `lambda` and `self` aren't pickable for processpool executor.
+    # Input arguments are a single tuple, as for `par_map`.
     (
-        enable_langfuse,
         unique_id,
         model,
         scenario,
@@ -553,10 +1036,33 @@ def process_scenario(
         scenarios_with_probs,
         process_function,
     ) = inputs
-    # Reset Langfuse, as this is executed as a separate process and Langfuse isn't thread-safe.
-    initialize_langfuse(enable_langfuse)
-    # Same for patching logger. Force patch, because while our logger is forked patched, LiteLLM still needs patching.
-    patch_logger(force_patch=True)
+    return run_scenario(
+        unique_id,
+        model,
+        scenario,
+        original_question,
+        scenarios_with_probs,
+        process_function,
+    )
+
+
+def run_scenario(
+    unique_id: UUID,
+    model: KnownModelName,
+    scenario: str,
+    original_question: str,
+    scenarios_with_probs: list[tuple[str, AnswerWithScenario]] | None,
+    process_function: t.Callable[
+        [
+            UUID,
+            KnownModelName,
+            str,
+            str,
+            list[tuple[str, AnswerWithScenario]] | None,
+        ],
+        AnswerWithScenario | None,
+    ],
+) -> tuple[str, AnswerWithScenario | None]:
     try:
         result = observe(name="process_scenario")(process_function)(
             unique_id, model, scenario, original_question, scenarios_with_probs
@@ -564,6 +1070,6 @@ def process_scenario(
     except Exception as e:
         # Log only as warning, because ThinkThoroughly is generating a lot of scenarios and it can happen that some of them will fail for any random error.
         # If too many of them fail, it will be logged as error and we will know.
-        logger.warning(f"Error in `process_scenario` subprocess: {str(e)}")
+        logger.warning(f"Error in `process_scenario`: {str(e)}")
         result = None
     return (scenario, result)
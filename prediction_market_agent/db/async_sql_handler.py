@@ -0,0 +1,84 @@
+import typing as t
+
+from sqlalchemy import BinaryExpression, ColumnElement, func
+from sqlmodel import SQLModel, asc, desc, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from prediction_market_agent.db.engine_registry import DBEngineRegistry
+
+SQLModelType = t.TypeVar("SQLModelType", bound=SQLModel)
+
+
+class AsyncSQLHandler(t.Generic[SQLModelType]):
+    """
+    Async counterpart of `SQLHandler`, so that the database access doesn't block the event loop
+    and can overlap with LLM or HTTP calls of the agent.
+
+    Uses `aiosqlite` for SQLite or `asyncpg` for Postgres. In-memory SQLite isn't supported.
+    """
+
+    def __init__(
+        self,
+        model: t.Type[SQLModelType],
+        sqlalchemy_db_url: str | None = None,
+    ):
+        self.sqlalchemy_db_url = sqlalchemy_db_url
+        self.engine = DBEngineRegistry.get_async_engine(sqlalchemy_db_url)
+        self.table = model
+
+    async def _init_table_if_not_exists(self) -> None:
+        await DBEngineRegistry.create_tables_once_async(
+            self.sqlalchemy_db_url, [self.table]
+        )
+
+    def _session(self) -> AsyncSession:
+        # Keep attributes loaded after commit, because the returned objects are used outside of the session.
+        return AsyncSession(self.engine, expire_on_commit=False)
+
+    async def get_all(self) -> t.Sequence[SQLModelType]:
+        await self._init_table_if_not_exists()
+        async with self._session() as session:
+            return (await session.exec(select(self.table))).all()
+
+    async def save_multiple(self, items: t.Sequence[SQLModelType]) -> None:
+        await self._init_table_if_not_exists()
+        async with self._session() as session:
+            session.add_all(items)
+            await session.commit()
+
+    async def get_with_filter_and_order(
+        self,
+        query_filters: t.Sequence[ColumnElement[bool] | BinaryExpression[bool]] = (),
+        order_by_column_name: str | None = None,
+        order_desc: bool = True,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[SQLModelType]:
+        await self._init_table_if_not_exists()
+        query = select(self.table)
+        for exp in query_filters:
+            query = query.where(exp)
+
+        if order_by_column_name:
+            query = query.order_by(
+                desc(order_by_column_name) if order_desc else asc(order_by_column_name)
+            )
+        if offset:
+            query = query.offset(offset)
+        if limit:
+            query = query.limit(limit)
+
+        async with self._session() as session:
+            return list((await session.exec(query)).all())
+
+    async def count(
+        self,
+        query_filters: t.Sequence[ColumnElement[bool] | BinaryExpression[bool]] = (),
+    ) -> int:
+        await self._init_table_if_not_exists()
+        query = select(func.count()).select_from(self.table)
+        for exp in query_filters:
+            query = query.where(exp)
+
+        async with self._session() as session:
+            return (await session.exec(query)).one()
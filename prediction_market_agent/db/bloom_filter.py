@@ -0,0 +1,120 @@
+import hashlib
+import math
+import sys
+import threading
+import typing as t
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+from prediction_market_agent_tooling.loggers import logger
+
+
+class BloomFilter:
+    """
+    Set of strings with constant memory and no false negatives, used to remember which ids are already in the vector index.
+    A string that was added is always reported as present, a string that wasn't is reported as present
+    with probability of about `false_positive_rate`, as long as at most `capacity` strings were added.
+
+    With `path`, the bits are kept in a memory-mapped file, that is created on first use and updated by `add`.
+    Past `capacity`, the false positive rate grows quickly; that's detected from the share of set bits
+    (half of them at `capacity`) and logged, see `approximate_count`. `add` is thread-safe.
+    """
+
+    # Share of set bits of a filter holding exactly `capacity` strings.
+    TARGET_FILL_RATIO = 0.5
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        capacity: int = 1_000_000,
+        false_positive_rate: float = 1e-6,
+    ) -> None:
+        self.path = Path(path) if path is not None else None
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self._lock = threading.Lock()
+        self.n_bits = math.ceil(
+            -capacity * math.log(false_positive_rate) / math.log(2) ** 2
+        )
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        n_bytes = math.ceil(self.n_bits / 8)
+
+        self._bits: npt.NDArray[np.uint8]
+        if self.path is None:
+            self._bits = np.zeros(n_bytes, dtype=np.uint8)
+        else:
+            self._bits = self._open(self.path, n_bytes)
+        self._n_set_bits = int(np.unpackbits(self._bits).sum())
+        self._warned_over_capacity = False
+
+    @staticmethod
+    def _open(path: Path, n_bytes: int) -> npt.NDArray[np.uint8]:
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("wb") as f:
+                f.truncate(n_bytes)
+        elif path.stat().st_size != n_bytes:
+            raise ValueError(
+                f"{path} was created with a different capacity or false positive rate."
+            )
+        return np.memmap(path, dtype=np.uint8, mode="r+", shape=(n_bytes,))
+
+    def _positions(self, value: str) -> npt.NDArray[np.int64]:
+        # Double hashing, k positions out of two independent 64-bit hashes.
+        digest = hashlib.sha256(value.encode()).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        # Unique, so that the newly set bits are counted once in `add`.
+        return np.unique(
+            np.array(
+                [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)],
+                dtype=np.int64,
+            )
+        )
+
+    @property
+    def fill_ratio(self) -> float:
+        return self._n_set_bits / self.n_bits
+
+    @property
+    def approximate_count(self) -> int:
+        """Estimated number of distinct strings added so far, from the share of set bits."""
+        if self._n_set_bits >= self.n_bits:
+            return sys.maxsize
+        return round(-self.n_bits / self.n_hashes * math.log(1 - self.fill_ratio))
+
+    def add(self, values: t.Iterable[str]) -> None:
+        with self._lock:
+            for value in values:
+                positions = self._positions(value)
+                byte_positions = positions // 8
+                masks = (1 << (positions % 8)).astype(np.uint8)
+                self._n_set_bits += int(
+                    np.count_nonzero((self._bits[byte_positions] & masks) == 0)
+                )
+                np.bitwise_or.at(self._bits, byte_positions, masks)
+
+            if (
+                self.fill_ratio > self.TARGET_FILL_RATIO
+                and not self._warned_over_capacity
+            ):
+                self._warned_over_capacity = True
+                logger.warning(
+                    f"Bloom filter {self.path or '(in memory)'} holds about {self.approximate_count} strings, over its capacity of {self.capacity}, "
+                    f"the false positive rate is above {self.false_positive_rate}. Increase the capacity, or clear it to rebuild."
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bits[:] = 0
+            self._n_set_bits = 0
+            self._warned_over_capacity = False
+
+    def __contains__(self, value: str) -> bool:
+        positions = self._positions(value)
+        return bool(np.all(self._bits[positions // 8] & (1 << (positions % 8))))
+
+    def flush(self) -> None:
+        if isinstance(self._bits, np.memmap):
+            self._bits.flush()
@@ -0,0 +1,107 @@
+import hashlib
+
+import numpy as np
+import numpy.typing as npt
+from langchain_core.embeddings import Embeddings
+from sqlalchemy import make_url
+from sqlmodel import col
+
+from prediction_market_agent.db.models import EmbeddingCacheEntry
+from prediction_market_agent.db.sql_handler import SQLHandler
+
+# `timeout` is how long (in seconds) a write waits for another writer to release the SQLite database.
+DEFAULT_EMBEDDING_CACHE_DB_URL = "sqlite:///.embedding_cache.sqlite?timeout=30"
+
+
+def encode_text(text: str) -> str:
+    """Encodes string using sha-256 and returns it as string"""
+    # We use SHA-256 for generating IDs with fixed length.
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed cache in front of another `Embeddings`, so that a text is embedded only once per model,
+    across runs and agents. Entries are keyed by `(model, encode_text(text))`, the same ids we use in the vector index,
+    and vectors are stored as float16, halving the size while keeping cosine similarities within ~1e-3.
+    Cached and freshly computed vectors are both returned rounded to float16, so results don't depend on the cache state.
+    SQLite databases are switched to WAL mode, so that lookups don't block on the writes of concurrent bulk-insert workers,
+    and writers wait for each other up to the `timeout` of the URL (see `DEFAULT_EMBEDDING_CACHE_DB_URL`).
+    """
+
+    # Keeps the `IN (...)` lists below the SQLite limit of bound parameters.
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        sqlalchemy_db_url: str = DEFAULT_EMBEDDING_CACHE_DB_URL,
+    ) -> None:
+        self.embeddings = embeddings
+        self.model = model
+        self.sql_handler = SQLHandler(
+            model=EmbeddingCacheEntry, sqlalchemy_db_url=sqlalchemy_db_url
+        )
+        if make_url(sqlalchemy_db_url).get_backend_name() == "sqlite":
+            # Persisted in the database file, so it's enough to set it once.
+            with self.sql_handler.db_manager.get_connection() as connection:
+                connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes = [encode_text(text) for text in texts]
+        vectors = self._get_cached(set(hashes))
+
+        missing = {h: text for h, text in zip(hashes, texts) if h not in vectors}
+        if missing:
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            vectors.update(self._save(list(missing.keys()), computed))
+
+        return [vectors[h].astype(np.float32).tolist() for h in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        text_hash = encode_text(text)
+        vectors = self._get_cached({text_hash})
+        if text_hash not in vectors:
+            vectors.update(self._save([text_hash], [self.embeddings.embed_query(text)]))
+        vector: list[float] = vectors[text_hash].astype(np.float32).tolist()
+        return vector
+
+    def _get_cached(self, hashes: set[str]) -> dict[str, npt.NDArray[np.float16]]:
+        hash_list = list(hashes)
+        vectors: dict[str, npt.NDArray[np.float16]] = {}
+        for i in range(0, len(hash_list), self.LOOKUP_BATCH_SIZE):
+            rows = self.sql_handler.get_columns_with_filter_and_order(
+                column_names=["text_hash", "vector"],
+                query_filters=[
+                    col(EmbeddingCacheEntry.model) == self.model,
+                    col(EmbeddingCacheEntry.text_hash).in_(
+                        hash_list[i : i + self.LOOKUP_BATCH_SIZE]
+                    ),
+                ],
+            )
+            vectors.update(
+                (row.text_hash, np.frombuffer(row.vector, dtype=np.float16))
+                for row in rows
+            )
+        return vectors
+
+    def _save(
+        self, hashes: list[str], computed: list[list[float]]
+    ) -> dict[str, npt.NDArray[np.float16]]:
+        vectors = {
+            h: np.asarray(vector, dtype=np.float16)
+            for h, vector in zip(hashes, computed)
+        }
+        # Another process could have embedded the same text meanwhile, the vectors are the same then.
+        self.sql_handler.upsert_many(
+            [
+                EmbeddingCacheEntry(
+                    model=self.model, text_hash=h, vector=vector.tobytes()
+                )
+                for h, vector in vectors.items()
+            ],
+            conflict_column_names=["model", "text_hash"],
+            on_conflict="ignore",
+        )
+        return vectors
@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import os
+import typing as t
+import weakref
+
+from prediction_market_agent_tooling.tools.caches.serializers import (
+    json_deserializer,
+    json_serializer,
+)
+from prediction_market_agent_tooling.tools.db.db_manager import DBManager
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import Connection, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import SQLModel, create_engine
+
+from prediction_market_agent.utils import APIKeys
+
+
+class DBPoolSettings(BaseSettings):
+    """
+    Connection-pool settings of the engines handed out by the registry, both sync and async.
+    SQLite keeps SQLAlchemy's default pool, the settings apply to Postgres.
+    """
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        env_prefix="SQLALCHEMY_",
+        extra="ignore",
+    )
+    POOL_SIZE: int = 5
+    MAX_OVERFLOW: int = 10
+    POOL_RECYCLE: int = 1800  # Seconds after which a connection is re-opened.
+    POOL_PRE_PING: bool = True
+
+
+class PooledDBManager(DBManager):
+    """
+    PMAT's `DBManager` (a singleton per database URL that remembers which tables were created),
+    with the pool of its engine configured by `DBPoolSettings` instead of the fixed `pool_size=2`.
+    Its instances are kept apart from those of `DBManager`, that keeps serving PMAT's own tables.
+    """
+
+    _instances: dict[str, DBManager] = {}
+
+    def __init__(self, sqlalchemy_db_url: str | None = None) -> None:
+        if hasattr(self, "_initialized"):
+            return
+        self._engine = DBEngineRegistry.create_engine(
+            sqlalchemy_db_url or DBEngineRegistry._get_default_db_url()
+        )
+        self.cache_table_initialized = {}
+        self._initialized = True
+
+    @property
+    def engine(self) -> Engine:
+        return self._engine
+
+
+class DBEngineRegistry:
+    """
+    Entry point to the database for `SQLHandler` and `AsyncSQLHandler`.
+
+    Sync access goes through `PooledDBManager`, a singleton per database URL like PMAT's `DBManager`.
+    Async engines aren't provided by PMAT, so the registry keeps one pooled engine per URL itself,
+    and runs the schema creation only once per table through it.
+    After a fork the inherited pools are discarded, because connections can't be shared across processes.
+    """
+
+    _async_engines: dict[str, AsyncEngine] = {}
+    _initialized_async_tables: dict[str, set[str]] = {}
+    # Locks are bound to an event loop, so they are kept per loop.
+    _async_table_locks: weakref.WeakKeyDictionary[
+        asyncio.AbstractEventLoop, dict[str, asyncio.Lock]
+    ] = weakref.WeakKeyDictionary()
+    _pool_settings: DBPoolSettings | None = None
+    _default_db_url: str | None = None
+    _pid: int | None = None
+
+    @classmethod
+    def configure(cls, pool_settings: DBPoolSettings) -> None:
+        """Set the pool settings used for engines created from now on."""
+        cls._pool_settings = pool_settings
+
+    @classmethod
+    def get_db_manager(cls, sqlalchemy_db_url: str | None = None) -> DBManager:
+        cls._reset_if_forked()
+        return PooledDBManager(sqlalchemy_db_url or cls._get_default_db_url())
+
+    @classmethod
+    def get_async_engine(cls, sqlalchemy_db_url: str | None = None) -> AsyncEngine:
+        cls._reset_if_forked()
+        db_url = sqlalchemy_db_url or cls._get_default_db_url()
+        key = cls._key(db_url)
+
+        if key not in cls._async_engines:
+            cls._async_engines[key] = cls._create_async_engine(db_url)
+            cls._initialized_async_tables[key] = set()
+
+        return cls._async_engines[key]
+
+    @classmethod
+    def create_tables_once(
+        cls, sqlalchemy_db_url: str | None, tables: t.Sequence[t.Type[SQLModel]]
+    ) -> None:
+        # `PooledDBManager` remembers the created tables, so repeated calls don't hit the database.
+        # Changes of already existing tables are applied by `scripts/migrate_db_schema.py`.
+        cls.get_db_manager(sqlalchemy_db_url).create_tables(sqlmodel_tables=tables)
+
+    @classmethod
+    async def create_tables_once_async(
+        cls, sqlalchemy_db_url: str | None, tables: t.Sequence[t.Type[SQLModel]]
+    ) -> None:
+        """Same as `create_tables_once`, but through the async engine."""
+        db_url = sqlalchemy_db_url or cls._get_default_db_url()
+        engine = cls.get_async_engine(db_url)
+        key = cls._key(db_url)
+        initialized_tables = cls._initialized_async_tables[key]
+
+        if all(str(table.__tablename__) in initialized_tables for table in tables):
+            return
+
+        locks = cls._async_table_locks.setdefault(asyncio.get_running_loop(), {})
+        # Otherwise concurrent first calls would all try to create the same tables.
+        async with locks.setdefault(key, asyncio.Lock()):
+            missing_tables = [
+                table
+                for table in tables
+                if str(table.__tablename__) not in initialized_tables
+            ]
+            if not missing_tables:
+                return
+
+            await cls._create_tables_async(engine, missing_tables)
+            initialized_tables.update(
+                str(table.__tablename__) for table in missing_tables
+            )
+
+    @staticmethod
+    async def _create_tables_async(
+        engine: AsyncEngine, missing_tables: t.Sequence[t.Type[SQLModel]]
+    ) -> None:
+        def create_tables(connection: Connection) -> None:
+            SQLModel.metadata.create_all(
+                connection,
+                tables=[
+                    SQLModel.metadata.tables[str(table.__tablename__)]
+                    for table in missing_tables
+                ],
+            )
+
+        async with engine.begin() as connection:
+            await connection.run_sync(create_tables)
+
+    @classmethod
+    def reset(cls) -> None:
+        """Dispose the engines and forget everything, used mainly in tests."""
+        for db_manager in PooledDBManager._instances.values():
+            db_manager._engine.dispose()
+        PooledDBManager._instances = {}
+        for async_engine in cls._async_engines.values():
+            # Can't await here, but disposing the underlying pool is enough to drop the connections.
+            async_engine.sync_engine.dispose()
+        cls._async_engines = {}
+        cls._initialized_async_tables = {}
+        cls._async_table_locks = weakref.WeakKeyDictionary()
+        cls._pool_settings = None
+        cls._default_db_url = None
+        cls._pid = os.getpid()
+
+    @classmethod
+    def _reset_if_forked(cls) -> None:
+        pid = os.getpid()
+        if cls._pid == pid:
+            return
+        if cls._pid is not None:
+            # Pooled connections belong to the parent process, drop them without closing them,
+            # see https://docs.sqlalchemy.org/en/20/core/pooling.html#using-connection-pools-with-multiprocessing-or-os-fork
+            for db_manager in PooledDBManager._instances.values():
+                db_manager._engine.dispose(close=False)
+            for async_engine in cls._async_engines.values():
+                async_engine.sync_engine.dispose(close=False)
+        cls._pid = pid
+
+    @classmethod
+    def _get_default_db_url(cls) -> str:
+        # Resolve the default URL only once, to not re-read `.env` for every handler.
+        if cls._default_db_url is None:
+            cls._default_db_url = APIKeys().sqlalchemy_db_url.get_secret_value()
+        return cls._default_db_url
+
+    @classmethod
+    def _create_async_engine(cls, sqlalchemy_db_url: str) -> AsyncEngine:
+        url = make_url(sqlalchemy_db_url)
+        backend = url.get_backend_name()
+        if backend == "sqlite":
+            if url.database in (None, "", ":memory:"):
+                # It would live only as long as its single connection, that would have to be shared by all sessions.
+                raise ValueError(
+                    "In-memory SQLite isn't supported by the async handlers, use a file-backed database."
+                )
+            url = url.set(drivername="sqlite+aiosqlite")
+        elif backend == "postgresql":
+            url = url.set(drivername="postgresql+asyncpg")
+        else:
+            raise ValueError(f"Async database access isn't supported for {backend=}.")
+
+        return create_async_engine(url, **cls._engine_kwargs(backend))
+
+    @classmethod
+    def create_engine(cls, sqlalchemy_db_url: str) -> Engine:
+        """Sync engine with the current pool settings, see `PooledDBManager`."""
+        return create_engine(
+            sqlalchemy_db_url,
+            **cls._engine_kwargs(make_url(sqlalchemy_db_url).get_backend_name()),
+        )
+
+    @classmethod
+    def _engine_kwargs(cls, backend: str) -> dict[str, t.Any]:
+        # Same serializers as `DBManager`, the engines are shared with the tooling's own JSON tables.
+        kwargs: dict[str, t.Any] = dict(
+            json_serializer=json_serializer,
+            json_deserializer=json_deserializer,
+        )
+        if backend == "sqlite":
+            return kwargs
+
+        if cls._pool_settings is None:
+            cls._pool_settings = DBPoolSettings()
+        return dict(
+            kwargs,
+            pool_size=cls._pool_settings.POOL_SIZE,
+            max_overflow=cls._pool_settings.MAX_OVERFLOW,
+            pool_recycle=cls._pool_settings.POOL_RECYCLE,
+            pool_pre_ping=cls._pool_settings.POOL_PRE_PING,
+        )
+
+    @staticmethod
+    def _key(sqlalchemy_db_url: str) -> str:
+        # Hash the URL to not keep the credentials around in plain text.
+        return hashlib.md5(sqlalchemy_db_url.encode()).hexdigest()
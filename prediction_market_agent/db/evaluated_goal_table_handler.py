@@ -1,7 +1,9 @@
 import typing as t
 
+from sqlalchemy import Row
 from sqlmodel import col
 
+from prediction_market_agent.db.async_sql_handler import AsyncSQLHandler
 from prediction_market_agent.db.models import EvaluatedGoalModel
 from prediction_market_agent.db.sql_handler import SQLHandler
 
@@ -21,14 +23,68 @@ class EvaluatedGoalTableHandler:
     def save_evaluated_goal(self, model: EvaluatedGoalModel) -> None:
         self.sql_handler.save_multiple([model])
 
-    def get_latest_evaluated_goals(self, limit: int) -> list[EvaluatedGoalModel]:
+    @t.overload
+    def get_latest_evaluated_goals(
+        self, limit: int, columns: None = None
+    ) -> list[EvaluatedGoalModel]:
+        ...
+
+    @t.overload
+    def get_latest_evaluated_goals(
+        self, limit: int, columns: t.Sequence[str]
+    ) -> list[Row[t.Any]]:
+        ...
+
+    def get_latest_evaluated_goals(
+        self, limit: int, columns: t.Sequence[str] | None = None
+    ) -> list[EvaluatedGoalModel] | list[Row[t.Any]]:
+        """
+        If `columns` are given, returns rows of only those columns instead of the models,
+        see `SQLHandler.get_columns_with_filter_and_order`.
+        """
         column_to_order: str = EvaluatedGoalModel.datetime_.key  # type: ignore
+        query_filters = [col(EvaluatedGoalModel.agent_id) == self.agent_id]
+        if columns is not None:
+            return self.sql_handler.get_columns_with_filter_and_order(
+                column_names=columns,
+                query_filters=query_filters,
+                order_by_column_name=column_to_order,
+                order_desc=True,
+                limit=limit,
+            )
         items: t.Sequence[
             EvaluatedGoalModel
         ] = self.sql_handler.get_with_filter_and_order(
-            query_filters=[col(EvaluatedGoalModel.agent_id) == self.agent_id],
+            query_filters=query_filters,
             order_by_column_name=column_to_order,
             order_desc=True,
             limit=limit,
         )
         return list(items)
+
+
+class AsyncEvaluatedGoalTableHandler:
+    """Async version of `EvaluatedGoalTableHandler`, for use from within the agent's event loop."""
+
+    def __init__(
+        self,
+        agent_id: str,
+        sqlalchemy_db_url: str | None = None,
+    ):
+        self.agent_id = agent_id
+        self.sql_handler = AsyncSQLHandler(
+            model=EvaluatedGoalModel,
+            sqlalchemy_db_url=sqlalchemy_db_url,
+        )
+
+    async def save_evaluated_goal(self, model: EvaluatedGoalModel) -> None:
+        await self.sql_handler.save_multiple([model])
+
+    async def get_latest_evaluated_goals(self, limit: int) -> list[EvaluatedGoalModel]:
+        column_to_order: str = EvaluatedGoalModel.datetime_.key  # type: ignore
+        return await self.sql_handler.get_with_filter_and_order(
+            query_filters=[col(EvaluatedGoalModel.agent_id) == self.agent_id],
+            order_by_column_name=column_to_order,
+            order_desc=True,
+            limit=limit,
+        )
@@ -0,0 +1,40 @@
+"""
+JSON encoding used for the data we store in the database.
+
+Uses `orjson` if it's installed, because it's several times faster than the standard library on both ends,
+and falls back to `json` otherwise. The two don't produce the same text: `orjson` omits the spaces after separators
+and encodes NaN and infinities as `null`, where `json` writes `NaN` and `Infinity`. Both decode to the same values
+otherwise, and text that `orjson` refuses to decode, such as those `NaN`s, is decoded with `json`.
+
+Used for JSON stored as text: the legacy `LongTermMemories.metadata_`, the archive and the local vector index.
+Values of JSON columns, such as `LongTermMemories.metadata_json`, are (de)serialized by the engine instead,
+with `json_serializer` and `json_deserializer` of PMAT, that are based on `json`.
+"""
+
+import json
+import typing as t
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+
+def dumps(obj: t.Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+        except orjson.JSONEncodeError:
+            # For example integers over 64 bits, that the standard library handles fine.
+            pass
+    return json.dumps(obj)
+
+
+def loads(s: str | bytes) -> t.Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # For example `NaN`, written by `json.dumps`, which `orjson` considers invalid.
+            pass
+    return json.loads(s)
@@ -0,0 +1,422 @@
+import threading
+import typing as t
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from prediction_market_agent.db import json_codec
+
+# Pinecone-style metadata filter, e.g. `{"close_time_timestamp": {"$gte": 100}}`.
+MetadataFilter = dict[str, t.Any]
+# How the vectors are stored, see `LocalVectorStore`.
+VectorQuantization = t.Literal["float32", "int8"]
+
+_COMPARISONS: dict[
+    str, t.Callable[[npt.NDArray[t.Any], t.Any], npt.NDArray[np.bool_]]
+] = {
+    "$eq": np.equal,
+    "$ne": np.not_equal,
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+    "$in": lambda column, values: np.isin(column, values),
+    "$nin": lambda column, values: ~np.isin(column, values),
+}
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Vector store kept in a local directory, used instead of the hosted Pinecone index for offline runs,
+    tests and benchmarks, or in production if sub-millisecond queries are preferred over a shared index.
+
+    Vectors are L2-normalised and appended to a raw float32 matrix in `vectors.f32`, that is memory-mapped,
+    so only the pages touched by the queries are loaded. Ids, texts and metadata are appended to `records.jsonl`,
+    a line is written only after its vector, so the records are the source of truth after an interrupted write.
+    The dimension of the vectors and their quantization are stored in `index.json`.
+    Queries are exact cosine similarity, a single matrix-vector product over the rows matching the filter.
+    Without `index_dir`, everything is kept in memory only.
+    Writes and queries are safe to call from multiple threads of a single process, they are serialised by a lock.
+    Only one process may write to an `index_dir`, other processes don't see its writes until they reload the store.
+
+    With `quantization="int8"`, each vector is stored as int8 values scaled by its largest component, plus the float32 scale,
+    in `vectors.i8`. That is about 4x less memory and disk, while similarities change by less than 1e-3,
+    queries stay in float32 and only the stored side is quantized.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    QUANTIZED_VECTORS_FILE = "vectors.i8"
+    RECORDS_FILE = "records.jsonl"
+    INFO_FILE = "index.json"
+    # Number of int8 values converted to float32 at once during a query, 1 MB blocks stay in the CPU cache.
+    QUANTIZED_BLOCK_VALUES = 2**18
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        index_dir: Path | str | None = None,
+        quantization: VectorQuantization = "float32",
+    ):
+        self._embedding = embedding
+        self.index_dir = Path(index_dir) if index_dir is not None else None
+        self.quantization = quantization
+        self._dimension: int | None = None
+        self._ids: list[str] = []
+        self._texts: list[str] = []
+        self._metadatas: list[dict[str, t.Any]] = []
+        self._row_by_id: dict[str, int] = {}
+        # Float32 matrix, or structured rows with `scale` and `values` if quantized, see `_row_dtype`.
+        self._vectors: npt.NDArray[t.Any] = np.empty((0, 0), dtype=np.float32)
+        # Metadata fields as arrays, built lazily for filtering.
+        self._columns: dict[str, npt.NDArray[t.Any]] = {}
+        self._lock = threading.Lock()
+
+        if self.index_dir is not None:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @property
+    def _vectors_path(self) -> Path:
+        assert self.index_dir is not None
+        return self.index_dir / (
+            self.QUANTIZED_VECTORS_FILE
+            if self.quantization == "int8"
+            else self.VECTORS_FILE
+        )
+
+    @property
+    def _records_path(self) -> Path:
+        assert self.index_dir is not None
+        return self.index_dir / self.RECORDS_FILE
+
+    @property
+    def _info_path(self) -> Path:
+        assert self.index_dir is not None
+        return self.index_dir / self.INFO_FILE
+
+    def _load(self) -> None:
+        if self._info_path.exists():
+            info = json_codec.loads(self._info_path.read_text())
+            # Indexes written before quantization was supported are all float32.
+            stored_quantization = info.get("quantization", "float32")
+            if stored_quantization != self.quantization:
+                raise ValueError(
+                    f"{self.index_dir} stores {stored_quantization} vectors, but {self.quantization} was requested."
+                )
+            self._dimension = info["dimension"]
+        if not self._records_path.exists():
+            return
+        with self._records_path.open() as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json_codec.loads(line)
+                row = record["row"]
+                if row == len(self._ids):
+                    self._ids.append(record["id"])
+                    self._texts.append(record["text"])
+                    self._metadatas.append(record["metadata"])
+                else:
+                    # Later line for an existing id, written by an upsert.
+                    self._texts[row] = record["text"]
+                    self._metadatas[row] = record["metadata"]
+                self._row_by_id[record["id"]] = row
+        if self._ids:
+            self._open_vectors()
+
+    def _row_dtype(self) -> np.dtype[t.Any]:
+        assert self._dimension is not None
+        if self.quantization == "int8":
+            return np.dtype([("scale", "<f4"), ("values", "i1", (self._dimension,))])
+        return np.dtype(("<f4", (self._dimension,)))
+
+    def _open_vectors(self) -> None:
+        # The sub-array dtype of float32 rows makes the memmap a plain (rows, dimension) float32 matrix.
+        self._vectors = np.memmap(
+            self._vectors_path,
+            dtype=self._row_dtype(),
+            mode="r+",
+            shape=(len(self._ids),),
+        )
+
+    def _encode(self, vectors: npt.NDArray[np.float32]) -> npt.NDArray[t.Any]:
+        """Converts normalised float32 vectors into the stored rows."""
+        if self.quantization == "float32":
+            return vectors
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        rows = np.empty(len(vectors), dtype=self._row_dtype())
+        rows["scale"] = scales
+        rows["values"] = np.round(vectors / scales[:, None])
+        return rows
+
+    @property
+    def vectors_nbytes(self) -> int:
+        """Size of the stored vectors, in memory or on disk."""
+        return int(self._vectors.nbytes)
+
+    def get_ids(self) -> list[str]:
+        return list(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._row_by_id
+
+    def add_texts(
+        self,
+        texts: t.Iterable[str],
+        metadatas: list[dict[str, t.Any]] | None = None,
+        *,
+        ids: list[str] | None = None,
+        **kwargs: t.Any,
+    ) -> list[str]:
+        """Inserts the texts, or overwrites them if their id is already present, same as upsert in Pinecone."""
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_embeddings(
+            texts, self._embedding.embed_documents(texts), metadatas, ids=ids
+        )
+
+    def add_embeddings(
+        self,
+        texts: list[str],
+        embeddings: list[list[float]],
+        metadatas: list[dict[str, t.Any]] | None = None,
+        *,
+        ids: list[str] | None = None,
+    ) -> list[str]:
+        """Same as `add_texts`, with embeddings computed beforehand. Safe to call from multiple threads."""
+        with self._lock:
+            return self._add_embeddings(texts, embeddings, metadatas, ids)
+
+    def _add_embeddings(
+        self,
+        texts: list[str],
+        embeddings: list[list[float]],
+        metadatas: list[dict[str, t.Any]] | None,
+        ids: list[str] | None,
+    ) -> list[str]:
+        ids = (
+            ids
+            if ids is not None
+            else [str(i + len(self._ids)) for i in range(len(texts))]
+        )
+        metadatas = metadatas if metadatas is not None else [{} for _ in texts]
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        if self._dimension is None:
+            self._dimension = vectors.shape[1]
+        elif vectors.shape[1] != self._dimension:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} doesn't match the index dimension {self._dimension}."
+            )
+        rows = self._encode(vectors)
+
+        records = []
+        n_stored_vectors = len(self._vectors)
+        new_rows: list[int] = []
+        for i, (id_, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+            if id_ in self._row_by_id:
+                row = self._row_by_id[id_]
+                if row < n_stored_vectors:
+                    self._vectors[row] = rows[i]
+                else:
+                    # Duplicated id within this call.
+                    new_rows[row - n_stored_vectors] = i
+                self._texts[row] = text
+                self._metadatas[row] = metadata
+            else:
+                row = len(self._ids)
+                self._row_by_id[id_] = row
+                self._ids.append(id_)
+                self._texts.append(text)
+                self._metadatas.append(metadata)
+                new_rows.append(i)
+            records.append({"row": row, "id": id_, "text": text, "metadata": metadata})
+
+        self._append_vectors(rows[new_rows])
+        if self.index_dir is not None:
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            with self._records_path.open("a") as f:
+                f.writelines(json_codec.dumps(record) + "\n" for record in records)
+        self._columns = {}
+        return ids
+
+    def _append_vectors(self, rows: npt.NDArray[t.Any]) -> None:
+        if self.index_dir is None:
+            self._vectors = (
+                np.concatenate([self._vectors, rows]) if len(self._vectors) else rows
+            )
+            return
+        if not self._info_path.exists():
+            self._info_path.write_text(
+                json_codec.dumps(
+                    {"dimension": self._dimension, "quantization": self.quantization}
+                )
+            )
+        if len(rows):
+            n_stored_vectors = len(self._ids) - len(rows)
+            with self._vectors_path.open(
+                "r+b" if self._vectors_path.exists() else "wb"
+            ) as f:
+                # Overwrite whatever was left behind by an interrupted write, after the last recorded vector.
+                f.seek(n_stored_vectors * self._row_dtype().itemsize)
+                f.write(rows.tobytes())
+                f.truncate()
+        self._open_vectors()
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: MetadataFilter | None = None,
+        **kwargs: t.Any,
+    ) -> list[tuple[Document, float]]:
+        """Returns the `k` most similar documents with their cosine similarity."""
+        return self.similarity_search_by_vectors_with_score(
+            [self._embedding.embed_query(query)], k=k, filter=filter
+        )[0]
+
+    def similarity_search_by_vectors_with_score(
+        self,
+        embeddings: list[list[float]],
+        k: int = 4,
+        filter: MetadataFilter | None = None,
+    ) -> list[list[tuple[Document, float]]]:
+        """Batched `similarity_search_with_score` for already embedded queries, all scored by a single matrix product."""
+        if not embeddings:
+            return []
+        query_vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        # Writes replace the vectors and invalidate the filter columns, so reads take the same lock.
+        with self._lock:
+            return self._search(query_vectors, k, filter)
+
+    def _search(
+        self,
+        query_vectors: npt.NDArray[np.float32],
+        k: int,
+        filter: MetadataFilter | None,
+    ) -> list[list[tuple[Document, float]]]:
+        if not self._ids:
+            return [[] for _ in query_vectors]
+        rows = (
+            np.flatnonzero(self._filter_mask(filter))
+            if filter
+            else np.arange(len(self._ids))
+        )
+        if not len(rows):
+            return [[] for _ in query_vectors]
+        # Shape (number of queries, number of rows).
+        scores = self._scores(query_vectors, self._vectors[rows] if filter else None)
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(
+            top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1
+        )
+
+        return [
+            [
+                (
+                    Document(
+                        id=self._ids[rows[i]],
+                        page_content=self._texts[rows[i]],
+                        metadata=self._metadatas[rows[i]],
+                    ),
+                    float(query_scores[i]),
+                )
+                for i in query_top
+            ]
+            for query_scores, query_top in zip(scores, top)
+        ]
+
+    def _scores(
+        self,
+        query_vectors: npt.NDArray[np.float32],
+        stored_rows: npt.NDArray[t.Any] | None,
+    ) -> npt.NDArray[np.float32]:
+        stored_rows = self._vectors if stored_rows is None else stored_rows
+        if self.quantization == "float32":
+            return t.cast(npt.NDArray[np.float32], query_vectors @ stored_rows.T)
+        assert self._dimension is not None
+        block_size = max(1, self.QUANTIZED_BLOCK_VALUES // self._dimension)
+        scores = np.empty((len(query_vectors), len(stored_rows)), dtype=np.float32)
+        for start in range(0, len(stored_rows), block_size):
+            block = stored_rows[start : start + block_size]
+            scores[:, start : start + block_size] = (
+                query_vectors @ block["values"].astype(np.float32).T
+            ) * block["scale"]
+        return scores
+
+    def similarity_search(
+        self, query: str, k: int = 4, **kwargs: t.Any
+    ) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self) -> t.Callable[[float], float]:
+        # Same as in `PineconeVectorStore`, maps cosine similarity from [-1, 1] to [0, 1],
+        # so that the thresholds used with Pinecone keep their meaning.
+        return lambda score: (score + 1) / 2
+
+    def _filter_mask(self, filter: MetadataFilter) -> npt.NDArray[np.bool_]:
+        mask = np.ones(len(self._ids), dtype=bool)
+        for key, condition in filter.items():
+            if key == "$and":
+                for sub_filter in condition:
+                    mask &= self._filter_mask(sub_filter)
+            elif key == "$or":
+                mask &= np.logical_or.reduce(
+                    [self._filter_mask(sub_filter) for sub_filter in condition]
+                )
+            elif isinstance(condition, dict):
+                column = self._column(key)
+                for operator, value in condition.items():
+                    if operator not in _COMPARISONS:
+                        raise ValueError(f"Unsupported filter operator {operator}.")
+                    mask &= _COMPARISONS[operator](column, value)
+            else:
+                mask &= np.equal(self._column(key), condition)
+        return mask
+
+    def _column(self, key: str) -> npt.NDArray[t.Any]:
+        if key not in self._columns:
+            values = [metadata.get(key) for metadata in self._metadatas]
+            try:
+                # Numeric fields, missing values never match the comparisons.
+                self._columns[key] = np.array(
+                    [np.nan if v is None else v for v in values], dtype=np.float64
+                )
+            except (TypeError, ValueError):
+                self._columns[key] = np.array(values, dtype=object)
+        return self._columns[key]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: list[dict[str, t.Any]] | None = None,
+        *,
+        ids: list[str] | None = None,
+        index_dir: Path | str | None = None,
+        quantization: VectorQuantization = "float32",
+        **kwargs: t.Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding=embedding, index_dir=index_dir, quantization=quantization)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+
+def _normalize(vectors: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return t.cast(npt.NDArray[np.float32], vectors / np.where(norms == 0, 1, norms))
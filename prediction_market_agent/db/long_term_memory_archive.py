@@ -0,0 +1,119 @@
+import typing as t
+import uuid
+from datetime import date
+from pathlib import Path
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from prediction_market_agent_tooling.tools.utils import DatetimeUTC
+
+from prediction_market_agent.db import json_codec
+from prediction_market_agent.db.models import LongTermMemories
+
+ARCHIVE_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("task_description", pa.string()),
+        # Metadata of both DB columns (`metadata_json`, or legacy `metadata_` for rows that weren't backfilled)
+        # is archived as JSON text, `metadata_dict` of the loaded rows falls back to it.
+        ("metadata_", pa.string()),
+        ("datetime_", pa.timestamp("us", tz="UTC")),
+    ]
+)
+
+
+class LongTermMemoryArchive:
+    """
+    Cold tier of `long_term_memories`, see `LongTermMemoryTableHandler.archive_older_than`.
+
+    Rows are stored as zstd-compressed Parquet files partitioned by task description and day,
+    `<archive_dir>/task_description=<task>/date=<YYYY-MM-DD>/<uuid>.parquet`,
+    so that reading a time range opens only the files of the matching days.
+    """
+
+    def __init__(self, archive_dir: Path | str, compression: str = "zstd"):
+        self.archive_dir = Path(archive_dir)
+        self.compression = compression
+
+    def _task_dir(self, task_description: str) -> Path:
+        return self.archive_dir / f"task_description={quote(task_description, safe='')}"
+
+    def write(self, items: t.Sequence[LongTermMemories]) -> None:
+        """Appends the items to the archive, as one new file per task description and day."""
+        partitions: dict[tuple[str, date], list[LongTermMemories]] = {}
+        for item in items:
+            partitions.setdefault(
+                (item.task_description, item.datetime_.date()), []
+            ).append(item)
+
+        for (task_description, day), partition_items in partitions.items():
+            partition_dir = self._task_dir(task_description) / f"date={day.isoformat()}"
+            partition_dir.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pylist(
+                [
+                    {
+                        "id": item.id,
+                        "task_description": item.task_description,
+                        "metadata_": (
+                            json_codec.dumps(item.metadata_json)
+                            if item.metadata_json is not None
+                            else item.metadata_
+                        ),
+                        "datetime_": item.datetime_,
+                    }
+                    for item in partition_items
+                ],
+                schema=ARCHIVE_SCHEMA,
+            )
+            # Write to a temporary name first, so that readers never see a partially written file.
+            tmp_path = partition_dir / f".{uuid.uuid4().hex}.parquet.tmp"
+            pq.write_table(table, tmp_path, compression=self.compression)
+            tmp_path.rename(tmp_path.with_name(tmp_path.name[1:].removesuffix(".tmp")))
+
+    def read(
+        self,
+        task_description: str,
+        from_: DatetimeUTC | None = None,
+        to_: DatetimeUTC | None = None,
+    ) -> list[LongTermMemories]:
+        """Loads archived items of the task description within the datetime range (inclusive), newest first."""
+        task_dir = self._task_dir(task_description)
+        if not task_dir.exists():
+            return []
+
+        paths = [
+            path
+            for partition_dir in task_dir.glob("date=*")
+            if self._partition_in_range(partition_dir, from_, to_)
+            for path in partition_dir.glob("*.parquet")
+        ]
+        if not paths:
+            return []
+
+        table = pa.concat_tables(
+            pq.read_table(path, schema=ARCHIVE_SCHEMA) for path in paths
+        )
+        items = [
+            LongTermMemories(
+                id=row["id"],
+                task_description=row["task_description"],
+                metadata_=row["metadata_"],
+                datetime_=DatetimeUTC.from_datetime(row["datetime_"]),
+            )
+            for row in table.to_pylist()
+            if (from_ is None or row["datetime_"] >= from_)
+            and (to_ is None or row["datetime_"] <= to_)
+        ]
+        return sorted(items, key=lambda item: item.datetime_, reverse=True)
+
+    @staticmethod
+    def _partition_in_range(
+        partition_dir: Path, from_: DatetimeUTC | None, to_: DatetimeUTC | None
+    ) -> bool:
+        day = date.fromisoformat(partition_dir.name.removeprefix("date="))
+        if from_ is not None and day < from_.date():
+            return False
+        if to_ is not None and day > to_.date():
+            return False
+        return True
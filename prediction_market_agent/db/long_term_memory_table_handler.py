@@ -1,7 +1,11 @@
-import json
+import time
 import typing as t
+from contextlib import contextmanager
+from datetime import timezone
 
+from prediction_market_agent_tooling.loggers import logger
 from prediction_market_agent_tooling.tools.utils import DatetimeUTC, utcnow
+from sqlalchemy import Row
 from sqlalchemy.sql.elements import ColumnElement
 from sqlmodel import col
 
@@ -9,9 +13,60 @@ from prediction_market_agent.agents.identifiers import AgentIdentifier
 from prediction_market_agent.agents.microchain_agent.answer_with_scenario import (
     AnswerWithScenario,
 )
+from prediction_market_agent.db.async_sql_handler import AsyncSQLHandler
+from prediction_market_agent.db.long_term_memory_archive import LongTermMemoryArchive
 from prediction_market_agent.db.models import LongTermMemories
 from prediction_market_agent.db.sql_handler import SQLHandler
 
+MetadataFilters = dict[str, str | int | float | bool]
+
+
+def metadata_field_equals(
+    key: str, value: str | int | float | bool
+) -> ColumnElement[bool]:
+    """Builds SQL condition on a single field of `LongTermMemories.metadata_json`, e.g. `original_question` or `p_yes`."""
+    field = col(LongTermMemories.metadata_json)[key]
+    # Order matters, bool is a subclass of int.
+    if isinstance(value, bool):
+        condition = field.as_boolean() == value
+    elif isinstance(value, int):
+        condition = field.as_integer() == value
+    elif isinstance(value, float):
+        condition = field.as_float() == value
+    else:
+        condition = field.as_string() == value
+    # The JSON field is typed as `Any`, because `metadata_json` is a dict on the model.
+    return t.cast(ColumnElement[bool], condition)
+
+
+def build_long_term_memories(
+    task_description: str, history: list[dict[str, t.Any]]
+) -> list[LongTermMemories]:
+    return [
+        LongTermMemories(
+            task_description=task_description,
+            metadata_json=history_item,
+            datetime_=utcnow(),
+        )
+        for history_item in history
+    ]
+
+
+def get_long_term_memories_query_filters(
+    task_description: str,
+    from_: DatetimeUTC | None,
+    to_: DatetimeUTC | None,
+    metadata_filters: MetadataFilters | None = None,
+) -> list[ColumnElement[bool]]:
+    query_filters = [col(LongTermMemories.task_description) == task_description]
+    if from_ is not None:
+        query_filters.append(col(LongTermMemories.datetime_) >= from_)
+    if to_ is not None:
+        query_filters.append(col(LongTermMemories.datetime_) <= to_)
+    for key, value in (metadata_filters or {}).items():
+        query_filters.append(metadata_field_equals(key, value))
+    return query_filters
+
 
 class LongTermMemoryTableHandler:
     def __init__(self, task_description: str, sqlalchemy_db_url: str | None = None):
@@ -19,6 +74,11 @@ class LongTermMemoryTableHandler:
         self.sql_handler = SQLHandler(
             model=LongTermMemories, sqlalchemy_db_url=sqlalchemy_db_url
         )
+        # Write-behind buffer, active only inside of `buffered_writes`.
+        self._buffer: list[LongTermMemories] | None = None
+        self._buffer_max_size = 0
+        self._buffer_max_seconds = 0.0
+        self._buffer_started_at = 0.0
 
     @staticmethod
     def from_agent_identifier(
@@ -29,16 +89,53 @@ class LongTermMemoryTableHandler:
     def save_history(self, history: list[dict[str, t.Any]]) -> None:
         """Save item to storage. Note that score allows many types for easier handling by agent."""
 
-        history_items = [
-            LongTermMemories(
-                task_description=self.task_description,
-                metadata_=json.dumps(history_item),
-                datetime_=utcnow(),
-            )
-            for history_item in history
-        ]
+        history_items = build_long_term_memories(self.task_description, history)
+
+        if self._buffer is None:
+            self.sql_handler.save_multiple(history_items)
+            return
 
-        self.sql_handler.save_multiple(history_items)
+        if not self._buffer:
+            self._buffer_started_at = time.monotonic()
+        self._buffer.extend(history_items)
+        if (
+            len(self._buffer) >= self._buffer_max_size
+            or time.monotonic() - self._buffer_started_at >= self._buffer_max_seconds
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes all buffered items in a single transaction."""
+        if not self._buffer:
+            return
+        items, self._buffer = self._buffer, []
+        self.sql_handler.save_multiple(items)
+
+    @contextmanager
+    def buffered_writes(
+        self, max_size: int = 100, max_seconds: float = 60.0
+    ) -> t.Generator[None, None, None]:
+        """
+        Within this context, saved items are collected and written together once `max_size` items are buffered
+        or the oldest buffered item is older than `max_seconds`. Whatever is left is written on exit, even on error.
+        There is no background timer, both limits are checked only when an item is saved, so items can stay
+        in the buffer longer than `max_seconds` if nothing else is saved before the context exits.
+        """
+        if self._buffer is not None:
+            # Already buffering, the outer context will take care of flushing.
+            yield
+            return
+
+        self._buffer = []
+        self._buffer_max_size = max_size
+        self._buffer_max_seconds = max_seconds
+        try:
+            yield
+        finally:
+            try:
+                self.flush()
+            finally:
+                self._buffer = None
 
     def save_answer_with_scenario(
         self, answer_with_scenario: AnswerWithScenario
@@ -46,35 +143,207 @@ class LongTermMemoryTableHandler:
         return self.save_history([answer_with_scenario.model_dump()])
 
     def _get_query_filters(
-        self, from_: DatetimeUTC | None, to_: DatetimeUTC | None
+        self,
+        from_: DatetimeUTC | None,
+        to_: DatetimeUTC | None,
+        metadata_filters: MetadataFilters | None = None,
     ) -> list[ColumnElement[bool]]:
-        query_filters = [
-            col(LongTermMemories.task_description) == self.task_description
-        ]
-        if from_ is not None:
-            query_filters.append(col(LongTermMemories.datetime_) >= from_)
-        if to_ is not None:
-            query_filters.append(col(LongTermMemories.datetime_) <= to_)
-        return query_filters
+        return get_long_term_memories_query_filters(
+            self.task_description, from_, to_, metadata_filters
+        )
 
+    @t.overload
     def search(
         self,
         from_: DatetimeUTC | None = None,
         to_: DatetimeUTC | None = None,
         offset: int = 0,
         limit: int | None = None,
+        metadata_filters: MetadataFilters | None = None,
+        columns: None = None,
     ) -> list[LongTermMemories]:
+        ...
+
+    @t.overload
+    def search(
+        self,
+        from_: DatetimeUTC | None = None,
+        to_: DatetimeUTC | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+        metadata_filters: MetadataFilters | None = None,
+        *,
+        columns: t.Sequence[str],
+    ) -> list[Row[t.Any]]:
+        ...
+
+    def search(
+        self,
+        from_: DatetimeUTC | None = None,
+        to_: DatetimeUTC | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+        metadata_filters: MetadataFilters | None = None,
+        columns: t.Sequence[str] | None = None,
+    ) -> list[LongTermMemories] | list[Row[t.Any]]:
         """Searches the LongTermMemoryTableHandler for entries within a specified datetime range that match
-        self.task_description."""
-        query_filters = self._get_query_filters(from_, to_)
+        self.task_description and, optionally, have the given values in their metadata (evaluated in SQL).
+        If `columns` are given, returns rows of only those columns instead of the models, e.g. `["datetime_", "metadata_json"]`.
+        """
+        query_filters = self._get_query_filters(from_, to_, metadata_filters)
+        order_by_column_name = LongTermMemories.datetime_.key  # type: ignore[attr-defined]
+        if columns is not None:
+            return self.sql_handler.get_columns_with_filter_and_order(
+                column_names=columns,
+                query_filters=query_filters,
+                order_by_column_name=order_by_column_name,
+                order_desc=True,
+                offset=offset,
+                limit=limit,
+            )
         return self.sql_handler.get_with_filter_and_order(
             query_filters=query_filters,
-            order_by_column_name=LongTermMemories.datetime_.key,  # type: ignore[attr-defined]
+            order_by_column_name=order_by_column_name,
             order_desc=True,
             offset=offset,
             limit=limit,
         )
 
+    def iterate(
+        self,
+        from_: DatetimeUTC | None = None,
+        to_: DatetimeUTC | None = None,
+        page_size: int = 1000,
+        metadata_filters: MetadataFilters | None = None,
+    ) -> t.Iterator[LongTermMemories]:
+        """Same as `search`, but streams the entries from newest to oldest page by page,
+        so that the whole history can be walked without loading it into memory."""
+        query_filters = self._get_query_filters(from_, to_, metadata_filters)
+        return self.sql_handler.iterate_with_filter_and_keyset(
+            query_filters=query_filters,
+            order_by_column_name=LongTermMemories.datetime_.key,  # type: ignore[attr-defined]
+            order_desc=True,
+            page_size=page_size,
+        )
+
     def count(self) -> int:
         query_filters = self._get_query_filters(None, None)
         return self.sql_handler.count(query_filters=query_filters)
+
+    def archive_older_than(
+        self,
+        archive: LongTermMemoryArchive,
+        older_than: DatetimeUTC,
+        batch_size: int = 10_000,
+    ) -> int:
+        """
+        Moves entries older than `older_than` from the database to the archive, oldest first, `batch_size` at a time.
+        Every batch is written to the archive before it's deleted from the database, so an interrupted run
+        can leave some entries in both tiers, but never loses them. Returns the number of moved entries.
+        """
+        query_filters = self._get_query_filters(None, None) + [
+            col(LongTermMemories.datetime_) < older_than
+        ]
+        n_archived = 0
+        while True:
+            batch: list[LongTermMemories] = self.sql_handler.get_with_filter_and_order(
+                query_filters=query_filters,
+                order_by_column_name=LongTermMemories.datetime_.key,  # type: ignore[attr-defined]
+                order_desc=False,
+                limit=batch_size,
+            )
+            if not batch:
+                break
+            archive.write(batch)
+            self.sql_handler.delete_where(
+                [col(LongTermMemories.id).in_([item.id for item in batch])]
+            )
+            n_archived += len(batch)
+            logger.info(
+                f"Archived {n_archived} entries of {self.task_description} older than {older_than}."
+            )
+        return n_archived
+
+    def search_including_archive(
+        self,
+        archive: LongTermMemoryArchive,
+        from_: DatetimeUTC | None = None,
+        to_: DatetimeUTC | None = None,
+        metadata_filters: MetadataFilters | None = None,
+    ) -> list[LongTermMemories]:
+        """Same as `search`, but also includes the archived entries, for historical analysis.
+        Metadata filters are evaluated in Python for the archived entries."""
+        items = {
+            item.id: item
+            for item in archive.read(self.task_description, from_, to_)
+            if all(
+                (item.metadata_dict or {}).get(key) == value
+                for key, value in (metadata_filters or {}).items()
+            )
+        }
+        # Entries present in both tiers (after an interrupted archival) are taken from the database.
+        items.update(
+            (item.id, item)
+            for item in self.search(
+                from_=from_, to_=to_, metadata_filters=metadata_filters
+            )
+        )
+        # SQLite returns naive datetimes, that are in UTC as well.
+        return sorted(
+            items.values(),
+            key=lambda item: item.datetime_.replace(
+                tzinfo=item.datetime_.tzinfo or timezone.utc
+            ),
+            reverse=True,
+        )
+
+
+class AsyncLongTermMemoryTableHandler:
+    """Async version of `LongTermMemoryTableHandler`, for use from within the agent's event loop."""
+
+    def __init__(self, task_description: str, sqlalchemy_db_url: str | None = None):
+        self.task_description = task_description
+        self.sql_handler = AsyncSQLHandler(
+            model=LongTermMemories, sqlalchemy_db_url=sqlalchemy_db_url
+        )
+
+    @staticmethod
+    def from_agent_identifier(
+        identifier: AgentIdentifier,
+    ) -> "AsyncLongTermMemoryTableHandler":
+        return AsyncLongTermMemoryTableHandler(task_description=identifier)
+
+    async def save_history(self, history: list[dict[str, t.Any]]) -> None:
+        await self.sql_handler.save_multiple(
+            build_long_term_memories(self.task_description, history)
+        )
+
+    async def save_answer_with_scenario(
+        self, answer_with_scenario: AnswerWithScenario
+    ) -> None:
+        await self.save_history([answer_with_scenario.model_dump()])
+
+    async def search(
+        self,
+        from_: DatetimeUTC | None = None,
+        to_: DatetimeUTC | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+        metadata_filters: MetadataFilters | None = None,
+    ) -> list[LongTermMemories]:
+        return await self.sql_handler.get_with_filter_and_order(
+            query_filters=get_long_term_memories_query_filters(
+                self.task_description, from_, to_, metadata_filters
+            ),
+            order_by_column_name=LongTermMemories.datetime_.key,  # type: ignore[attr-defined]
+            order_desc=True,
+            offset=offset,
+            limit=limit,
+        )
+
+    async def count(self) -> int:
+        return await self.sql_handler.count(
+            query_filters=get_long_term_memories_query_filters(
+                self.task_description, None, None
+            )
+        )
@@ -1,31 +1,54 @@
-import json
 from functools import cached_property
 from typing import Any, Optional
 
 from prediction_market_agent_tooling.gtypes import xDaiWei
 from prediction_market_agent_tooling.loggers import logger
 from prediction_market_agent_tooling.tools.utils import DatetimeUTC
-from sqlalchemy import Column, Numeric
+from sqlalchemy import JSON, Column, Index, Numeric
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import Field, SQLModel
 
 from prediction_market_agent.agents.microchain_agent.nft_treasury_game.game_history import (
     NFTGameRound,
 )
+from prediction_market_agent.db import json_codec
 
 
 class LongTermMemories(SQLModel, table=True):
     __tablename__ = "long_term_memories"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index(
+            "ix_long_term_memories_task_description_datetime_",
+            "task_description",
+            "datetime_",
+        ),
+        {"extend_existing": True},
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     task_description: str
+    # Legacy text column, no longer written. It's read only for rows created before `metadata_json` existed,
+    # and can be dropped once `scripts/migrate_long_term_memories_to_json.py` has backfilled them everywhere.
     metadata_: Optional[str] = None
+    # Native JSON column (JSONB on Postgres), allows filtering on the metadata fields directly in SQL.
+    # Added to existing tables by `scripts/migrate_db_schema.py`, that the container runs before the agent.
+    metadata_json: Optional[dict[str, Any]] = Field(
+        default=None,
+        sa_column=Column(
+            JSON(none_as_null=True).with_variant(
+                JSONB(none_as_null=True), "postgresql"
+            ),
+            nullable=True,
+        ),
+    )
     datetime_: DatetimeUTC
 
     @cached_property
     def metadata_dict(self) -> dict[str, Any] | None:
+        if self.metadata_json is not None:
+            return self.metadata_json
         try:
             out: dict[str, Any] | None = (
-                json.loads(self.metadata_) if self.metadata_ else None
+                json_codec.loads(self.metadata_) if self.metadata_ else None
             )
             return out
         except Exception as e:
@@ -39,9 +62,12 @@ class Prompt(SQLModel, table=True):
     """Checkpoint for general agent's prompts, as a way to restore its past progress."""
 
     __tablename__ = "prompts"
-    __table_args__ = {
-        "extend_existing": True
-    }  # required if initializing an existing table
+    __table_args__ = (
+        Index(
+            "ix_prompts_session_identifier_datetime_", "session_identifier", "datetime_"
+        ),
+        {"extend_existing": True},  # required if initializing an existing table
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     prompt: str
     # This allows for future distinction between user sessions, if prompts from a specific
@@ -57,7 +83,10 @@ class EvaluatedGoalModel(SQLModel, table=True):
     """
 
     __tablename__ = "evaluated_goals"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_evaluated_goals_agent_id_datetime_", "agent_id", "datetime_"),
+        {"extend_existing": True},
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     agent_id: str  # Per-agent identifier
     goal: str
@@ -103,9 +132,10 @@ class ReportNFTGame(SQLModel, table=True):
     """Reports summarizing activities that took place during the NFT game."""
 
     __tablename__ = "report_nft_game"
-    __table_args__ = {
-        "extend_existing": True,
-    }
+    __table_args__ = (
+        Index("ix_report_nft_game_game_round_id", "game_round_id"),
+        {"extend_existing": True},
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     game_round_id: int = Field(foreign_key=f"{NFTGameRound.__tablename__}.id")
     agent_id: Optional[
@@ -133,3 +163,28 @@ class ReplicatedMarket(SQLModel, table=True):
         unique=True, nullable=False
     )  # We don't replicate the parent market, not even across multiple platforms.
     copied_market_title: str = Field(nullable=False)
+
+
+class EmbeddingCacheEntry(SQLModel, table=True):
+    """Embedding of a text, see `CachedEmbeddings`. Kept in a local SQLite file by default, not in the shared database."""
+
+    __tablename__ = "embedding_cache"
+    __table_args__ = {
+        "extend_existing": True,
+    }
+    model: str = Field(primary_key=True)  # Name of the embedding model.
+    text_hash: str = Field(primary_key=True)  # `encode_text` of the embedded text.
+    vector: bytes  # float16 values.
+
+
+class VectorIndexSyncState(SQLModel, table=True):
+    """How far the markets are synced into a vector index, see `PineconeHandler.sync_omen_markets`."""
+
+    __tablename__ = "vector_index_sync_state"
+    __table_args__ = {
+        "extend_existing": True,
+    }
+    index_name: str = Field(primary_key=True)
+    # Creation time of the newest market inserted so far (high-water mark).
+    last_market_created_timestamp: int
+    last_full_sync_timestamp: int
@@ -1,12 +1,19 @@
-import hashlib
 import sys
 import typing as t
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from pathlib import Path
 from typing import Optional
 
+import numpy as np
+import pandas as pd
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStore
 from langchain_openai import OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from pinecone import Index, Pinecone
+from pinecone.exceptions import NotFoundException
 from prediction_market_agent_tooling.loggers import logger
 from prediction_market_agent_tooling.markets.agent_market import FilterBy, SortBy
 from prediction_market_agent_tooling.markets.omen.data_models import OmenMarket
@@ -14,66 +21,196 @@ from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
     OmenSubgraphHandler,
 )
 from prediction_market_agent_tooling.tools.datetime_utc import DatetimeUTC
+from prediction_market_agent_tooling.tools.utils import utcnow
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from tqdm import tqdm
 
 from prediction_market_agent.agents.think_thoroughly_agent.models import (
     PineconeMetadata,
 )
+from prediction_market_agent.db.bloom_filter import BloomFilter
+from prediction_market_agent.db.embedding_cache import CachedEmbeddings, encode_text
+from prediction_market_agent.db.local_vector_store import (
+    LocalVectorStore,
+    VectorQuantization,
+)
+from prediction_market_agent.db.models import VectorIndexSyncState
+from prediction_market_agent.db.vector_index_sync_state_table_handler import (
+    VectorIndexSyncStateTableHandler,
+)
+from prediction_market_agent.tools.rate_limiter import RateLimiter
 from prediction_market_agent.utils import APIKeys
 
 INDEX_NAME = "omen-index-text-embeddings-3-large"
+# Metadata key under which `PineconeVectorStore` stores the text itself.
+PINECONE_TEXT_KEY = "text"
 T = t.TypeVar("T")
 
 
+class VectorIndexSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_file=".env", env_file_encoding="utf-8", extra="ignore"
+    )
+    # If set, the local index in this directory is used instead of the hosted Pinecone index.
+    LOCAL_VECTOR_INDEX_DIR: t.Optional[Path] = None
+    # Where `CachedEmbeddings` keeps the computed embeddings, e.g. `DEFAULT_EMBEDDING_CACHE_DB_URL`, the cache is off if not set.
+    EMBEDDING_CACHE_DB_URL: t.Optional[str] = None
+    # Bloom filter of the ids known to be in the Pinecone index, see `PineconeHandler.get_ids_in_index`.
+    # Defaults to `.<index host>.known-ids.bloom`, the host identifies the index together with its project and environment.
+    KNOWN_IDS_FILTER_PATH: t.Optional[Path] = None
+    # Number of ids the filter is sized for, a warning is logged once it's exceeded. Changing it requires deleting the file.
+    KNOWN_IDS_FILTER_CAPACITY: int = 1_000_000
+    # Shortened embeddings, e.g. 256 instead of the 3072 dimensions of `text-embedding-3-large`.
+    # With the hosted index, they go to `<INDEX_NAME>-<dimensions>`, that has to be created beforehand
+    # in the Pinecone console, with this dimension and the cosine metric. `PineconeHandler` checks it on start.
+    EMBEDDING_DIMENSIONS: t.Optional[int] = None
+    LOCAL_VECTOR_INDEX_QUANTIZATION: VectorQuantization = "float32"
+    BULK_INSERT_MAX_CONCURRENT_CHUNKS: int = 4
+    # Limit of the embedding and upsert requests of bulk inserts, e.g. to stay within the OpenAI rate limits.
+    BULK_INSERT_REQUESTS_PER_MINUTE: t.Optional[float] = None
+
+
 class PineconeHandler:
     vectorstore: VectorStore
     pc: Pinecone
     index: Index
+    known_ids: BloomFilter | None = None
 
-    def __init__(self, model: str = "text-embedding-3-large") -> None:
+    # Number of ids per fetch request, keeps the request URL short enough.
+    FETCH_BATCH_SIZE = 200
+    # Number of vectors per upsert request, same as `PineconeVectorStore.add_texts`.
+    # Keeps full-size embeddings (~60 kB each as JSON) below the 2 MB request limit of Pinecone.
+    UPSERT_BATCH_SIZE = 32
+    # Number of query requests of `query_by_vectors` in flight at once.
+    QUERY_MAX_CONCURRENT_REQUESTS = 8
+
+    def __init__(
+        self,
+        model: str = "text-embedding-3-large",
+        embeddings: Embeddings | None = None,
+        dimensions: int | None = None,
+    ) -> None:
+        """
+        With `dimensions`, the model returns shortened embeddings (supported by the `text-embedding-3` models),
+        they are stored in a separate index, `<INDEX_NAME>-<dimensions>`, that needs to be created with that dimension.
+        Raises `ValueError` if that index doesn't exist or has a different dimension.
+        """
         self.keys = APIKeys()
         self.model = model
-        self.embeddings = OpenAIEmbeddings(
-            openai_api_key=self.keys.openai_api_key,
-            model=model,
-        )
+        self.dimensions = dimensions
+        self.embeddings = embeddings or self.build_embeddings()
         self.build_pinecone()
         self.build_vectorstore()
 
+    def build_embeddings(self) -> Embeddings:
+        embeddings = OpenAIEmbeddings(
+            openai_api_key=self.keys.openai_api_key,
+            model=self.model,
+            dimensions=self.dimensions,
+        )
+        embedding_cache_db_url = VectorIndexSettings().EMBEDDING_CACHE_DB_URL
+        if not embedding_cache_db_url:
+            return embeddings
+        return CachedEmbeddings(
+            embeddings,
+            model=(
+                self.model
+                if self.dimensions is None
+                else f"{self.model}-{self.dimensions}"
+            ),
+            sqlalchemy_db_url=embedding_cache_db_url,
+        )
+
     def build_pinecone(self) -> None:
         self.pc = Pinecone(api_key=self.keys.pinecone_api_key.get_secret_value())
-        self.index = self.pc.Index(INDEX_NAME)
+        try:
+            index_description = self.pc.describe_index(self.index_name)
+        except NotFoundException as e:
+            raise ValueError(
+                f"Pinecone index {self.index_name} doesn't exist."
+                + (
+                    f" Indexes of shortened embeddings are created by hand, create it with dimension {self.dimensions} and the cosine metric."
+                    if self.dimensions is not None
+                    else ""
+                )
+            ) from e
+        if (
+            self.dimensions is not None
+            and index_description.dimension != self.dimensions
+        ):
+            raise ValueError(
+                f"Pinecone index {self.index_name} has dimension {index_description.dimension}, but the embeddings have {self.dimensions}."
+            )
+        self.index = self.pc.Index(host=index_description.host)
+        settings = VectorIndexSettings()
+        self.known_ids = BloomFilter(
+            settings.KNOWN_IDS_FILTER_PATH
+            or Path(f".{index_description.host}.known-ids.bloom"),
+            capacity=settings.KNOWN_IDS_FILTER_CAPACITY,
+        )
 
     def build_vectorstore(self) -> None:
         self.vectorstore = PineconeVectorStore(
             pinecone_api_key=self.keys.pinecone_api_key.get_secret_value(),
             embedding=self.embeddings,
-            index_name=INDEX_NAME,
+            index_name=self.index_name,
+        )
+
+    @property
+    def index_name(self) -> str:
+        return (
+            INDEX_NAME if self.dimensions is None else f"{INDEX_NAME}-{self.dimensions}"
         )
 
     def encode_text(self, text: str) -> str:
         """Encodes string using sha-256 and returns it as string"""
-        # We use SHA-256 for generating IDs with fixed length.
-        return hashlib.sha256(text.encode()).hexdigest()
+        return encode_text(text)
 
     def filter_markets_already_in_index(
         self, markets: list[OmenMarket]
     ) -> list[OmenMarket]:
         """
         This function filters out markets based on the market_title attribute of each market.
-        It derives the ID of each market by encoding the market_title using base64 and
+        It derives the ID of each market by encoding the market_title using sha-256 and
         then checks for the existence of these IDs in the index.
 
         The function then returns a list of markets that are not present in the index.
 
         """
         ids_market_map = {self.encode_text(m.question_title): m for m in markets}
-        all_ids = list(ids_market_map.keys())
-        ids_in_vec_db = self.get_existing_ids_in_index()
-        missing_ids = set(all_ids).difference(ids_in_vec_db)
-        filtered_markets = [ids_market_map[id] for id in missing_ids]
+        ids_in_vec_db = self.get_ids_in_index(list(ids_market_map.keys()))
+        filtered_markets = [
+            market for id, market in ids_market_map.items() if id not in ids_in_vec_db
+        ]
         return filtered_markets
 
+    def get_ids_in_index(self, ids: list[str]) -> set[str]:
+        """
+        Returns those of `ids` that are in the index. Unlike `get_existing_ids_in_index`, the cost depends only on the number of given ids,
+        not on the size of the index: ids already seen by this machine are answered by the local Bloom filter
+        (false positive rate of about 1e-6), the rest is fetched from the index in batches.
+        The filter isn't told when the index is cleared or recreated, so it's rebuilt by every full sync, see `sync_omen_markets`.
+        """
+        known_ids = (
+            {id for id in ids if id in self.known_ids}
+            if self.known_ids is not None
+            else set()
+        )
+        unknown_ids = [id for id in ids if id not in known_ids]
+
+        found_ids: set[str] = set()
+        for ids_chunk in self.chunks(unknown_ids, self.FETCH_BATCH_SIZE):
+            found_ids.update(self.index.fetch(ids=ids_chunk).vectors.keys())
+
+        # Remember also the ids inserted by others, so they aren't fetched again.
+        self._remember_ids(found_ids)
+        return known_ids | found_ids
+
+    def _remember_ids(self, ids: t.Iterable[str]) -> None:
+        if self.known_ids is not None:
+            self.known_ids.add(ids)
+            self.known_ids.flush()
+
     def get_existing_ids_in_index(self) -> list[str]:
         # index.list() returns [[id1,id2,...],[id4,id5,...]], hence the flattening.
         ids_in_vec_db = [y for x in self.index.list() for y in x]
@@ -90,6 +227,86 @@ class PineconeHandler:
             ids=ids,
             metadatas=metadatas,
         )
+        self._remember_ids(ids)
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def upsert_embeddings(
+        self,
+        ids: list[str],
+        texts: list[str],
+        embeddings: list[list[float]],
+        metadatas: Optional[list[dict[str, t.Any]]] = None,
+    ) -> None:
+        """Same as `insert_texts`, with embeddings computed beforehand by `embed_texts`."""
+        vectors: list[dict[str, t.Any]] = []
+        for i, (id, text, embedding) in enumerate(zip(ids, texts, embeddings)):
+            metadata: dict[str, t.Any] = dict(metadatas[i]) if metadatas else {}
+            # Stored the same way as by `PineconeVectorStore`, so that it can read these back.
+            metadata[PINECONE_TEXT_KEY] = text
+            vectors.append({"id": id, "values": embedding, "metadata": metadata})
+        self.index.upsert(
+            vectors=vectors, batch_size=self.UPSERT_BATCH_SIZE, show_progress=False
+        )
+        self._remember_ids(ids)
+
+    def bulk_insert_texts(
+        self,
+        ids: list[str],
+        texts: list[str],
+        metadatas: list[dict[str, t.Any]],
+        chunk_size: int = 100,
+        max_concurrent_chunks: int = 4,
+        requests_per_minute: float | None = None,
+    ) -> None:
+        """
+        Pipelined `insert_texts` for large inserts. Every chunk is embedded and then upserted by one of `max_concurrent_chunks` workers,
+        so the next chunks are being embedded while the previous ones are being upserted.
+        If `requests_per_minute` is set, the embedding and upsert requests together are spaced to stay below it,
+        counting one embedding request per chunk and one upsert request per `UPSERT_BATCH_SIZE` vectors.
+
+        Upserted ids are remembered right after each chunk (see `get_ids_in_index`), which acts as a checkpoint:
+        after an interruption, the next run skips the markets inserted so far and continues with the rest.
+        """
+        rate_limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+
+        def insert_chunk(
+            chunk: tuple[list[str], list[str], list[dict[str, t.Any]]]
+        ) -> None:
+            ids_chunk, text_chunk, metadata_chunk = chunk
+            if rate_limiter:
+                rate_limiter.wait()
+            embeddings = self.embed_texts(text_chunk)
+            logger.debug(f"Inserting {len(text_chunk)} into the vector database.")
+            # One `upsert_embeddings` call per upsert request, so that each of them goes through the rate limiter.
+            for start in range(0, len(ids_chunk), self.UPSERT_BATCH_SIZE):
+                end = start + self.UPSERT_BATCH_SIZE
+                if rate_limiter:
+                    rate_limiter.wait()
+                self.upsert_embeddings(
+                    ids_chunk[start:end],
+                    text_chunk[start:end],
+                    embeddings[start:end],
+                    metadata_chunk[start:end],
+                )
+
+        chunks = list(
+            zip(
+                self.chunks(ids, chunk_size),
+                self.chunks(texts, chunk_size),
+                self.chunks(metadatas, chunk_size),
+            )
+        )
+        with ThreadPoolExecutor(max_workers=max_concurrent_chunks) as executor:
+            futures = [executor.submit(insert_chunk, chunk) for chunk in chunks]
+            try:
+                for future in tqdm(as_completed(futures), total=len(futures)):
+                    future.result()
+            except BaseException:
+                # Don't start the remaining chunks, the next run will pick them up.
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
 
     @staticmethod
     def chunks(array: list[T], n_elements: int) -> t.Generator[list[T], None, None]:
@@ -99,22 +316,38 @@ class PineconeHandler:
 
     @staticmethod
     def deduplicate_markets(markets: list[OmenMarket]) -> list[OmenMarket]:
-        unique_market_titles: dict[str, OmenMarket] = {}
-        for market in markets:
-            if (
-                market.title not in unique_market_titles
-                or unique_market_titles[market.title].collateralVolume
-                < market.collateralVolume
-            ):
-                unique_market_titles[market.question_title] = market
-
-        return list(unique_market_titles.values())
+        """
+        Keeps one market per question title, the one with the highest `collateralVolume` (the first one on ties),
+        in the original order. Titles are compared case-insensitively and with collapsed whitespace,
+        so near-identical re-posts of a question aren't embedded and stored again.
+        """
+        if not markets:
+            return []
+        df = pd.DataFrame(
+            {
+                # Plain `str` methods, several times faster than the regex-based `Series.str` equivalents.
+                "title": [
+                    " ".join(m.question_title.casefold().split()) for m in markets
+                ],
+                # Float is precise enough for ranking and avoids int64 overflow of Wei amounts.
+                "volume": np.array(
+                    [float(m.collateralVolume.value) for m in markets],
+                    dtype=np.float64,
+                ),
+            }
+        )
+        kept = (
+            df.sort_values("volume", ascending=False, kind="stable")
+            .drop_duplicates("title")
+            .index
+        )
+        return [markets[i] for i in np.sort(kept)]
 
     def insert_all_omen_markets_if_not_exists(
         self, created_after: DatetimeUTC | None = None
-    ) -> None:
+    ) -> DatetimeUTC | None:
         """We use the agent's run to add embeddings of new markets that don't exist yet in the
-        vector DB."""
+        vector DB. Returns the creation time of the newest fetched market, if any."""
         subgraph_handler = OmenSubgraphHandler()
         markets = subgraph_handler.get_omen_markets_simple(
             limit=sys.maxsize,
@@ -135,17 +368,69 @@ class PineconeHandler:
             metadatas.append(PineconeMetadata.from_omen_market(m).model_dump())
 
         if texts:
-            n_elements = 100
-            chunked_texts = list(self.chunks(texts, n_elements))
-            chunked_metadatas = list(self.chunks(metadatas, n_elements))
-            for text_chunk, metadata_chunk in tqdm(
-                zip(chunked_texts, chunked_metadatas), total=len(chunked_texts)
-            ):
-                ids_chunk = [self.encode_text(text) for text in text_chunk]
-                logger.debug(f"Inserting {len(text_chunk)} into the vector database.")
-                self.insert_texts(
-                    ids=ids_chunk, texts=text_chunk, metadatas=metadata_chunk
+            settings = VectorIndexSettings()
+            self.bulk_insert_texts(
+                ids=[self.encode_text(text) for text in texts],
+                texts=texts,
+                metadatas=metadatas,
+                max_concurrent_chunks=settings.BULK_INSERT_MAX_CONCURRENT_CHUNKS,
+                requests_per_minute=settings.BULK_INSERT_REQUESTS_PER_MINUTE,
+            )
+
+        return max((m.creation_datetime for m in markets), default=None)
+
+    def sync_omen_markets(
+        self,
+        full_sync_interval: timedelta = timedelta(days=7),
+        overlap: timedelta = timedelta(hours=1),
+        sqlalchemy_db_url: str | None = None,
+    ) -> None:
+        """
+        Inserts only the markets created since the newest market of the previous sync (minus `overlap`,
+        to cover markets that the subgraph indexed late), instead of scanning all markets every time.
+        The high-water mark is kept in the SQL database, per index.
+        The first sync, and then one every `full_sync_interval`, goes through all markets to reconcile anything missed.
+        It also rebuilds the filter of known ids from the index, so ids of a cleared or recreated index are inserted again.
+        """
+        sync_state_handler = VectorIndexSyncStateTableHandler(
+            sqlalchemy_db_url=sqlalchemy_db_url
+        )
+        state = sync_state_handler.get(self.index_name)
+        now = utcnow()
+
+        if (
+            state is None
+            or now - DatetimeUTC.to_datetime_utc(state.last_full_sync_timestamp)
+            >= full_sync_interval
+        ):
+            logger.info(f"Running full sync of markets into {self.index_name}.")
+            if self.known_ids is not None:
+                self.known_ids.clear()
+                self.known_ids.flush()
+            newest_created_time = self.insert_all_omen_markets_if_not_exists()
+            last_full_sync_timestamp = int(now.timestamp())
+        else:
+            newest_created_time = self.insert_all_omen_markets_if_not_exists(
+                created_after=DatetimeUTC.to_datetime_utc(
+                    state.last_market_created_timestamp
                 )
+                - overlap
+            )
+            last_full_sync_timestamp = state.last_full_sync_timestamp
+
+        if newest_created_time is None and state is None:
+            # Nothing indexed yet, next run is a full sync again.
+            return
+        sync_state_handler.save(
+            VectorIndexSyncState(
+                index_name=self.index_name,
+                last_market_created_timestamp=max(
+                    int(newest_created_time.timestamp()) if newest_created_time else 0,
+                    state.last_market_created_timestamp if state else 0,
+                ),
+                last_full_sync_timestamp=last_full_sync_timestamp,
+            )
+        )
 
     def find_nearest_questions_with_threshold(
         self,
@@ -167,3 +452,135 @@ class PineconeHandler:
             PineconeMetadata.model_validate(doc.metadata)
             for doc, score in documents_and_scores
         ]
+
+    def find_nearest_questions_batch(
+        self,
+        texts: list[str],
+        limit: int,
+        threshold: float = 0.25,
+        filter_on_metadata: dict[str, dict[str, t.Any]] | None = None,
+    ) -> list[list[PineconeMetadata]]:
+        """
+        Same as `find_nearest_questions_with_threshold`, but for many texts at once, results are in the order of `texts`.
+        All texts are embedded in a single request, then the index is queried once per text, see `query_by_vectors`.
+        """
+        if not texts:
+            return []
+        documents_and_scores = self.query_by_vectors(
+            self.embed_texts(texts), k=limit, filter=filter_on_metadata
+        )
+        return [
+            [
+                PineconeMetadata.model_validate(doc.metadata)
+                for doc, score in text_documents_and_scores
+                if self.relevance_score(score) >= threshold
+            ]
+            for text_documents_and_scores in documents_and_scores
+        ]
+
+    @staticmethod
+    def relevance_score(score: float) -> float:
+        """
+        Maps the cosine similarity returned by `query_by_vectors`, in [-1, 1], to the [0, 1] relevance score
+        that `similarity_search_with_relevance_scores` compares with its `score_threshold`.
+        """
+        return (score + 1) / 2
+
+    def query_by_vectors(
+        self,
+        embeddings: list[list[float]],
+        k: int,
+        filter: dict[str, t.Any] | None = None,
+    ) -> list[list[tuple[Document, float]]]:
+        """
+        Pinecone has no batch query, so the requests are sent from up to `QUERY_MAX_CONCURRENT_REQUESTS` threads of this process.
+        Not `par_map`, its worker processes would need the vector store pickled, and its clients hold locks.
+        """
+        vectorstore = t.cast(PineconeVectorStore, self.vectorstore)
+        with ThreadPoolExecutor(
+            max_workers=self.QUERY_MAX_CONCURRENT_REQUESTS
+        ) as executor:
+            return list(
+                executor.map(
+                    lambda embedding: vectorstore.similarity_search_by_vector_with_score(
+                        embedding, k=k, filter=filter
+                    ),
+                    embeddings,
+                )
+            )
+
+
+class LocalPineconeHandler(PineconeHandler):
+    """
+    `PineconeHandler` backed by `LocalVectorStore` in `index_dir` instead of the hosted index,
+    queries don't leave the machine. For fully offline runs (tests, benchmarks), pass a deterministic stand-in
+    for the embeddings, e.g. `DeterministicFakeEmbedding` from `langchain_core.embeddings`.
+    E.g. with `dimensions=256` and `quantization="int8"`, a vector takes 260 bytes instead of 12 kB of the full float32 embedding,
+    see `scripts/evaluate_vector_index_compression.py` for the effect on recall.
+    """
+
+    vectorstore: LocalVectorStore
+
+    def __init__(
+        self,
+        index_dir: Path | str,
+        model: str = "text-embedding-3-large",
+        embeddings: Embeddings | None = None,
+        dimensions: int | None = None,
+        quantization: VectorQuantization = "float32",
+    ) -> None:
+        self.index_dir = Path(index_dir)
+        self.quantization = quantization
+        super().__init__(model=model, embeddings=embeddings, dimensions=dimensions)
+
+    @property
+    def index_name(self) -> str:
+        return f"local:{self.index_dir.resolve()}"
+
+    def build_pinecone(self) -> None:
+        # Nothing to connect to.
+        pass
+
+    def build_vectorstore(self) -> None:
+        self.vectorstore = LocalVectorStore(
+            embedding=self.embeddings,
+            index_dir=self.index_dir,
+            quantization=self.quantization,
+        )
+
+    def get_existing_ids_in_index(self) -> list[str]:
+        return self.vectorstore.get_ids()
+
+    def get_ids_in_index(self, ids: list[str]) -> set[str]:
+        return {id for id in ids if id in self.vectorstore}
+
+    def upsert_embeddings(
+        self,
+        ids: list[str],
+        texts: list[str],
+        embeddings: list[list[float]],
+        metadatas: Optional[list[dict[str, t.Any]]] = None,
+    ) -> None:
+        self.vectorstore.add_embeddings(texts, embeddings, metadatas, ids=ids)
+
+    def query_by_vectors(
+        self,
+        embeddings: list[list[float]],
+        k: int,
+        filter: dict[str, t.Any] | None = None,
+    ) -> list[list[tuple[Document, float]]]:
+        return self.vectorstore.similarity_search_by_vectors_with_score(
+            embeddings, k=k, filter=filter
+        )
+
+
+def build_pinecone_handler() -> PineconeHandler:
+    """Local index if `LOCAL_VECTOR_INDEX_DIR` is set, the hosted Pinecone index otherwise."""
+    settings = VectorIndexSettings()
+    if settings.LOCAL_VECTOR_INDEX_DIR is not None:
+        return LocalPineconeHandler(
+            index_dir=settings.LOCAL_VECTOR_INDEX_DIR,
+            dimensions=settings.EMBEDDING_DIMENSIONS,
+            quantization=settings.LOCAL_VECTOR_INDEX_QUANTIZATION,
+        )
+    return PineconeHandler(dimensions=settings.EMBEDDING_DIMENSIONS)
@@ -4,6 +4,7 @@ from prediction_market_agent_tooling.tools.utils import utcnow
 from sqlmodel import col
 
 from prediction_market_agent.agents.identifiers import AgentIdentifier
+from prediction_market_agent.db.async_sql_handler import AsyncSQLHandler
 from prediction_market_agent.db.models import Prompt
 from prediction_market_agent.db.sql_handler import SQLHandler
 
@@ -44,3 +45,42 @@ class PromptTableHandler:
         )
 
         return items[0] if items else None
+
+
+class AsyncPromptTableHandler:
+    """Async version of `PromptTableHandler`, for use from within the agent's event loop."""
+
+    def __init__(
+        self,
+        session_identifier: str,
+        sqlalchemy_db_url: str | None = None,
+    ):
+        self.session_identifier = session_identifier
+        self.sql_handler = AsyncSQLHandler(
+            model=Prompt, sqlalchemy_db_url=sqlalchemy_db_url
+        )
+
+    @staticmethod
+    def from_agent_identifier(
+        identifier: AgentIdentifier,
+    ) -> "AsyncPromptTableHandler":
+        return AsyncPromptTableHandler(session_identifier=identifier)
+
+    async def save_prompt(self, prompt: str) -> None:
+        """Save item to storage."""
+        prompt_to_save = Prompt(
+            prompt=prompt,
+            datetime_=utcnow(),
+            session_identifier=self.session_identifier,
+        )
+        await self.sql_handler.save_multiple([prompt_to_save])
+
+    async def fetch_latest_prompt(self) -> Prompt | None:
+        column_to_order: str = Prompt.datetime_.key  # type: ignore[attr-defined]
+        items = await self.sql_handler.get_with_filter_and_order(
+            query_filters=[col(Prompt.session_identifier) == self.session_identifier],
+            order_by_column_name=column_to_order,
+            order_desc=True,
+            limit=1,
+        )
+        return items[0] if items else None
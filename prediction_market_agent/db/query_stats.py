@@ -0,0 +1,141 @@
+import functools
+import threading
+import time
+import typing as t
+
+from prediction_market_agent_tooling.loggers import logger
+from prediction_market_agent_tooling.tools.langfuse_ import (
+    langfuse_context,
+    observe,
+)
+from pydantic import BaseModel
+
+F = t.TypeVar("F", bound=t.Callable[..., t.Any])
+
+
+class OperationStats(BaseModel):
+    n_calls: int = 0
+    n_errors: int = (
+        0  # Calls that raised, included in `n_calls` and the timings as well.
+    )
+    n_rows: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.n_calls if self.n_calls else 0.0
+
+
+class QueryStats:
+    """
+    Opt-in, in-process timing of `SQLHandler` calls.
+
+    Once enabled, every instrumented call is recorded per `(table, operation)`, calls slower than
+    `slow_query_threshold_seconds` are logged as warnings, and if `langfuse_spans` is set, each call
+    is also reported as a Langfuse span of the current trace.
+    """
+
+    enabled: bool = False
+    slow_query_threshold_seconds: float = 1.0
+    langfuse_spans: bool = False
+    _stats: dict[tuple[str, str], OperationStats] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def enable(
+        cls, slow_query_threshold_seconds: float = 1.0, langfuse_spans: bool = False
+    ) -> None:
+        cls.enabled = True
+        cls.slow_query_threshold_seconds = slow_query_threshold_seconds
+        cls.langfuse_spans = langfuse_spans
+
+    @classmethod
+    def disable(cls) -> None:
+        cls.enabled = False
+
+    @classmethod
+    def record(
+        cls,
+        table: str,
+        operation: str,
+        n_rows: int,
+        seconds: float,
+        failed: bool = False,
+    ) -> None:
+        with cls._lock:
+            stats = cls._stats.setdefault((table, operation), OperationStats())
+            stats.n_calls += 1
+            stats.n_errors += failed
+            stats.n_rows += n_rows
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+
+        if seconds >= cls.slow_query_threshold_seconds:
+            logger.warning(
+                f"Slow query: {operation} on {table} {'failed after' if failed else 'took'} {seconds:.3f}s for {n_rows} rows."
+            )
+
+    @classmethod
+    def get_stats(cls) -> dict[tuple[str, str], OperationStats]:
+        """Returns a copy of the aggregated stats, keyed by `(table, operation)`."""
+        with cls._lock:
+            return {key: value.model_copy() for key, value in cls._stats.items()}
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._stats = {}
+
+
+def _count_rows(
+    args: tuple[t.Any, ...], kwargs: dict[str, t.Any], result: t.Any
+) -> int:
+    if isinstance(result, int) and not isinstance(result, bool):
+        # `count` and `delete_where` return the number of matched rows.
+        return result
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if result is None:
+        # Write operations, their first argument is the sequence of items.
+        items = args[0] if args else kwargs.get("items")
+        return len(items) if isinstance(items, (list, tuple)) else 0
+    return 1
+
+
+def timed_query(operation: str) -> t.Callable[[F], F]:
+    """Instruments a method of `SQLHandler`, does nothing unless `QueryStats` is enabled."""
+
+    def decorator(func: F) -> F:
+        # Wrapped only once, so the span name can't include the table, that's known only from the handler instance.
+        @observe(name=f"sql.{operation}")
+        def observed_func(self: t.Any, *args: t.Any, **kwargs: t.Any) -> t.Any:
+            langfuse_context.update_current_observation(
+                metadata={"table": str(self.table.__tablename__)}
+            )
+            return func(self, *args, **kwargs)
+
+        @functools.wraps(func)
+        def wrapper(self: t.Any, *args: t.Any, **kwargs: t.Any) -> t.Any:
+            if not QueryStats.enabled:
+                return func(self, *args, **kwargs)
+
+            call = observed_func if QueryStats.langfuse_spans else func
+            start = time.perf_counter()
+            result, failed = None, True
+            try:
+                result = call(self, *args, **kwargs)
+                failed = False
+                return result
+            finally:
+                QueryStats.record(
+                    table=str(self.table.__tablename__),
+                    operation=operation,
+                    n_rows=0 if failed else _count_rows(args, kwargs, result),
+                    seconds=time.perf_counter() - start,
+                    failed=failed,
+                )
+
+        return t.cast(F, wrapper)
+
+    return decorator
@@ -12,8 +12,12 @@ class ReplicatedMarketsTableHandler:
         )
 
     def save_replicated_markets(self, markets: list[ReplicatedMarket]) -> None:
-        """Save item to storage."""
-        self.sql_handler.save_multiple(markets)
+        """Save item to storage, markets that were already replicated are skipped."""
+        self.sql_handler.upsert_many(
+            markets,
+            conflict_column_names=[ReplicatedMarket.original_market_title.key],  # type: ignore[attr-defined]
+            on_conflict="ignore",
+        )
 
     def get_all(self) -> list[ReplicatedMarket]:
         return list(self.sql_handler.get_all())
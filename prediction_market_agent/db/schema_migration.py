@@ -0,0 +1,110 @@
+import typing as t
+
+from prediction_market_agent_tooling.loggers import logger
+from sqlalchemy import Engine, inspect, text
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import SQLModel
+
+
+# Key of the Postgres advisory lock held by `migrate_schema`.
+MIGRATION_LOCK_KEY = 0x706D612D6D6967  # "pma-mig"
+# How long `ALTER TABLE` waits for its lock, while it waits, it blocks all the other queries on the table.
+ALTER_TABLE_LOCK_TIMEOUT = "5s"
+
+
+def migrate_schema(engine: Engine, tables: t.Sequence[t.Type[SQLModel]]) -> None:
+    """
+    Applies `add_missing_columns` and `create_missing_indexes`. The container runs it before the agent
+    (see `scripts/migrate_db_schema.py`), so on Postgres it runs under an advisory lock:
+    agents started together by a deployment migrate one after the other, and all but the first find nothing to do.
+    """
+    if engine.dialect.name != "postgresql":
+        add_missing_columns(engine, tables)
+        create_missing_indexes(engine, tables)
+        return
+
+    # Session-level lock on a connection outside of a transaction, `CREATE INDEX CONCURRENTLY` would wait for an open one.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(
+            text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+        )
+        try:
+            add_missing_columns(engine, tables)
+            create_missing_indexes(engine, tables)
+        finally:
+            connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY}
+            )
+
+
+def add_missing_columns(engine: Engine, tables: t.Sequence[t.Type[SQLModel]]) -> None:
+    """
+    `SQLModel.metadata.create_all` skips tables that already exist, including columns added to the model later,
+    so those are added here. Only nullable columns can be added this way, anything else requires a manual migration.
+    Adding a nullable column without a default doesn't rewrite the table, it needs only a short exclusive lock.
+    """
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    for sqlmodel_table in tables:
+        table = SQLModel.metadata.tables[str(sqlmodel_table.__tablename__)]
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable:
+                logger.warning(
+                    f"Column {table.name}.{column.name} is missing in the database, but it isn't nullable, so it can't be added automatically."
+                )
+                continue
+            logger.info(f"Adding missing column {table.name}.{column.name}.")
+            with engine.begin() as connection:
+                if engine.dialect.name == "postgresql":
+                    # Fail instead of queueing the other queries behind the lock, the migration can be run again.
+                    connection.execute(
+                        text(f"SET LOCAL lock_timeout = '{ALTER_TABLE_LOCK_TIMEOUT}'")
+                    )
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=engine.dialect)}"
+                    )
+                )
+
+
+def create_missing_indexes(
+    engine: Engine, tables: t.Sequence[t.Type[SQLModel]]
+) -> None:
+    """
+    `SQLModel.metadata.create_all` skips tables that already exist, including indexes declared on them later,
+    so those are created here. Run it through `migrate_schema`, not from the agent processes themselves,
+    because they would race each other, and on Postgres the index is built without blocking writes.
+    """
+    inspector = inspect(engine)
+    for sqlmodel_table in tables:
+        table = SQLModel.metadata.tables[str(sqlmodel_table.__tablename__)]
+        if not inspector.has_table(table.name):
+            # Will be created together with its indexes by the table handler.
+            continue
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            logger.info(f"Creating missing index {index.name} on {table.name}.")
+            if engine.dialect.name == "postgresql":
+                preparer = engine.dialect.identifier_preparer
+                columns = ", ".join(
+                    preparer.format_column(column) for column in index.columns
+                )
+                # `CONCURRENTLY` doesn't block writes, but it can't run inside a transaction.
+                with engine.connect().execution_options(
+                    isolation_level="AUTOCOMMIT"
+                ) as connection:
+                    connection.execute(
+                        text(
+                            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {preparer.quote(str(index.name))} ON {preparer.format_table(table)} ({columns})"
+                        )
+                    )
+            else:
+                with engine.begin() as connection:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
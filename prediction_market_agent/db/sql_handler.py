@@ -1,8 +1,11 @@
 import typing as t
 
-from prediction_market_agent_tooling.tools.db.db_manager import DBManager
-from sqlalchemy import BinaryExpression, ColumnElement
-from sqlmodel import SQLModel, asc, desc
+from sqlalchemy import BinaryExpression, ColumnElement, Row, and_, delete, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import SQLModel, asc, desc, select
+
+from prediction_market_agent.db.engine_registry import DBEngineRegistry
+from prediction_market_agent.db.query_stats import timed_query
 
 SQLModelType = t.TypeVar("SQLModelType", bound=SQLModel)
 
@@ -13,33 +16,114 @@ class SQLHandler:
         model: t.Type[SQLModelType],
         sqlalchemy_db_url: str | None = None,
     ):
-        self.db_manager = DBManager(sqlalchemy_db_url)
+        self.sqlalchemy_db_url = sqlalchemy_db_url
+        self.db_manager = DBEngineRegistry.get_db_manager(sqlalchemy_db_url)
         self.table = model
         self._init_table_if_not_exists()
 
     def _init_table_if_not_exists(self) -> None:
-        self.db_manager.create_tables(sqlmodel_tables=[self.table])
+        DBEngineRegistry.create_tables_once(self.sqlalchemy_db_url, [self.table])
 
+    @timed_query("get_all")
     def get_all(self) -> t.Sequence[SQLModelType]:
         with self.db_manager.get_session() as session:
             return session.query(self.table).all()
 
+    @timed_query("save_multiple")
     def save_multiple(self, items: t.Sequence[SQLModelType]) -> None:
         with self.db_manager.get_session() as session:
             session.add_all(items)
             session.commit()
 
     def remove_multiple(self, items: t.Sequence[SQLModelType]) -> None:
+        # Items that were never saved have no id and nothing to delete.
+        ids = [getattr(item, "id") for item in items if getattr(item, "id") is not None]
+        if ids:
+            self.delete_where([getattr(self.table, "id").in_(ids)])
+
+    @timed_query("delete_where")
+    def delete_where(
+        self,
+        query_filters: t.Sequence[ColumnElement[bool] | BinaryExpression[bool]],
+    ) -> int:
+        """Deletes all rows matching the filters in a single statement, returns the number of deleted rows."""
+        if not query_filters:
+            # Protect from accidentally wiping the whole table.
+            raise ValueError("At least one filter is required for `delete_where`.")
+        with self.db_manager.get_session() as session:
+            result = session.execute(
+                delete(self.table).where(*query_filters),
+                execution_options={"synchronize_session": False},
+            )
+            session.commit()
+            return int(result.rowcount)  # type: ignore[attr-defined]
+
+    @timed_query("upsert_many")
+    def upsert_many(
+        self,
+        items: t.Sequence[SQLModelType],
+        conflict_column_names: t.Sequence[str],
+        on_conflict: t.Literal["update", "ignore"] = "update",
+        batch_size: int = 1000,
+    ) -> None:
+        """
+        Inserts items using multi-row `INSERT ... ON CONFLICT` statements (Postgres and SQLite), one per `batch_size` items,
+        all in a single transaction. Rows that collide on `conflict_column_names` (these must be covered by a unique constraint)
+        get their other columns updated, or are skipped if `on_conflict` is "ignore".
+        """
+        if not items:
+            return
+
+        # Let the database assign ids of the items that don't have one.
+        has_id = "id" in self.table.model_fields
+        values = [
+            item.model_dump(
+                exclude={"id"} if has_id and getattr(item, "id") is None else None
+            )
+            for item in items
+        ]
+        # A multi-row insert needs the same columns in every row, so items with and without id go separately.
+        values_by_columns: dict[tuple[str, ...], list[dict[str, t.Any]]] = {}
+        for value in values:
+            values_by_columns.setdefault(tuple(value), []).append(value)
+
         with self.db_manager.get_session() as session:
-            for item in items:
-                session.delete(item)
+            dialect_name = session.get_bind().dialect.name
+            if dialect_name not in ("postgresql", "sqlite"):
+                raise ValueError(f"Upsert isn't supported for {dialect_name=}.")
+
+            for column_names, column_values in values_by_columns.items():
+                update_column_names = [
+                    name for name in column_names if name not in conflict_column_names
+                ]
+                for i in range(0, len(column_values), batch_size):
+                    statement: postgresql.Insert | sqlite.Insert = (
+                        postgresql.insert(self.table)
+                        if dialect_name == "postgresql"
+                        else sqlite.insert(self.table)
+                    ).values(column_values[i : i + batch_size])
+                    if on_conflict == "ignore" or not update_column_names:
+                        statement = statement.on_conflict_do_nothing(
+                            index_elements=conflict_column_names
+                        )
+                    else:
+                        statement = statement.on_conflict_do_update(
+                            index_elements=conflict_column_names,
+                            set_={
+                                name: statement.excluded[name]
+                                for name in update_column_names
+                            },
+                        )
+                    session.execute(statement)
             session.commit()
 
+    @timed_query("remove_by_id")
     def remove_by_id(self, item_id: int) -> None:
         with self.db_manager.get_session() as session:
             session.query(self.table).filter_by(id=item_id).delete()
             session.commit()
 
+    @timed_query("get_with_filter_and_order")
     def get_with_filter_and_order(
         self,
         query_filters: t.Sequence[ColumnElement[bool] | BinaryExpression[bool]] = (),
@@ -66,6 +150,92 @@ class SQLHandler:
             results = query.all()
         return results
 
+    @timed_query("get_columns_with_filter_and_order")
+    def get_columns_with_filter_and_order(
+        self,
+        column_names: t.Sequence[str],
+        query_filters: t.Sequence[ColumnElement[bool] | BinaryExpression[bool]] = (),
+        order_by_column_name: str | None = None,
+        order_desc: bool = True,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[Row[t.Any]]:
+        """
+        Same as `get_with_filter_and_order`, but selects only the given columns and returns plain rows
+        (tuples that also allow access by column name), without creating ORM instances.
+        """
+        query = select(*(getattr(self.table, name) for name in column_names))
+        for exp in query_filters:
+            query = query.where(exp)
+
+        if order_by_column_name:
+            order_column = getattr(self.table, order_by_column_name)
+            query = query.order_by(
+                desc(order_column) if order_desc else asc(order_column)
+            )
+        if offset:
+            query = query.offset(offset)
+        if limit:
+            query = query.limit(limit)
+
+        with self.db_manager.get_session() as session:
+            return list(session.execute(query).all())
+
+    def iterate_with_filter_and_keyset(
+        self,
+        query_filters: t.Sequence[ColumnElement[bool] | BinaryExpression[bool]] = (),
+        order_by_column_name: str = "datetime_",
+        order_desc: bool = True,
+        page_size: int = 1000,
+    ) -> t.Iterator[SQLModelType]:
+        """
+        Streams all matching rows ordered by `(order_by_column_name, id)`.
+
+        Instead of `offset`, every page continues right after the last row of the previous page (keyset pagination),
+        so each page costs the same regardless of how deep we are, and only a single page is kept in memory.
+        """
+        order_column = getattr(self.table, order_by_column_name)
+        id_column = getattr(self.table, "id")
+        order = desc if order_desc else asc
+        last_row: SQLModelType | None = None
+
+        while True:
+            with self.db_manager.get_session() as session:
+                query = session.query(self.table)
+                for exp in query_filters:
+                    query = query.where(exp)
+
+                if last_row is not None:
+                    last_value = getattr(last_row, order_by_column_name)
+                    last_id = getattr(last_row, "id")
+                    query = query.where(
+                        or_(
+                            (
+                                order_column < last_value
+                                if order_desc
+                                else order_column > last_value
+                            ),
+                            and_(
+                                order_column == last_value,
+                                id_column < last_id
+                                if order_desc
+                                else id_column > last_id,
+                            ),
+                        )
+                    )
+
+                page = (
+                    query.order_by(order(order_column), order(id_column))
+                    .limit(page_size)
+                    .all()
+                )
+
+            yield from page
+            if len(page) < page_size:
+                break
+            last_row = page[-1]
+
+    @timed_query("count")
     def count(
         self,
         query_filters: t.Sequence[ColumnElement[bool] | BinaryExpression[bool]] = (),
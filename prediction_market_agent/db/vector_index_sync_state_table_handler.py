@@ -0,0 +1,31 @@
+import typing as t
+
+from sqlmodel import col
+
+from prediction_market_agent.db.models import VectorIndexSyncState
+from prediction_market_agent.db.sql_handler import SQLHandler
+
+
+class VectorIndexSyncStateTableHandler:
+    def __init__(
+        self,
+        sqlalchemy_db_url: str | None = None,
+    ):
+        self.sql_handler = SQLHandler(
+            model=VectorIndexSyncState, sqlalchemy_db_url=sqlalchemy_db_url
+        )
+
+    def get(self, index_name: str) -> VectorIndexSyncState | None:
+        items: t.Sequence[
+            VectorIndexSyncState
+        ] = self.sql_handler.get_with_filter_and_order(
+            query_filters=[col(VectorIndexSyncState.index_name) == index_name],
+            limit=1,
+        )
+        return items[0] if items else None
+
+    def save(self, state: VectorIndexSyncState) -> None:
+        self.sql_handler.upsert_many(
+            [state],
+            conflict_column_names=[VectorIndexSyncState.index_name.key],  # type: ignore[attr-defined]
+        )
@@ -0,0 +1,18 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces the calls of `wait` evenly, so that at most `requests_per_minute` pass per minute."""
+
+    def __init__(self, requests_per_minute: float) -> None:
+        self.interval = 60.0 / requests_per_minute
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            scheduled_time = max(self._next_time, now)
+            self._next_time = scheduled_time + self.interval
+        time.sleep(scheduled_time - now)
@@ -0,0 +1,44 @@
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+from datetime import timedelta
+
+K = t.TypeVar("K")
+V = t.TypeVar("V")
+
+
+class TTLCache(t.Generic[K, V]):
+    """
+    Thread-safe in-memory cache whose entries expire `ttl` after they were set.
+    Once `max_size` is reached, the least recently used entry is evicted.
+    """
+
+    def __init__(self, ttl: timedelta, max_size: int = 10_000) -> None:
+        self.ttl_seconds = ttl.total_seconds()
+        self.max_size = max_size
+        self._items: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if time.monotonic() >= expires_at:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
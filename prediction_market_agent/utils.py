@@ -1,5 +1,6 @@
 import json
 import typing as t
+from functools import lru_cache
 
 from prediction_market_agent_tooling.config import APIKeys as APIKeysBase
 from prediction_market_agent_tooling.loggers import logger
@@ -169,6 +170,12 @@ class SocialMediaAPIKeys(APIKeys):
         )
 
 
+@lru_cache(maxsize=None)
+def get_cached_api_keys() -> APIKeys:
+    """Same as `APIKeys()`, but the environment and `.env` are read only once per process, for the hot paths."""
+    return APIKeys()
+
+
 def get_market_prompt(question: str) -> str:
     prompt = (
         f"Research and report on the following question:\n\n"
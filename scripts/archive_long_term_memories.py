@@ -0,0 +1,53 @@
+from datetime import timedelta
+from pathlib import Path
+
+import typer
+from prediction_market_agent_tooling.loggers import logger
+from prediction_market_agent_tooling.tools.utils import utcnow
+from sqlmodel import col, select
+
+from prediction_market_agent.db.long_term_memory_archive import LongTermMemoryArchive
+from prediction_market_agent.db.long_term_memory_table_handler import (
+    LongTermMemoryTableHandler,
+)
+from prediction_market_agent.db.models import LongTermMemories
+
+
+def main(
+    archive_dir: Path,
+    older_than_days: int = 90,
+    task_description: list[str] = typer.Option(
+        [], help="Archive only these task descriptions, by default all of them."
+    ),
+    batch_size: int = 10_000,
+    sqlalchemy_db_url: str | None = None,
+) -> None:
+    """
+    Moves `long_term_memories` older than `older_than_days` into date-partitioned Parquet files in `archive_dir`.
+    Safe to run repeatedly, e.g. from a cron job.
+    """
+    older_than = utcnow() - timedelta(days=older_than_days)
+    archive = LongTermMemoryArchive(archive_dir)
+
+    if not task_description:
+        handler = LongTermMemoryTableHandler(
+            task_description="", sqlalchemy_db_url=sqlalchemy_db_url
+        )
+        with handler.sql_handler.db_manager.get_session() as session:
+            task_description = list(
+                session.exec(
+                    select(LongTermMemories.task_description)
+                    .where(col(LongTermMemories.datetime_) < older_than)
+                    .distinct()
+                ).all()
+            )
+
+    for task in task_description:
+        n_archived = LongTermMemoryTableHandler(
+            task_description=task, sqlalchemy_db_url=sqlalchemy_db_url
+        ).archive_older_than(archive, older_than=older_than, batch_size=batch_size)
+        logger.info(f"Archived {n_archived} entries of {task}.")
+
+
+if __name__ == "__main__":
+    typer.run(main)
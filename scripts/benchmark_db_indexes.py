@@ -0,0 +1,90 @@
+import tempfile
+import time
+from datetime import timedelta
+
+import typer
+from prediction_market_agent_tooling.tools.utils import utcnow
+from sqlalchemy import Index, create_engine, text
+from sqlmodel import SQLModel, col
+
+from prediction_market_agent.db.models import LongTermMemories
+
+APP = typer.Typer()
+
+
+def measure_query_time(
+    sqlalchemy_db_url: str, task_description: str, n_queries: int
+) -> float:
+    engine = create_engine(sqlalchemy_db_url)
+    query = (
+        SQLModel.metadata.tables[str(LongTermMemories.__tablename__)]
+        .select()
+        .where(col(LongTermMemories.task_description) == task_description)
+        .order_by(col(LongTermMemories.datetime_).desc())
+        .limit(10)
+    )
+    with engine.connect() as connection:
+        start = time.perf_counter()
+        for _ in range(n_queries):
+            connection.execute(query).all()
+        elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed / n_queries
+
+
+@APP.command()
+def main(
+    n_rows: int = 1_000_000,
+    n_task_descriptions: int = 20,
+    n_queries: int = 50,
+) -> None:
+    """
+    Compares latency of the typical long-term memory query (filter by `task_description`, order by `datetime_`)
+    on a SQLite database with `n_rows` rows, without and with the composite index declared on the model.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".db") as db_file:
+        sqlalchemy_db_url = f"sqlite:///{db_file.name}"
+        engine = create_engine(sqlalchemy_db_url)
+        table = SQLModel.metadata.tables[str(LongTermMemories.__tablename__)]
+        SQLModel.metadata.create_all(engine, tables=[table])
+        index: Index = next(iter(table.indexes))
+
+        with engine.begin() as connection:
+            index.drop(connection)
+            now = utcnow()
+            batch_size = 100_000
+            for batch_start in range(0, n_rows, batch_size):
+                connection.execute(
+                    table.insert(),
+                    [
+                        {
+                            "task_description": f"task-{i % n_task_descriptions}",
+                            "metadata_": "{}",
+                            "datetime_": now - timedelta(seconds=i),
+                        }
+                        for i in range(
+                            batch_start, min(batch_start + batch_size, n_rows)
+                        )
+                    ],
+                )
+
+        without_index = measure_query_time(sqlalchemy_db_url, "task-0", n_queries)
+
+        with engine.begin() as connection:
+            index.create(connection)
+            connection.execute(text("ANALYZE"))
+        with_index = measure_query_time(sqlalchemy_db_url, "task-0", n_queries)
+        engine.dispose()
+
+    print(
+        f"""
+Rows: {n_rows}
+Without index: {without_index * 1000:.2f} ms/query
+With index ({index.name}): {with_index * 1000:.2f} ms/query
+Speed-up: {without_index / with_index:.1f}x
+"""
+    )
+
+
+if __name__ == "__main__":
+    APP()
@@ -0,0 +1,67 @@
+import random
+import time
+from types import SimpleNamespace
+
+import typer
+from prediction_market_agent_tooling.gtypes import Wei
+from prediction_market_agent_tooling.markets.omen.data_models import OmenMarket
+
+from prediction_market_agent.db.pinecone_handler import PineconeHandler
+
+APP = typer.Typer()
+
+
+def deduplicate_markets_loop(markets: list[OmenMarket]) -> list[OmenMarket]:
+    """Reference per-market loop, exact titles only."""
+    unique_market_titles: dict[str, OmenMarket] = {}
+    for market in markets:
+        if (
+            market.question_title not in unique_market_titles
+            or unique_market_titles[market.question_title].collateralVolume
+            < market.collateralVolume
+        ):
+            unique_market_titles[market.question_title] = market
+    return list(unique_market_titles.values())
+
+
+@APP.command()
+def main(
+    n_markets: int = 100_000,
+    n_unique_titles: int = 60_000,
+    seed: int = 0,
+) -> None:
+    """
+    Measures `PineconeHandler.deduplicate_markets` on `n_markets` synthetic markets drawn from `n_unique_titles` questions,
+    some re-posted with different casing or whitespace, and reports how many embeddings the deduplication saves.
+    """
+    rng = random.Random(seed)
+    titles = [
+        f"Will event number {i} happen by 1 January 2025?"
+        for i in range(n_unique_titles)
+    ]
+    markets: list[OmenMarket] = []
+    for _ in range(n_markets):
+        title = rng.choice(titles)
+        if rng.random() < 0.1:
+            title = f" {title.upper()}  "
+        markets.append(
+            SimpleNamespace(  # type: ignore[arg-type] # Only the fields used by the deduplication.
+                question_title=title, collateralVolume=Wei(rng.randrange(10**24))
+            )
+        )
+
+    for name, func in [
+        ("loop", deduplicate_markets_loop),
+        ("columnar", PineconeHandler.deduplicate_markets),
+    ]:
+        start = time.perf_counter()
+        unique_markets = func(markets)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>8}: {elapsed * 1000:8.1f} ms, {len(unique_markets)} markets to embed, "
+            f"{len(markets) - len(unique_markets)} duplicates skipped"
+        )
+
+
+if __name__ == "__main__":
+    APP()
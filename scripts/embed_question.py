@@ -1,11 +1,11 @@
 import typer
 
-from prediction_market_agent.db.pinecone_handler import PineconeHandler
+from prediction_market_agent.db.pinecone_handler import build_pinecone_handler
 
 
 def main() -> None:
-    """Script for inserting all markets into Pinecone (if not yet there)."""
-    PineconeHandler().insert_all_omen_markets_if_not_exists()
+    """Script for inserting all markets into Pinecone, or the local index if configured (if not yet there)."""
+    build_pinecone_handler().insert_all_omen_markets_if_not_exists()
 
 
 if __name__ == "__main__":
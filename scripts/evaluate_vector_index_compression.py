@@ -0,0 +1,100 @@
+import random
+import time
+
+import numpy as np
+import numpy.typing as npt
+import typer
+from prediction_market_agent_tooling.markets.agent_market import FilterBy, SortBy
+from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
+    OmenSubgraphHandler,
+)
+
+from prediction_market_agent.db.local_vector_store import (
+    LocalVectorStore,
+    VectorQuantization,
+)
+from prediction_market_agent.db.pinecone_handler import PineconeHandler
+
+APP = typer.Typer()
+
+
+def shorten(
+    vectors: npt.NDArray[np.float32], dimensions: int
+) -> npt.NDArray[np.float32]:
+    # Same as requesting `dimensions` from the `text-embedding-3` models: the prefix of the full embedding, re-normalised.
+    shortened = vectors[:, :dimensions]
+    normalized: npt.NDArray[np.float32] = shortened / np.linalg.norm(
+        shortened, axis=1, keepdims=True
+    )
+    return normalized
+
+
+@APP.command()
+def main(
+    n_markets: int = 20_000,
+    n_queries: int = 200,
+    k: int = 5,
+    dimensions: list[int] = [3072, 1024, 256],
+    seed: int = 0,
+) -> None:
+    """
+    Compares recall@k and query latency of the local index with shortened and int8-quantized embeddings,
+    against exact search over the full float32 embeddings, on the titles of the newest `n_markets` Omen markets.
+    `n_queries` of the titles are held out and used as the queries, as when looking up correlated markets of a new market.
+    Embeddings come from `PineconeHandler`, so with `EMBEDDING_CACHE_DB_URL` set, repeated runs are served by its embedding cache.
+    Only the local index is evaluated, to use shortened embeddings with the hosted index,
+    create `<INDEX_NAME>-<dimensions>` with that dimension first, see `VectorIndexSettings.EMBEDDING_DIMENSIONS`.
+    """
+    markets = OmenSubgraphHandler().get_omen_markets_simple(
+        limit=n_markets + n_queries, filter_by=FilterBy.NONE, sort_by=SortBy.NEWEST
+    )
+    titles = [m.question_title for m in PineconeHandler.deduplicate_markets(markets)]
+    random.Random(seed).shuffle(titles)
+    query_titles, index_titles = titles[:n_queries], titles[n_queries:]
+
+    handler = PineconeHandler()
+    index_vectors = np.asarray(handler.embed_texts(index_titles), dtype=np.float32)
+    query_vectors = np.asarray(handler.embed_texts(query_titles), dtype=np.float32)
+
+    def search(
+        store: LocalVectorStore, queries: npt.NDArray[np.float32]
+    ) -> list[set[str]]:
+        return [
+            {doc.page_content for doc, _ in results}
+            for results in store.similarity_search_by_vectors_with_score(
+                queries.tolist(), k=k
+            )
+        ]
+
+    baseline = LocalVectorStore(embedding=handler.embeddings)
+    baseline.add_embeddings(index_titles, index_vectors.tolist(), ids=index_titles)
+    expected = search(baseline, query_vectors)
+
+    print(f"{len(index_titles)} markets, {len(query_titles)} queries, k={k}")
+    print(f"{'dimensions':>10} {'vectors':>8} {'MB':>8} {'ms/query':>9} {'recall':>7}")
+    quantizations: list[VectorQuantization] = ["float32", "int8"]
+    for n_dimensions in dimensions:
+        for quantization in quantizations:
+            store = LocalVectorStore(
+                embedding=handler.embeddings, quantization=quantization
+            )
+            store.add_embeddings(
+                index_titles,
+                shorten(index_vectors, n_dimensions).tolist(),
+                ids=index_titles,
+            )
+            shortened_queries = shorten(query_vectors, n_dimensions)
+
+            start = time.perf_counter()
+            found = [search(store, query[None])[0] for query in shortened_queries]
+            elapsed = time.perf_counter() - start
+
+            recall = np.mean([len(f & e) / len(e) for f, e in zip(found, expected)])
+            print(
+                f"{n_dimensions:>10} {quantization:>8} {store.vectors_nbytes / 2**20:>8.1f} "
+                f"{elapsed / len(query_titles) * 1000:>9.2f} {recall:>7.3f}"
+            )
+
+
+if __name__ == "__main__":
+    APP()
@@ -0,0 +1,34 @@
+import typer
+from sqlalchemy import create_engine
+from sqlmodel import SQLModel
+
+from prediction_market_agent.db.models import (
+    EvaluatedGoalModel,
+    LongTermMemories,
+    Prompt,
+    ReportNFTGame,
+)
+from prediction_market_agent.db.schema_migration import migrate_schema
+from prediction_market_agent.utils import APIKeys
+
+
+def main(sqlalchemy_db_url: str | None = None) -> None:
+    """
+    Applies the schema changes of existing tables that the agents don't apply on start.
+    The container runs it before the agent (see `Dockerfile`), safe to run repeatedly and concurrently.
+    """
+    engine = create_engine(
+        sqlalchemy_db_url or APIKeys().sqlalchemy_db_url.get_secret_value()
+    )
+    tables: list[type[SQLModel]] = [
+        LongTermMemories,
+        Prompt,
+        EvaluatedGoalModel,
+        ReportNFTGame,
+    ]
+    migrate_schema(engine, tables)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,67 @@
+import typing as t
+
+import typer
+from prediction_market_agent_tooling.loggers import logger
+from prediction_market_agent_tooling.tools.utils import check_not_none
+from sqlalchemy import update
+from sqlmodel import col, select
+
+from prediction_market_agent.db import json_codec
+from prediction_market_agent.db.models import LongTermMemories
+from prediction_market_agent.db.schema_migration import add_missing_columns
+from prediction_market_agent.db.sql_handler import SQLHandler
+
+
+def main(batch_size: int = 10_000, sqlalchemy_db_url: str | None = None) -> None:
+    """
+    Backfills `long_term_memories.metadata_json` from the legacy text column `metadata_`,
+    for the rows created before the JSON column existed. Safe to run repeatedly.
+    """
+    sql_handler = SQLHandler(
+        model=LongTermMemories, sqlalchemy_db_url=sqlalchemy_db_url
+    )
+    with sql_handler.db_manager.get_session() as session:
+        # Adds the `metadata_json` column to the existing table, if `scripts/migrate_db_schema.py` didn't already.
+        add_missing_columns(session.get_bind().engine, [LongTermMemories])
+    n_migrated, n_skipped, last_id = 0, 0, 0
+
+    while True:
+        with sql_handler.db_manager.get_session() as session:
+            rows = session.exec(
+                select(LongTermMemories.id, LongTermMemories.metadata_)
+                .where(col(LongTermMemories.id) > last_id)
+                .where(col(LongTermMemories.metadata_json).is_(None))
+                .where(col(LongTermMemories.metadata_).is_not(None))
+                .order_by(col(LongTermMemories.id))
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            updates: list[dict[str, t.Any]] = []
+            for id_, metadata in rows:
+                try:
+                    updates.append(
+                        {"id": id_, "metadata_json": json_codec.loads(metadata or "")}
+                    )
+                except ValueError as e:
+                    # Left as they are, `metadata_dict` of these rows keeps logging the error on access.
+                    logger.warning(f"Skipping row {id_=} with invalid metadata: {e}")
+                    n_skipped += 1
+            if updates:
+                session.execute(update(LongTermMemories), updates)
+                session.commit()
+
+        last_id = check_not_none(rows[-1][0])
+        n_migrated += len(updates)
+        logger.info(
+            f"Migrated {n_migrated} rows, skipped {n_skipped} rows, last id is {last_id}."
+        )
+
+    logger.info(
+        f"Done, migrated {n_migrated} rows and skipped {n_skipped} invalid rows in total."
+    )
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,604 @@
+import asyncio
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import Mock
+from uuid import UUID, uuid4
+
+import pytest
+from crewai.llm import LLM
+from eth_typing import HexAddress, HexStr
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from prediction_market_agent_tooling.gtypes import Probability
+from prediction_market_agent_tooling.markets.data_models import ProbabilisticAnswer
+
+from prediction_market_agent import utils
+from prediction_market_agent.agents.microchain_agent.memory import AnswerWithScenario
+from prediction_market_agent.agents.think_thoroughly_agent import think_thoroughly_agent
+from prediction_market_agent.agents.think_thoroughly_agent.models import (
+    FinalDecisionContext,
+    PineconeMetadata,
+)
+from prediction_market_agent.agents.think_thoroughly_agent.think_thoroughly_agent import (
+    ScenarioExecutor,
+    Scenarios,
+    ThinkThoroughlyBase,
+    ThinkThoroughlyWithItsOwnResearch,
+)
+from prediction_market_agent.db.pinecone_handler import LocalPineconeHandler
+from prediction_market_agent.tools.ttl_cache import TTLCache
+from prediction_market_agent.utils import APIKeys, get_cached_api_keys
+
+MARKETS = {
+    HexAddress(HexStr("0xa")): "Will it rain in Berlin tomorrow?",
+    HexAddress(HexStr("0xb")): "Will it snow in Prague tomorrow?",
+    HexAddress(HexStr("0xc")): "Will the sun shine in Rome tomorrow?",
+}
+
+SCENARIOS = [f"Scenario {i}" for i in range(6)]
+SLOW_SCENARIO_SECONDS = 3
+
+
+def fake_prediction_for_one_outcome(
+    unique_id: UUID,
+    model: str,
+    scenario: str,
+    original_question: str,
+    previous_scenarios_and_answers: (
+        list[tuple[str, AnswerWithScenario]] | None
+    ) = None,
+) -> AnswerWithScenario | None:
+    """Stands in for the LLM calls, module-level so that it can be sent to the worker processes."""
+    if "fails" in scenario:
+        raise RuntimeError(f"Failed to predict {scenario}.")
+    if "exits" in scenario:
+        raise SystemExit(f"Exited while predicting {scenario}.")
+    if "slow" in scenario:
+        time.sleep(SLOW_SCENARIO_SECONDS)
+    # Reverse order of completion, so that the results have to be put back in the order of the scenarios.
+    time.sleep(0.05 * (len(SCENARIOS) - int(scenario.split()[1])))
+    return AnswerWithScenario(
+        scenario=scenario,
+        original_question=original_question,
+        p_yes=Probability(0.5),
+        confidence=0.5,
+        reasoning=f"Reasoning for {scenario}.",
+    )
+
+
+@pytest.fixture()
+def agent(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> t.Generator[ThinkThoroughlyBase, None, None]:
+    pinecone_handler = LocalPineconeHandler(
+        index_dir=tmp_path, embeddings=DeterministicFakeEmbedding(size=16)
+    )
+    pinecone_handler.insert_texts(
+        ids=[pinecone_handler.encode_text(text) for text in MARKETS.values()],
+        texts=list(MARKETS.values()),
+        metadatas=[
+            PineconeMetadata(
+                question_title=title, market_address=address, close_time_timestamp=0
+            ).model_dump()
+            for address, title in MARKETS.items()
+        ],
+    )
+    subgraph_handler = Mock()
+    subgraph_handler.get_omen_markets.side_effect = lambda id_in, **kwargs: [
+        Mock(id=address, question_title=MARKETS[address], current_p_yes=0.5)
+        for address in id_in
+    ]
+    monkeypatch.setattr(
+        think_thoroughly_agent, "OmenSubgraphHandler", lambda: subgraph_handler
+    )
+    monkeypatch.setattr(
+        think_thoroughly_agent, "build_pinecone_handler", lambda: pinecone_handler
+    )
+    # The caches are shared by the class, don't leak them between the tests.
+    monkeypatch.setattr(
+        ThinkThoroughlyBase,
+        "correlated_market_addresses_cache",
+        TTLCache(ttl=timedelta(hours=1)),
+    )
+    monkeypatch.setattr(
+        ThinkThoroughlyBase,
+        "correlated_market_inputs_cache",
+        TTLCache(ttl=timedelta(hours=1)),
+    )
+    monkeypatch.setattr(
+        ThinkThoroughlyWithItsOwnResearch,
+        "generate_prediction_for_one_outcome",
+        staticmethod(fake_prediction_for_one_outcome),
+    )
+    agent = ThinkThoroughlyWithItsOwnResearch(enable_langfuse=False, memory=False)
+    yield agent
+    agent.shutdown_scenario_pools()
+
+
+def test_get_correlated_markets_batch(agent: ThinkThoroughlyBase) -> None:
+    questions = [MARKETS[HexAddress(HexStr("0xa"))], MARKETS[HexAddress(HexStr("0xc"))]]
+    results = agent.get_correlated_markets_batch(questions + questions[:1])
+
+    # All the markets are fetched by one subgraph request.
+    assert t.cast(Mock, agent.subgraph_handler).get_omen_markets.call_count == 1
+    # The question itself is the nearest one, duplicated questions get the same results.
+    assert [markets[0].question_title for markets in results] == questions + questions[
+        :1
+    ]
+    assert results[0] == results[2]
+    # Later lookups are served from the cache, with the same results.
+    assert [agent.get_correlated_markets(q) for q in questions] == results[:2]
+    assert t.cast(Mock, agent.subgraph_handler).get_omen_markets.call_count == 1
+
+
+@pytest.mark.parametrize("scenario_executor", t.get_args(ScenarioExecutor))
+def test_generate_scenario_predictions(
+    agent: ThinkThoroughlyBase, scenario_executor: ScenarioExecutor
+) -> None:
+    agent.scenario_executor = scenario_executor
+    # Fewer workers to start, every process imports the agent.
+    agent.max_concurrent_scenarios = 2
+    scenarios = SCENARIOS[:2] + [f"{SCENARIOS[2]} fails"] + SCENARIOS[3:]
+
+    results = asyncio.run(
+        agent.generate_scenario_predictions(uuid4(), "Question?", scenarios, [])
+    )
+
+    # All the scenarios, in their order, the failed one without a prediction.
+    assert [scenario for scenario, _ in results] == scenarios
+    assert [
+        prediction.scenario if prediction else None for _, prediction in results
+    ] == SCENARIOS[:2] + [None] + SCENARIOS[3:]
+
+
+@pytest.mark.parametrize("scenario_executor", t.get_args(ScenarioExecutor))
+def test_scenario_pool_is_reused_across_markets(
+    agent: ThinkThoroughlyBase, scenario_executor: ScenarioExecutor
+) -> None:
+    agent.scenario_executor = scenario_executor
+    agent.max_concurrent_scenarios = 2
+
+    async def run_markets() -> list[list[tuple[str, AnswerWithScenario | None]]]:
+        return [
+            await agent.generate_scenario_predictions(
+                uuid4(), "Question?", SCENARIOS[:2], []
+            )
+            for _ in range(2)
+        ]
+
+    for results in asyncio.run(run_markets()):
+        assert all(prediction is not None for _, prediction in results)
+    pools = {
+        "process": agent._scenario_process_pool,
+        "thread": agent._scenario_thread_pool,
+    }
+    # Only the pool of the used executor was created, once for both markets.
+    assert [e for e, pool in pools.items() if pool is not None] == [scenario_executor]
+
+    agent.shutdown_scenario_pools()
+    assert agent._scenario_process_pool is None
+    assert agent._scenario_thread_pool is None
+
+
+class PipelineCalls:
+    def __init__(self) -> None:
+        self.events: list[str] = []
+        self.final_decision_kwargs: dict[str, t.Any] = {}
+
+
+@pytest.fixture()
+def pipeline_calls(
+    agent: ThinkThoroughlyBase, monkeypatch: pytest.MonkeyPatch
+) -> PipelineCalls:
+    """Replaces the LLM-backed stages of `answer_binary_market`, recording the order in which they ran."""
+    calls = PipelineCalls()
+
+    def generate_prediction_for_one_outcome(
+        *args: t.Any, **kwargs: t.Any
+    ) -> AnswerWithScenario | None:
+        prediction = fake_prediction_for_one_outcome(*args, **kwargs)
+        calls.events.append("scenario")
+        return prediction
+
+    async def research_final_decision(question: str) -> str:
+        calls.events.append("research")
+        return f"Research of {question}"
+
+    def generate_final_decision(
+        question: str,
+        scenarios_with_probabilities: list[tuple[str, AnswerWithScenario]],
+        **kwargs: t.Any,
+    ) -> ProbabilisticAnswer:
+        calls.events.append("final_decision")
+        calls.final_decision_kwargs = {
+            "scenarios_with_probabilities": scenarios_with_probabilities,
+            **kwargs,
+        }
+        return ProbabilisticAnswer(p_yes=Probability(0.5), confidence=0.5)
+
+    monkeypatch.setattr(
+        ThinkThoroughlyWithItsOwnResearch,
+        "generate_prediction_for_one_outcome",
+        staticmethod(generate_prediction_for_one_outcome),
+    )
+    monkeypatch.setattr(
+        think_thoroughly_agent, "get_event_date_from_question", lambda question: None
+    )
+    monkeypatch.setattr(
+        agent,
+        "get_hypohetical_scenarios",
+        lambda question: Scenarios(scenarios=SCENARIOS[:3]),
+    )
+    monkeypatch.setattr(
+        agent,
+        "get_required_conditions",
+        lambda question: Scenarios(scenarios=SCENARIOS[3:]),
+    )
+    monkeypatch.setattr(agent, "research_final_decision", research_final_decision)
+    monkeypatch.setattr(agent, "generate_final_decision", generate_final_decision)
+    agent.scenario_executor = "thread"
+    return calls
+
+
+def test_answer_binary_market_pipeline(
+    agent: ThinkThoroughlyBase, pipeline_calls: PipelineCalls
+) -> None:
+    question = MARKETS[HexAddress(HexStr("0xa"))]
+
+    async def answer_from_running_loop() -> ProbabilisticAnswer | None:
+        return agent.answer_binary_market(question)
+
+    answer = asyncio.run(answer_from_running_loop())
+
+    assert answer == ProbabilisticAnswer(p_yes=Probability(0.5), confidence=0.5)
+    # The research starts only once all the scenarios have succeeded.
+    assert pipeline_calls.events == ["scenario"] * len(SCENARIOS) + [
+        "research",
+        "final_decision",
+    ]
+    kwargs = pipeline_calls.final_decision_kwargs
+    assert [s for s, _ in kwargs["scenarios_with_probabilities"]] == SCENARIOS
+    assert kwargs["research_report"] == f"Research of {question}"
+    context: FinalDecisionContext = kwargs["context"]
+    assert context.correlated_markets[0].question_title == question
+
+
+def test_answer_binary_market_runs_kickoffs_one_at_a_time(
+    agent: ThinkThoroughlyBase,
+    pipeline_calls: PipelineCalls,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    running: list[str] = []
+    overlapped: list[str] = []
+
+    def kickoff(name: str, scenarios: list[str]) -> t.Callable[[str], Scenarios]:
+        def run(question: str) -> Scenarios:
+            if running:
+                overlapped.append(name)
+            running.append(name)
+            time.sleep(0.2)
+            running.remove(name)
+            return Scenarios(scenarios=scenarios)
+
+        return run
+
+    monkeypatch.setattr(
+        agent, "get_hypohetical_scenarios", kickoff("hypothetical", SCENARIOS[:3])
+    )
+    monkeypatch.setattr(
+        agent, "get_required_conditions", kickoff("conditional", SCENARIOS[3:])
+    )
+
+    agent.answer_binary_market(MARKETS[HexAddress(HexStr("0xa"))])
+
+    assert not overlapped
+
+
+def test_answer_binary_market_failed_scenarios_skip_research(
+    agent: ThinkThoroughlyBase,
+    pipeline_calls: PipelineCalls,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(
+        agent,
+        "get_required_conditions",
+        lambda question: Scenarios(scenarios=[f"{s} fails" for s in SCENARIOS[3:]]),
+    )
+    monkeypatch.setattr(
+        agent,
+        "get_hypohetical_scenarios",
+        lambda question: Scenarios(scenarios=[f"{SCENARIOS[0]} fails"]),
+    )
+
+    with pytest.raises(ValueError, match="Too many of sub_predictions have failed"):
+        agent.answer_binary_market(MARKETS[HexAddress(HexStr("0xa"))])
+    assert "research" not in pipeline_calls.events
+    assert "final_decision" not in pipeline_calls.events
+
+
+def test_generate_final_decision_without_context_in_running_loop(
+    agent: ThinkThoroughlyBase, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    researched: list[str] = []
+
+    async def research_final_decision(question: str) -> str:
+        researched.append(question)
+        return "Research report"
+
+    crew = Mock()
+    crew.return_value.kickoff.return_value = Mock(
+        pydantic=ProbabilisticAnswer(p_yes=Probability(0.7), confidence=0.6)
+    )
+    monkeypatch.setattr(think_thoroughly_agent, "Crew", crew)
+    monkeypatch.setattr(think_thoroughly_agent, "Task", Mock())
+    monkeypatch.setattr(
+        ThinkThoroughlyBase, "_get_predictor", staticmethod(lambda model: Mock())
+    )
+    monkeypatch.setattr(
+        think_thoroughly_agent, "get_event_date_from_question", lambda question: None
+    )
+    monkeypatch.setattr(agent, "research_final_decision", research_final_decision)
+    question = MARKETS[HexAddress(HexStr("0xa"))]
+
+    async def decide_from_running_loop() -> ProbabilisticAnswer:
+        return agent.generate_final_decision(question, [], created_time=None)
+
+    answer = asyncio.run(decide_from_running_loop())
+
+    assert answer.p_yes == 0.7
+    assert researched == [question]
+    inputs = crew.return_value.kickoff.call_args.kwargs["inputs"]
+    assert inputs["research_report"] == "Research report"
+    assert question in inputs["correlated_markets"]
+
+
+def test_generate_scenario_predictions_base_exception(
+    agent: ThinkThoroughlyBase,
+) -> None:
+    agent.scenario_executor = "thread"
+    scenarios = [SCENARIOS[0], f"{SCENARIOS[1]} exits", SCENARIOS[2]]
+
+    results = asyncio.run(
+        agent.generate_scenario_predictions(uuid4(), "Question?", scenarios, [])
+    )
+
+    # Only the scenario itself fails, the rest of the batch isn't aborted.
+    assert [(s, p is not None) for s, p in results] == [
+        (scenarios[0], True),
+        (scenarios[1], False),
+        (scenarios[2], True),
+    ]
+
+
+@pytest.mark.parametrize(
+    "scenario_quorum, deadline_seconds", [(0.75, None), (None, 1.0)]
+)
+def test_generate_scenario_predictions_leaves_out_slow_scenarios(
+    agent: ThinkThoroughlyBase,
+    scenario_quorum: float | None,
+    deadline_seconds: float | None,
+) -> None:
+    agent.scenario_executor = "thread"
+    agent.scenario_quorum = scenario_quorum
+    scenarios = SCENARIOS[:3] + [f"{SCENARIOS[3]} slow"]
+
+    async def generate() -> list[tuple[str, AnswerWithScenario | None]]:
+        deadline = (
+            asyncio.get_running_loop().time() + deadline_seconds
+            if deadline_seconds is not None
+            else None
+        )
+        return await agent.generate_scenario_predictions(
+            uuid4(), "Question?", scenarios, [], deadline
+        )
+
+    start = time.monotonic()
+    results = asyncio.run(generate())
+
+    # Returned without waiting for the slow scenario, which has no prediction.
+    assert time.monotonic() - start < SLOW_SCENARIO_SECONDS
+    assert [(s, p is not None) for s, p in results] == [
+        (s, True) for s in SCENARIOS[:3]
+    ] + [(scenarios[3], False)]
+    # The pool with the slow scenario still running isn't used for the next market.
+    assert agent._scenario_thread_pool is None
+    assert len(agent._straggling_scenarios) == 1
+
+
+def test_scenario_process_pool_is_killed_with_stragglers(
+    agent: ThinkThoroughlyBase,
+) -> None:
+    agent.scenario_executor = "process"
+    agent.max_concurrent_scenarios = 2
+    agent.scenario_quorum = 0.5
+    scenarios = [f"{SCENARIOS[0]} slow", SCENARIOS[1]]
+
+    results = asyncio.run(
+        agent.generate_scenario_predictions(uuid4(), "Question?", scenarios, [])
+    )
+
+    assert [(s, p is not None) for s, p in results] == [
+        (scenarios[0], False),
+        (scenarios[1], True),
+    ]
+    # The workers with the slow scenario are killed, the next market gets new ones.
+    assert agent._scenario_process_pool is None
+    assert agent._straggling_scenarios == []
+
+
+def test_scenario_thread_pool_is_limited_while_stragglers_run(
+    agent: ThinkThoroughlyBase,
+) -> None:
+    agent.scenario_executor = "thread"
+    agent.max_concurrent_scenarios = 2
+    agent.scenario_quorum = 0.5
+    scenarios = [f"{SCENARIOS[0]} slow", SCENARIOS[1]]
+
+    asyncio.run(
+        agent.generate_scenario_predictions(uuid4(), "Question?", scenarios, [])
+    )
+    assert len(agent._straggling_scenarios) == 1
+
+    # The straggler and the next market together use at most `max_concurrent_scenarios` threads.
+    assert agent._get_scenario_thread_pool()._max_workers == 1
+    agent._straggling_scenarios[0].result(timeout=SLOW_SCENARIO_SECONDS + 1)
+    # Back to the full size once the straggler is done.
+    assert agent._get_scenario_thread_pool()._max_workers == 2
+    assert agent._straggling_scenarios == []
+
+
+def make_answer(
+    scenario: str, p_yes: float, confidence: float = 0.5
+) -> AnswerWithScenario:
+    return AnswerWithScenario(
+        scenario=scenario,
+        original_question="Question?",
+        p_yes=Probability(p_yes),
+        confidence=confidence,
+        reasoning="Reasoning.",
+    )
+
+
+def test_get_unconverged_scenarios(agent: ThinkThoroughlyBase) -> None:
+    agent.convergence_tolerance = 0.1
+    previous_predictions = {
+        0: make_answer(SCENARIOS[0], 0.5),
+        1: make_answer(SCENARIOS[1], 0.5),
+        2: make_answer(SCENARIOS[2], 0.5),
+        4: make_answer(SCENARIOS[4], 0.5),
+    }
+    predictions = {
+        # Converged.
+        0: make_answer(SCENARIOS[0], 0.55),
+        # Not converged, by `p_yes` or by confidence.
+        1: make_answer(SCENARIOS[1], 0.7),
+        2: make_answer(SCENARIOS[2], 0.5, confidence=0.9),
+        # Not converged, without a prediction in one of the iterations.
+        3: make_answer(SCENARIOS[3], 0.5),
+    }
+
+    assert agent._get_unconverged_scenarios(
+        list(range(5)), previous_predictions, predictions
+    ) == [1, 2, 3, 4]
+    # Only the given scenarios are checked.
+    assert agent._get_unconverged_scenarios(
+        [0, 1], previous_predictions, predictions
+    ) == [1]
+
+
+def test_get_unconverged_scenarios_all_converged(agent: ThinkThoroughlyBase) -> None:
+    agent.convergence_tolerance = 0.1
+    predictions = {i: make_answer(s, 0.5) for i, s in enumerate(SCENARIOS)}
+
+    assert (
+        agent._get_unconverged_scenarios(
+            list(range(len(SCENARIOS))), predictions, predictions
+        )
+        == []
+    )
+
+
+def test_get_unconverged_scenarios_duplicates(agent: ThinkThoroughlyBase) -> None:
+    agent.convergence_tolerance = 0.1
+    # The same scenario twice, only the second one moved.
+    previous_predictions = {
+        0: make_answer(SCENARIOS[0], 0.5),
+        1: make_answer(SCENARIOS[0], 0.5),
+    }
+    predictions = {0: make_answer(SCENARIOS[0], 0.5), 1: make_answer(SCENARIOS[0], 0.9)}
+
+    assert agent._get_unconverged_scenarios(
+        [0, 1], previous_predictions, predictions
+    ) == [1]
+
+
+def test_generate_scenarios_with_probs_keeps_duplicates(
+    agent: ThinkThoroughlyBase,
+) -> None:
+    agent.scenario_executor = "thread"
+    agent.convergence_tolerance = 0.1
+    hypothetical = Scenarios(scenarios=[SCENARIOS[0], SCENARIOS[1], SCENARIOS[0]])
+    conditional = Scenarios(scenarios=[SCENARIOS[2]])
+
+    results = asyncio.run(
+        agent._generate_scenarios_with_probs(
+            "Question?", hypothetical, conditional, n_iterations=3, deadline=None
+        )
+    )
+
+    # Every occurrence keeps its own prediction, in the order of the scenarios.
+    assert [s for s, _ in results] == hypothetical.scenarios + conditional.scenarios
+
+
+def test_generate_scenarios_with_probs_keeps_previous_prediction(
+    agent: ThinkThoroughlyBase, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    agent.convergence_tolerance = 0.1
+    iterations = iter(
+        [
+            [make_answer(SCENARIOS[0], 0.5), make_answer(SCENARIOS[1], 0.5)],
+            # The re-run of the second scenario was cut off.
+            [make_answer(SCENARIOS[0], 0.9), None],
+        ]
+    )
+    runs: list[list[str]] = []
+
+    async def generate_scenario_predictions(
+        unique_id: UUID,
+        question: str,
+        scenarios: list[str],
+        previous_scenarios_and_answers: list[tuple[str, AnswerWithScenario]],
+        deadline: float | None = None,
+    ) -> list[tuple[str, AnswerWithScenario | None]]:
+        runs.append(scenarios)
+        return list(zip(scenarios, next(iterations)))
+
+    monkeypatch.setattr(
+        agent, "generate_scenario_predictions", generate_scenario_predictions
+    )
+
+    results = asyncio.run(
+        agent._generate_scenarios_with_probs(
+            "Question?",
+            Scenarios(scenarios=SCENARIOS[:1]),
+            Scenarios(scenarios=SCENARIOS[1:2]),
+            n_iterations=2,
+            deadline=None,
+        )
+    )
+
+    # The cut off scenario keeps its prediction from the first iteration.
+    assert runs == [SCENARIOS[:2]] * 2
+    assert [(s, p.p_yes) for s, p in results] == [
+        (SCENARIOS[0], 0.9),
+        (SCENARIOS[1], 0.5),
+    ]
+
+
+def test_build_llm_is_cached_per_thread(monkeypatch: pytest.MonkeyPatch) -> None:
+    get_cached_api_keys.cache_clear()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    read_keys = Mock(wraps=APIKeys)
+    monkeypatch.setattr(utils, "APIKeys", read_keys)
+
+    def build_llms() -> list[LLM]:
+        return [
+            ThinkThoroughlyBase._build_llm(model)
+            for model in ["gpt-4o", "gpt-4o", "gpt-4o-mini"]
+        ]
+
+    try:
+        llms = build_llms()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            other_thread_llms = executor.submit(build_llms).result()
+    finally:
+        get_cached_api_keys.cache_clear()
+
+    # Same instance for the same model in the same thread, another one in the other thread.
+    assert llms[0] is llms[1] and llms[0] is not llms[2]
+    assert other_thread_llms[0] is other_thread_llms[1]
+    assert {id(llm) for llm in llms}.isdisjoint(id(llm) for llm in other_thread_llms)
+    # The keys are read once for all of them.
+    assert read_keys.call_count == 1
@@ -3,6 +3,7 @@ from typing import Generator
 import pytest
 from prediction_market_agent_tooling.tools.db.db_manager import DBManager
 
+from prediction_market_agent.db.engine_registry import DBEngineRegistry
 from prediction_market_agent.db.evaluated_goal_table_handler import (
     EvaluatedGoalTableHandler,
 )
@@ -10,6 +11,12 @@ from prediction_market_agent.db.long_term_memory_table_handler import (
     LongTermMemoryTableHandler,
 )
 from prediction_market_agent.db.prompt_table_handler import PromptTableHandler
+from prediction_market_agent.db.replicated_markets_table_handler import (
+    ReplicatedMarketsTableHandler,
+)
+from prediction_market_agent.db.vector_index_sync_state_table_handler import (
+    VectorIndexSyncStateTableHandler,
+)
 
 
 @pytest.fixture(scope="session")
@@ -52,6 +59,7 @@ def reset_init_params_db_manager(db_manager: DBManager) -> None:
     db_manager._engine.dispose()
     db_manager._initialized = False
     db_manager.cache_table_initialized = {}
+    DBEngineRegistry.reset()
 
 
 @pytest.fixture(scope="module")
@@ -70,3 +78,23 @@ def evaluated_goal_table_handler(
     )
     yield table_handler
     reset_init_params_db_manager(table_handler.sql_handler.db_manager)
+
+
+@pytest.fixture(scope="function")
+def replicated_markets_table_handler() -> (
+    Generator[ReplicatedMarketsTableHandler, None, None]
+):
+    """Creates a in-memory SQLite DB for testing"""
+    table_handler = ReplicatedMarketsTableHandler(sqlalchemy_db_url="sqlite://")
+    yield table_handler
+    reset_init_params_db_manager(table_handler.sql_handler.db_manager)
+
+
+@pytest.fixture(scope="function")
+def vector_index_sync_state_table_handler() -> (
+    Generator[VectorIndexSyncStateTableHandler, None, None]
+):
+    """Creates a in-memory SQLite DB for testing"""
+    table_handler = VectorIndexSyncStateTableHandler(sqlalchemy_db_url="sqlite://")
+    yield table_handler
+    reset_init_params_db_manager(table_handler.sql_handler.db_manager)
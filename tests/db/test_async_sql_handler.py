@@ -0,0 +1,77 @@
+import asyncio
+import datetime
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from prediction_market_agent_tooling.tools.utils import utcnow
+from sqlmodel import col
+
+from prediction_market_agent.db.engine_registry import DBEngineRegistry
+from prediction_market_agent.db.long_term_memory_table_handler import (
+    AsyncLongTermMemoryTableHandler,
+)
+from prediction_market_agent.db.models import Prompt
+from prediction_market_agent.db.prompt_table_handler import AsyncPromptTableHandler
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def sqlite_db_url(tmp_path: Path) -> Generator[str, None, None]:
+    # File-backed, because in-memory SQLite shares a single connection between all sessions,
+    # and concurrent sessions on it would interfere with each other's transactions.
+    DBEngineRegistry.reset()
+    yield f"sqlite:///{tmp_path / 'test.db'}"
+    DBEngineRegistry.reset()
+
+
+def test_async_sql_handler(sqlite_db_url: str) -> None:
+    async def run() -> None:
+        handler = AsyncPromptTableHandler(
+            session_identifier="a", sqlalchemy_db_url=sqlite_db_url
+        )
+        await handler.sql_handler.save_multiple(
+            [
+                Prompt(prompt="prompt1", datetime_=utcnow(), session_identifier="a"),
+                Prompt(
+                    prompt="prompt2",
+                    datetime_=utcnow() + datetime.timedelta(days=1),
+                    session_identifier="b",
+                ),
+            ]
+        )
+        assert await handler.sql_handler.count() == 2
+        assert (
+            await handler.sql_handler.count(
+                query_filters=[col(Prompt.session_identifier) == "b"]
+            )
+            == 1
+        )
+        latest = await handler.fetch_latest_prompt()
+        assert latest is not None
+        assert latest.prompt == "prompt1"
+
+    asyncio.run(run())
+
+
+def test_async_long_term_memory_table_handler(sqlite_db_url: str) -> None:
+    async def run() -> None:
+        handler = AsyncLongTermMemoryTableHandler(
+            task_description="test", sqlalchemy_db_url=sqlite_db_url
+        )
+        # Writes can overlap with other work on the event loop.
+        await asyncio.gather(
+            handler.save_history([{"a": 1}]),
+            handler.save_history([{"a": 2}]),
+        )
+        assert await handler.count() == 2
+        results = await handler.search(metadata_filters={"a": 2})
+        assert [r.metadata_dict for r in results] == [{"a": 2}]
+
+    asyncio.run(run())
+
+
+def test_async_sql_handler_rejects_in_memory_sqlite() -> None:
+    with pytest.raises(ValueError, match="In-memory SQLite"):
+        AsyncPromptTableHandler(session_identifier="a", sqlalchemy_db_url="sqlite://")
@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from prediction_market_agent.db.bloom_filter import BloomFilter
+from prediction_market_agent.db.embedding_cache import encode_text
+
+
+def test_bloom_filter(tmp_path: Path) -> None:
+    path = tmp_path / "ids.bloom"
+    ids = [encode_text(str(i)) for i in range(1000)]
+    bloom_filter = BloomFilter(path, capacity=1000, false_positive_rate=1e-4)
+    bloom_filter.add(ids[:500])
+    bloom_filter.flush()
+
+    # Persisted, and no false negatives.
+    bloom_filter = BloomFilter(path, capacity=1000, false_positive_rate=1e-4)
+    assert all(id in bloom_filter for id in ids[:500])
+    n_false_positives = sum(id in bloom_filter for id in ids[500:])
+    assert n_false_positives <= 1
+
+    with pytest.raises(ValueError):
+        BloomFilter(path, capacity=2000, false_positive_rate=1e-4)
+
+
+def test_bloom_filter_concurrent_add() -> None:
+    ids = [encode_text(str(i)) for i in range(2000)]
+    bloom_filter = BloomFilter(capacity=2000, false_positive_rate=1e-4)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(bloom_filter.add, [ids[i::4] for i in range(4)]))
+
+    assert all(id in bloom_filter for id in ids)
+    assert bloom_filter.approximate_count == pytest.approx(len(ids), rel=0.05)
+
+
+def test_bloom_filter_over_capacity_and_clear(tmp_path: Path) -> None:
+    path = tmp_path / "ids.bloom"
+    ids = [encode_text(str(i)) for i in range(300)]
+    bloom_filter = BloomFilter(path, capacity=100, false_positive_rate=1e-4)
+    with patch("prediction_market_agent.db.bloom_filter.logger") as logger:
+        bloom_filter.add(ids[:100])
+        logger.warning.assert_not_called()
+        bloom_filter.add(ids[100:])
+        logger.warning.assert_called_once()
+    assert bloom_filter.fill_ratio > BloomFilter.TARGET_FILL_RATIO
+
+    bloom_filter.clear()
+    bloom_filter.flush()
+    bloom_filter = BloomFilter(path, capacity=100, false_positive_rate=1e-4)
+    assert bloom_filter.fill_ratio == 0
+    assert not any(id in bloom_filter for id in ids)
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from prediction_market_agent.db.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    n_embedded: int = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.n_embedded += len(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        self.n_embedded += 1
+        return super().embed_query(text)
+
+
+def test_cached_embeddings(tmp_path: Path) -> None:
+    db_url = f"sqlite:///{tmp_path / 'cache.sqlite'}"
+    embedding = CountingEmbedding(size=8)
+    cached = CachedEmbeddings(embedding, model="model-a", sqlalchemy_db_url=db_url)
+
+    vectors = cached.embed_documents(["foo", "bar", "foo"])
+    assert embedding.n_embedded == 2
+    assert vectors[0] == vectors[2]
+    np.testing.assert_allclose(
+        vectors[1], embedding.embed_query("bar"), rtol=1e-3, atol=1e-3
+    )
+    embedding.n_embedded = 0
+
+    # Both documents and queries are served from the cache, also by a new instance.
+    cached = CachedEmbeddings(embedding, model="model-a", sqlalchemy_db_url=db_url)
+    assert cached.embed_query("bar") == vectors[1]
+    assert cached.embed_documents(["bar", "foo"]) == [vectors[1], vectors[0]]
+    assert embedding.n_embedded == 0
+
+    # Entries are scoped by the model.
+    other_model = CachedEmbeddings(embedding, model="model-b", sqlalchemy_db_url=db_url)
+    other_model.embed_query("foo")
+    assert embedding.n_embedded == 1
+
+
+def test_cached_embeddings_sqlite_uses_wal(tmp_path: Path) -> None:
+    db_url = f"sqlite:///{tmp_path / 'cache.sqlite'}?timeout=30"
+    cached = CachedEmbeddings(
+        CountingEmbedding(size=8), model="model-a", sqlalchemy_db_url=db_url
+    )
+    with cached.sql_handler.db_manager.get_connection() as connection:
+        journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+    assert journal_mode == "wal"
@@ -101,3 +101,26 @@ def test_save_load_evaluated_goal_multiple_agents(
     assert len(loaded_models) == 1
     loaded_evaluated_goal = EvaluatedGoal.from_model(model=loaded_models[0])
     assert loaded_evaluated_goal == evaluated_goal0
+
+
+def test_get_latest_evaluated_goals_only_columns(
+    evaluated_goal_table_handler: EvaluatedGoalTableHandler, mocked_agent_id: str
+) -> None:
+    evaluated_goal = EvaluatedGoal(
+        goal="abc",
+        motivation="def",
+        completion_criteria="ghi",
+        is_complete=True,
+        reasoning="jkl",
+        output=None,
+    )
+    evaluated_goal_table_handler.save_evaluated_goal(
+        model=evaluated_goal.to_model(agent_id=mocked_agent_id)
+    )
+
+    rows = evaluated_goal_table_handler.get_latest_evaluated_goals(
+        limit=1, columns=EvaluatedGoal.MODEL_COLUMNS
+    )
+    # Plain rows of only the given columns, readable without a session.
+    assert [tuple(row._fields) for row in rows] == [EvaluatedGoal.MODEL_COLUMNS]
+    assert EvaluatedGoal.model_validate(rows[0]._asdict()) == evaluated_goal
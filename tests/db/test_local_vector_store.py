@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from prediction_market_agent.db.local_vector_store import (
+    LocalVectorStore,
+    VectorQuantization,
+)
+
+TEXTS = ["foo", "bar", "baz", "qux"]
+
+
+def build_store(
+    index_dir: Path | None = None, quantization: VectorQuantization = "float32"
+) -> LocalVectorStore:
+    return LocalVectorStore(
+        embedding=DeterministicFakeEmbedding(size=16),
+        index_dir=index_dir,
+        quantization=quantization,
+    )
+
+
+def test_local_vector_store_search() -> None:
+    store = build_store()
+    store.add_texts(TEXTS, metadatas=[{"i": i} for i in range(len(TEXTS))], ids=TEXTS)
+
+    docs_and_scores = store.similarity_search_with_relevance_scores("bar", k=2)
+    assert len(docs_and_scores) == 2
+    doc, score = docs_and_scores[0]
+    assert doc.page_content == "bar"
+    assert doc.metadata == {"i": 1}
+    assert abs(score - 1.0) < 1e-5
+
+    docs = store.similarity_search("bar", k=10, filter={"i": {"$gte": 2}})
+    assert {doc.page_content for doc in docs} == {"baz", "qux"}
+    docs = store.similarity_search(
+        "bar", k=10, filter={"$or": [{"i": 0}, {"i": {"$in": [3]}}]}
+    )
+    assert {doc.page_content for doc in docs} == {"foo", "qux"}
+
+
+def test_local_vector_store_persistence(tmp_path: Path) -> None:
+    store = build_store(tmp_path)
+    store.add_texts(TEXTS[:2], ids=TEXTS[:2])
+    store.add_texts(TEXTS[2:], ids=TEXTS[2:])
+    # Upsert of an existing id doesn't add a new entry.
+    store.add_texts(["foo"], metadatas=[{"updated": True}], ids=["foo"])
+
+    reloaded = build_store(tmp_path)
+    assert reloaded.get_ids() == TEXTS
+    assert "foo" in reloaded and "quux" not in reloaded
+    doc = reloaded.similarity_search("foo", k=1)[0]
+    assert doc.page_content == "foo"
+    assert doc.metadata == {"updated": True}
+    assert reloaded.similarity_search("qux", k=1)[0].page_content == "qux"
+
+
+def test_local_vector_store_concurrent_add() -> None:
+    store = build_store()
+    texts = [str(i) for i in range(100)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(
+            executor.map(
+                lambda chunk: store.add_texts(chunk, ids=chunk),
+                [texts[i : i + 10] for i in range(0, len(texts), 10)],
+            )
+        )
+    assert sorted(store.get_ids()) == sorted(texts)
+    assert store.similarity_search("42", k=1)[0].page_content == "42"
+
+
+def test_local_vector_store_concurrent_add_and_search() -> None:
+    store = build_store()
+    store.add_texts(["0"], metadatas=[{"i": 0}], ids=["0"])
+
+    def add(i: int) -> None:
+        store.add_texts([str(i)], metadatas=[{"i": i}], ids=[str(i)])
+
+    def search(i: int) -> None:
+        # Filtered, so that the lazily built metadata columns are exercised as well.
+        docs = store.similarity_search("0", k=3, filter={"i": {"$gte": 0}})
+        assert 1 <= len(docs) <= 3
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(add if i % 2 else search, i) for i in range(1, 200)]
+        for future in futures:
+            future.result()
+    assert len(store) == 1 + 100
+
+
+def test_local_vector_store_search_by_vectors() -> None:
+    store = build_store()
+    store.add_texts(TEXTS, ids=TEXTS)
+    embedding = DeterministicFakeEmbedding(size=16)
+
+    results = store.similarity_search_by_vectors_with_score(
+        [embedding.embed_query("baz"), embedding.embed_query("foo")], k=2
+    )
+    assert [docs_and_scores[0][0].page_content for docs_and_scores in results] == [
+        "baz",
+        "foo",
+    ]
+    assert all(len(docs_and_scores) == 2 for docs_and_scores in results)
+    assert all(a[1] >= b[1] for a, b in results)
+
+
+def test_local_vector_store_int8(tmp_path: Path) -> None:
+    texts = [str(i) for i in range(50)]
+    exact = build_store()
+    exact.add_texts(texts, ids=texts)
+    store = build_store(tmp_path, quantization="int8")
+    store.add_texts(texts[:30], ids=texts[:30])
+    store.add_texts(texts[30:], ids=texts[30:])
+    assert store.vectors_nbytes < exact.vectors_nbytes / 2
+
+    reloaded = build_store(tmp_path, quantization="int8")
+    for text in ["7", "42"]:
+        expected = exact.similarity_search_with_score(text, k=5)
+        found = reloaded.similarity_search_with_score(text, k=5)
+        assert found[0][0].page_content == text
+        assert [doc.id for doc, _ in found] == [doc.id for doc, _ in expected]
+        assert all(abs(a[1] - b[1]) < 1e-2 for a, b in zip(found, expected))
+
+    with pytest.raises(ValueError):
+        build_store(tmp_path)
@@ -1,8 +1,15 @@
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
 from prediction_market_agent_tooling.tools.utils import utcnow
 
+from prediction_market_agent.db import json_codec
+from prediction_market_agent.db.long_term_memory_archive import LongTermMemoryArchive
 from prediction_market_agent.db.long_term_memory_table_handler import (
     LongTermMemoryTableHandler,
 )
+from prediction_market_agent.db.models import LongTermMemories
 
 
 def test_save_load_long_term_memory_item(
@@ -28,3 +35,119 @@ def test_save_load_long_term_memory_item(
 
     # Retrieve all
     assert len(long_term_memory_table_handler.search()) == 2
+
+
+def test_search_long_term_memory_columns(
+    long_term_memory_table_handler: LongTermMemoryTableHandler,
+) -> None:
+    long_term_memory_table_handler.save_history([{"a": 1}, {"a": 2}])
+
+    rows = long_term_memory_table_handler.search(
+        columns=["datetime_", "metadata_json"], metadata_filters={"a": 2}
+    )
+    # Plain rows of only the given columns, readable without a session.
+    assert [row._fields for row in rows] == [("datetime_", "metadata_json")]
+    assert rows[0].metadata_json == {"a": 2}
+
+
+def test_iterate_long_term_memory_items(
+    long_term_memory_table_handler: LongTermMemoryTableHandler,
+) -> None:
+    items = [{"i": i} for i in range(7)]
+    long_term_memory_table_handler.save_history(items)
+
+    # Page size that doesn't divide the number of items, to cover the last partial page.
+    results = list(long_term_memory_table_handler.iterate(page_size=3))
+    assert len(results) == len(items)
+    assert len({r.id for r in results}) == len(items)
+    # Newest first, as in `search`.
+    assert all(a.datetime_ >= b.datetime_ for a, b in zip(results, results[1:]))
+
+
+def test_buffered_writes_long_term_memory(
+    long_term_memory_table_handler: LongTermMemoryTableHandler,
+) -> None:
+    with long_term_memory_table_handler.buffered_writes(max_size=3):
+        long_term_memory_table_handler.save_history([{"a": 1}, {"a": 2}])
+        # Nothing written until the buffer is full.
+        assert long_term_memory_table_handler.count() == 0
+        long_term_memory_table_handler.save_history([{"a": 3}])
+        assert long_term_memory_table_handler.count() == 3
+        long_term_memory_table_handler.save_history([{"a": 4}])
+        assert long_term_memory_table_handler.count() == 3
+    # Rest is written on exit.
+    assert long_term_memory_table_handler.count() == 4
+
+
+def test_buffered_writes_long_term_memory_flushed_on_error(
+    long_term_memory_table_handler: LongTermMemoryTableHandler,
+) -> None:
+    with pytest.raises(ValueError):
+        with long_term_memory_table_handler.buffered_writes():
+            long_term_memory_table_handler.save_history([{"a": 1}])
+            raise ValueError("Failure in the middle of processing.")
+    assert long_term_memory_table_handler.count() == 1
+
+
+def test_search_long_term_memory_by_metadata(
+    long_term_memory_table_handler: LongTermMemoryTableHandler,
+) -> None:
+    long_term_memory_table_handler.save_history(
+        [
+            {"original_question": "foo", "p_yes": 0.5, "resolved": True},
+            {"original_question": "bar", "p_yes": 0.7, "resolved": False},
+        ]
+    )
+
+    results = long_term_memory_table_handler.search(
+        metadata_filters={"original_question": "bar"}
+    )
+    assert len(results) == 1
+    assert results[0].metadata_dict == {
+        "original_question": "bar",
+        "p_yes": 0.7,
+        "resolved": False,
+    }
+
+    results = long_term_memory_table_handler.search(
+        metadata_filters={"p_yes": 0.5, "resolved": True}
+    )
+    assert len(results) == 1
+    assert results[0].metadata_dict is not None
+    assert results[0].metadata_dict["original_question"] == "foo"
+
+
+def test_archive_long_term_memory(
+    long_term_memory_table_handler: LongTermMemoryTableHandler,
+    tmp_path: Path,
+) -> None:
+    archive = LongTermMemoryArchive(tmp_path)
+    now = utcnow()
+    long_term_memory_table_handler.sql_handler.save_multiple(
+        [
+            LongTermMemories(
+                task_description=long_term_memory_table_handler.task_description,
+                # Mix of rows with the JSON column and legacy rows with only the text one.
+                metadata_json={"i": i} if i % 2 else None,
+                metadata_=None if i % 2 else json_codec.dumps({"i": i}),
+                datetime_=now - timedelta(days=i),
+            )
+            for i in range(5)
+        ]
+    )
+
+    n_archived = long_term_memory_table_handler.archive_older_than(
+        archive, older_than=now - timedelta(days=2, hours=1), batch_size=1
+    )
+    assert n_archived == 2
+    assert long_term_memory_table_handler.count() == 3
+    # One file per day.
+    assert len(list(tmp_path.rglob("*.parquet"))) == 2
+
+    results = long_term_memory_table_handler.search_including_archive(archive)
+    assert [r.metadata_dict for r in results] == [{"i": i} for i in range(5)]
+
+    results = long_term_memory_table_handler.search_including_archive(
+        archive, to_=now - timedelta(days=1), metadata_filters={"i": 3}
+    )
+    assert [r.metadata_dict for r in results] == [{"i": 3}]
@@ -1,14 +1,23 @@
+from pathlib import Path
 from typing import Generator
 from unittest.mock import Mock, patch
 
 import pytest
 from eth_typing import HexAddress, HexStr
-from langchain_chroma import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_pinecone import PineconeVectorStore
+from prediction_market_agent_tooling.gtypes import Wei
+from prediction_market_agent_tooling.markets.omen.data_models import OmenMarket
 
 from prediction_market_agent.agents.think_thoroughly_agent.models import (
     PineconeMetadata,
 )
-from prediction_market_agent.db.pinecone_handler import PineconeHandler
+from prediction_market_agent.db.pinecone_handler import (
+    INDEX_NAME,
+    LocalPineconeHandler,
+    PineconeHandler,
+)
+from prediction_market_agent.tools.rate_limiter import RateLimiter
 from tests.utils import RUN_PAID_TESTS
 
 TRUMP_MARKETS = [
@@ -30,6 +39,9 @@ MOCK_CLOSING_TIMESTAMP = 100
 
 @pytest.fixture()
 def test_pinecone_handler() -> Generator[PineconeHandler, None, None]:
+    # Only needed by the paid tests, so the rest runs without `chromadb`.
+    from langchain_chroma import Chroma
+
     with patch(
         "prediction_market_agent.db.pinecone_handler.PineconeHandler.build_vectorstore",
         Mock(return_value=None),
@@ -75,3 +87,200 @@ def test_search_filter_metadata_works(test_pinecone_handler: PineconeHandler) ->
         },
     )
     assert len(questions) == 0
+
+
+def test_local_pinecone_handler(tmp_path: Path) -> None:
+    handler = LocalPineconeHandler(
+        index_dir=tmp_path, embeddings=DeterministicFakeEmbedding(size=16)
+    )
+    texts = TRUMP_MARKETS + BIDEN_MARKETS
+    handler.insert_texts(
+        ids=[handler.encode_text(text) for text in texts],
+        texts=texts,
+        metadatas=[
+            PineconeMetadata(
+                question_title=text,
+                market_address=HexAddress(HexStr("")),
+                close_time_timestamp=MOCK_CLOSING_TIMESTAMP,
+            ).model_dump()
+            for text in texts
+        ],
+    )
+    assert set(handler.get_existing_ids_in_index()) == {
+        handler.encode_text(text) for text in texts
+    }
+
+    # Fake embeddings aren't semantic, but the exact same text is always the nearest one.
+    questions = handler.find_nearest_questions_with_threshold(
+        limit=1, text=BIDEN_MARKETS[0], threshold=0.99
+    )
+    assert [q.question_title for q in questions] == [BIDEN_MARKETS[0]]
+
+
+def test_local_pinecone_handler_bulk_insert(tmp_path: Path) -> None:
+    handler = LocalPineconeHandler(
+        index_dir=tmp_path, embeddings=DeterministicFakeEmbedding(size=16)
+    )
+    texts = [f"Will it rain on day {i}?" for i in range(25)]
+    ids = [handler.encode_text(text) for text in texts]
+    handler.bulk_insert_texts(
+        ids=ids,
+        texts=texts,
+        metadatas=[{"i": i} for i in range(len(texts))],
+        chunk_size=4,
+        max_concurrent_chunks=3,
+    )
+    assert handler.get_ids_in_index(ids + ["missing"]) == set(ids)
+
+
+def test_local_pinecone_handler_batch_query(tmp_path: Path) -> None:
+    handler = LocalPineconeHandler(
+        index_dir=tmp_path, embeddings=DeterministicFakeEmbedding(size=16)
+    )
+    texts = TRUMP_MARKETS + BIDEN_MARKETS
+    handler.insert_texts(
+        ids=[handler.encode_text(text) for text in texts],
+        texts=texts,
+        metadatas=[
+            PineconeMetadata(
+                question_title=text,
+                market_address=HexAddress(HexStr("")),
+                close_time_timestamp=MOCK_CLOSING_TIMESTAMP,
+            ).model_dump()
+            for text in texts
+        ],
+    )
+
+    results = handler.find_nearest_questions_batch(
+        texts=[BIDEN_MARKETS[1], TRUMP_MARKETS[0]], limit=1, threshold=0.99
+    )
+    assert [[q.question_title for q in questions] for questions in results] == [
+        [BIDEN_MARKETS[1]],
+        [TRUMP_MARKETS[0]],
+    ]
+    # Same as the single-text version.
+    assert results[0] == handler.find_nearest_questions_with_threshold(
+        limit=1, text=BIDEN_MARKETS[1], threshold=0.99
+    )
+
+
+def test_deduplicate_markets() -> None:
+    markets: list[OmenMarket] = [
+        Mock(question_title=title, collateralVolume=Wei(volume))
+        for title, volume in [
+            (BIDEN_MARKETS[0], 1),
+            (TRUMP_MARKETS[0], 5),
+            (f"  {BIDEN_MARKETS[0].upper()} ", 3),
+            (BIDEN_MARKETS[0], 3),
+            (TRUMP_MARKETS[0], 2),
+        ]
+    ]
+    # Highest volume per normalised title wins, the first one on ties, original order is kept.
+    assert PineconeHandler.deduplicate_markets(markets) == [markets[1], markets[2]]
+
+
+def test_upsert_embeddings_is_batched() -> None:
+    with patch.object(PineconeHandler, "build_pinecone"), patch.object(
+        PineconeHandler, "build_vectorstore"
+    ):
+        handler = PineconeHandler(embeddings=DeterministicFakeEmbedding(size=16))
+    handler.index = Mock()
+    handler.known_ids = None
+
+    texts = ["Will it rain?", "Will it snow?"]
+    handler.upsert_embeddings(
+        ids=["a", "b"],
+        texts=texts,
+        embeddings=handler.embed_texts(texts),
+        metadatas=[{"i": 0}, {"i": 1}],
+    )
+    kwargs = handler.index.upsert.call_args.kwargs
+    assert kwargs["batch_size"] == PineconeHandler.UPSERT_BATCH_SIZE
+    assert [v["metadata"] for v in kwargs["vectors"]] == [
+        {"i": 0, "text": texts[0]},
+        {"i": 1, "text": texts[1]},
+    ]
+
+    handler.upsert_embeddings(
+        ids=["a"], texts=texts[:1], embeddings=handler.embed_texts(texts[:1])
+    )
+    assert handler.index.upsert.call_args.kwargs["vectors"][0]["metadata"] == {
+        "text": texts[0]
+    }
+
+
+def test_bulk_insert_rate_limits_every_request() -> None:
+    with patch.object(PineconeHandler, "build_pinecone"), patch.object(
+        PineconeHandler, "build_vectorstore"
+    ):
+        handler = PineconeHandler(embeddings=DeterministicFakeEmbedding(size=16))
+    handler.index = Mock()
+    handler.known_ids = None
+
+    texts = [f"Will it rain on day {i}?" for i in range(100)]
+    with patch.object(RateLimiter, "wait") as wait:
+        handler.bulk_insert_texts(
+            ids=[handler.encode_text(text) for text in texts],
+            texts=texts,
+            metadatas=[{"i": i} for i in range(len(texts))],
+            requests_per_minute=60,
+        )
+
+    # One upsert request per `UPSERT_BATCH_SIZE` vectors, each of them waits, as does the embedding request.
+    upserted = [
+        len(call.kwargs["vectors"]) for call in handler.index.upsert.call_args_list
+    ]
+    assert upserted == [32, 32, 32, 4]
+    assert wait.call_count == 1 + len(upserted)
+
+
+def test_index_dimension_mismatch(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("PINECONE_API_KEY", "test")
+    pinecone = Mock()
+    pinecone.describe_index.return_value = Mock(dimension=3072, host="index-host")
+    with patch(
+        "prediction_market_agent.db.pinecone_handler.Pinecone", return_value=pinecone
+    ), patch.object(PineconeHandler, "build_vectorstore"):
+        with pytest.raises(ValueError, match="dimension 3072"):
+            PineconeHandler(
+                embeddings=DeterministicFakeEmbedding(size=16), dimensions=256
+            )
+        pinecone.describe_index.assert_called_once_with(f"{INDEX_NAME}-256")
+
+
+def test_pinecone_handler_batch_query() -> None:
+    embeddings = DeterministicFakeEmbedding(size=16)
+    with patch.object(PineconeHandler, "build_pinecone"), patch.object(
+        PineconeHandler, "build_vectorstore"
+    ):
+        handler = PineconeHandler(embeddings=embeddings)
+    vectors = dict(zip(TRUMP_MARKETS, embeddings.embed_documents(TRUMP_MARKETS)))
+    index = Mock()
+    # The exact match with cosine similarity 1, the other market below the threshold.
+    index.query.side_effect = lambda vector, **kwargs: {
+        "matches": [
+            {
+                "id": handler.encode_text(text),
+                "score": 1.0 if vectors[text] == vector else -0.9,
+                "metadata": {
+                    "text": text,
+                    **PineconeMetadata(
+                        question_title=text,
+                        market_address=HexAddress(HexStr("")),
+                        close_time_timestamp=MOCK_CLOSING_TIMESTAMP,
+                    ).model_dump(),
+                },
+            }
+            for text in TRUMP_MARKETS
+        ]
+    }
+    handler.vectorstore = PineconeVectorStore(index=index, embedding=embeddings)
+
+    results = handler.find_nearest_questions_batch(
+        texts=TRUMP_MARKETS[::-1], limit=2, threshold=0.5
+    )
+
+    assert [[q.question_title for q in questions] for questions in results] == [
+        [text] for text in TRUMP_MARKETS[::-1]
+    ]
+    assert index.query.call_count == len(TRUMP_MARKETS)
@@ -0,0 +1,58 @@
+from typing import Generator
+
+import pytest
+from prediction_market_agent_tooling.tools.utils import utcnow
+
+from prediction_market_agent.db.models import Prompt
+from prediction_market_agent.db.prompt_table_handler import PromptTableHandler
+from prediction_market_agent.db.query_stats import QueryStats
+
+
+@pytest.fixture(scope="function")
+def enabled_query_stats() -> Generator[None, None, None]:
+    QueryStats.reset()
+    QueryStats.enable(slow_query_threshold_seconds=60)
+    yield
+    QueryStats.disable()
+    QueryStats.reset()
+
+
+def test_query_stats_disabled(prompt_table_handler: PromptTableHandler) -> None:
+    QueryStats.reset()
+    prompt_table_handler.save_prompt("foo")
+    assert QueryStats.get_stats() == {}
+
+
+def test_query_stats_recorded(
+    prompt_table_handler: PromptTableHandler, enabled_query_stats: None
+) -> None:
+    session_identifier = prompt_table_handler.session_identifier
+    prompt_table_handler.sql_handler.save_multiple(
+        [
+            Prompt(prompt=p, datetime_=utcnow(), session_identifier=session_identifier)
+            for p in ["a", "b"]
+        ]
+    )
+    prompt_table_handler.fetch_latest_prompt()
+    prompt_table_handler.fetch_latest_prompt()
+
+    stats = QueryStats.get_stats()
+    save_stats = stats[("prompts", "save_multiple")]
+    assert save_stats.n_calls == 1
+    assert save_stats.n_rows == 2
+    get_stats = stats[("prompts", "get_with_filter_and_order")]
+    assert get_stats.n_calls == 2
+    assert get_stats.n_rows == 2
+    assert get_stats.total_seconds >= get_stats.max_seconds > 0
+
+
+def test_query_stats_recorded_on_error(
+    prompt_table_handler: PromptTableHandler, enabled_query_stats: None
+) -> None:
+    with pytest.raises(ValueError):
+        prompt_table_handler.sql_handler.delete_where([])
+
+    stats = QueryStats.get_stats()[("prompts", "delete_where")]
+    assert stats.n_calls == 1
+    assert stats.n_errors == 1
+    assert stats.n_rows == 0
@@ -0,0 +1,26 @@
+from prediction_market_agent.db.models import ReplicatedMarket
+from prediction_market_agent.db.replicated_markets_table_handler import (
+    ReplicatedMarketsTableHandler,
+)
+
+
+def test_save_replicated_markets_skips_already_replicated(
+    replicated_markets_table_handler: ReplicatedMarketsTableHandler,
+) -> None:
+    table_handler = replicated_markets_table_handler
+
+    def build(copied_market_id: str) -> ReplicatedMarket:
+        return ReplicatedMarket(
+            original_market_type="polymarket",
+            original_market_id="original",
+            copied_market_id=copied_market_id,
+            original_market_title="Will it rain tomorrow?",
+            copied_market_title="Will it rain tomorrow?",
+        )
+
+    table_handler.save_replicated_markets([build("first")])
+    # Saving the same original market again must not fail on the unique title.
+    table_handler.save_replicated_markets([build("second")])
+
+    markets = table_handler.get_all()
+    assert [m.copied_market_id for m in markets] == ["first"]
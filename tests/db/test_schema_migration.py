@@ -0,0 +1,73 @@
+from sqlalchemy import create_engine, inspect, text
+
+from prediction_market_agent.db.models import LongTermMemories, Prompt
+from prediction_market_agent.db.schema_migration import (
+    add_missing_columns,
+    create_missing_indexes,
+    migrate_schema,
+)
+
+
+def test_indexes_are_added_to_existing_table() -> None:
+    engine = create_engine("sqlite://")
+    # Simulate a table created before the index was declared on the model.
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE prompts (id INTEGER PRIMARY KEY, prompt VARCHAR, session_identifier VARCHAR, datetime_ DATETIME)"
+            )
+        )
+
+    # Second run is a no-op.
+    for _ in range(2):
+        create_missing_indexes(engine, [Prompt])
+
+    index_names = {i["name"] for i in inspect(engine).get_indexes("prompts")}
+    assert "ix_prompts_session_identifier_datetime_" in index_names
+
+
+def test_missing_tables_are_skipped() -> None:
+    engine = create_engine("sqlite://")
+    create_missing_indexes(engine, [Prompt])
+    assert not inspect(engine).has_table("prompts")
+
+
+def test_nullable_columns_are_added_to_existing_table() -> None:
+    engine = create_engine("sqlite://")
+    # Simulate a table created before `metadata_json` was added to the model.
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE long_term_memories (id INTEGER PRIMARY KEY, task_description VARCHAR NOT NULL, metadata_ VARCHAR, datetime_ DATETIME NOT NULL)"
+            )
+        )
+
+    for _ in range(2):
+        add_missing_columns(engine, [LongTermMemories])
+
+    column_names = {
+        c["name"] for c in inspect(engine).get_columns("long_term_memories")
+    }
+    assert "metadata_json" in column_names
+
+
+def test_migrate_schema() -> None:
+    engine = create_engine("sqlite://")
+    # Table of the version before `metadata_json` and the index were added to the model.
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE long_term_memories (id INTEGER PRIMARY KEY, task_description VARCHAR NOT NULL, metadata_ VARCHAR, datetime_ DATETIME NOT NULL)"
+            )
+        )
+
+    for _ in range(2):
+        migrate_schema(engine, [LongTermMemories, Prompt])
+
+    inspector = inspect(engine)
+    assert "metadata_json" in {
+        c["name"] for c in inspector.get_columns("long_term_memories")
+    }
+    assert "ix_long_term_memories_task_description_datetime_" in {
+        i["name"] for i in inspector.get_indexes("long_term_memories")
+    }
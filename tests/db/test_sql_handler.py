@@ -83,3 +83,94 @@ def test_get_with_filter(
     )
     assert len(results) == 1
     assert results[0].session_identifier == session_identifier
+
+
+def test_get_columns_with_filter_and_order(
+    prompt_table_handler: PromptTableHandler, example_prompts: list[Prompt]
+) -> None:
+    prompt_table_handler.sql_handler.save_multiple(example_prompts)
+    column_to_order: str = Prompt.datetime_.key  # type: ignore[attr-defined]
+    rows = prompt_table_handler.sql_handler.get_columns_with_filter_and_order(
+        column_names=["prompt", "session_identifier"],
+        order_by_column_name=column_to_order,
+        order_desc=True,
+    )
+    assert [tuple(row) for row in rows] == [("prompt2", "b"), ("prompt1", "a")]
+    assert rows[0].prompt == "prompt2"
+
+    rows = prompt_table_handler.sql_handler.get_columns_with_filter_and_order(
+        column_names=["prompt"],
+        query_filters=[col(Prompt.session_identifier) == "a"],
+    )
+    assert [row.prompt for row in rows] == ["prompt1"]
+
+
+def test_delete_where(
+    prompt_table_handler: PromptTableHandler, example_prompts: list[Prompt]
+) -> None:
+    prompt_table_handler.sql_handler.save_multiple(example_prompts)
+    n_deleted = prompt_table_handler.sql_handler.delete_where(
+        [col(Prompt.session_identifier) == "a"]
+    )
+    assert n_deleted == 1
+    prompts: t.Sequence[Prompt] = prompt_table_handler.sql_handler.get_all()
+    assert [p.prompt for p in prompts] == ["prompt2"]
+
+    prompt_table_handler.sql_handler.remove_multiple(
+        [
+            *prompt_table_handler.sql_handler.get_all(),
+            # Never saved, so it has no id.
+            Prompt(prompt="unsaved", datetime_=utcnow(), session_identifier="c"),
+        ]
+    )
+    assert len(prompt_table_handler.sql_handler.get_all()) == 0
+
+
+def test_upsert_many(prompt_table_handler: PromptTableHandler) -> None:
+    sql_handler = prompt_table_handler.sql_handler
+    sql_handler.upsert_many(
+        [
+            Prompt(id=1, prompt="old", datetime_=utcnow(), session_identifier="a"),
+            Prompt(id=2, prompt="old", datetime_=utcnow(), session_identifier="b"),
+        ],
+        conflict_column_names=["id"],
+    )
+    sql_handler.upsert_many(
+        [
+            Prompt(id=2, prompt="new", datetime_=utcnow(), session_identifier="b"),
+            Prompt(id=3, prompt="new", datetime_=utcnow(), session_identifier="c"),
+        ],
+        conflict_column_names=["id"],
+    )
+    prompts: t.Sequence[Prompt] = sql_handler.get_all()
+    assert sorted((p.id, p.prompt) for p in prompts) == [
+        (1, "old"),
+        (2, "new"),
+        (3, "new"),
+    ]
+
+    sql_handler.upsert_many(
+        [Prompt(id=1, prompt="ignored", datetime_=utcnow(), session_identifier="a")],
+        conflict_column_names=["id"],
+        on_conflict="ignore",
+    )
+    prompts = sql_handler.get_all()
+    assert {p.id: p.prompt for p in prompts}[1] == "old"
+
+
+def test_upsert_many_with_and_without_ids(
+    prompt_table_handler: PromptTableHandler,
+) -> None:
+    sql_handler = prompt_table_handler.sql_handler
+    sql_handler.upsert_many(
+        [
+            Prompt(
+                id=10, prompt="explicit", datetime_=utcnow(), session_identifier="a"
+            ),
+            Prompt(prompt="generated", datetime_=utcnow(), session_identifier="b"),
+        ],
+        conflict_column_names=["id"],
+    )
+    prompts: t.Sequence[Prompt] = sql_handler.get_all()
+    assert {p.prompt: p.id for p in prompts}["explicit"] == 10
+    assert {p.prompt for p in prompts} == {"explicit", "generated"}
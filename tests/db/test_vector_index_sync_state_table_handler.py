@@ -0,0 +1,30 @@
+from prediction_market_agent.db.models import VectorIndexSyncState
+from prediction_market_agent.db.vector_index_sync_state_table_handler import (
+    VectorIndexSyncStateTableHandler,
+)
+
+
+def test_vector_index_sync_state(
+    vector_index_sync_state_table_handler: VectorIndexSyncStateTableHandler,
+) -> None:
+    handler = vector_index_sync_state_table_handler
+    assert handler.get("index") is None
+
+    handler.save(
+        VectorIndexSyncState(
+            index_name="index",
+            last_market_created_timestamp=1,
+            last_full_sync_timestamp=1,
+        )
+    )
+    handler.save(
+        VectorIndexSyncState(
+            index_name="index",
+            last_market_created_timestamp=2,
+            last_full_sync_timestamp=1,
+        )
+    )
+    state = handler.get("index")
+    assert state is not None
+    assert state.last_market_created_timestamp == 2
+    assert handler.get("other-index") is None
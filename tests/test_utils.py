@@ -1,13 +1,20 @@
+from unittest.mock import Mock
+
 import pytest
 from crewai import Task
 from prediction_market_agent_tooling.gtypes import USD
 
+from prediction_market_agent import utils
 from prediction_market_agent.agents.utils import get_maximum_possible_bet_amount
 from prediction_market_agent.tools.message_utils import (
     compress_message,
     decompress_message,
 )
-from prediction_market_agent.utils import disable_crewai_telemetry
+from prediction_market_agent.utils import (
+    APIKeys,
+    disable_crewai_telemetry,
+    get_cached_api_keys,
+)
 
 
 def test_disable_crewai_telemetry() -> None:
@@ -39,3 +46,14 @@ def test_message_compression() -> None:
     message = "Hello!"
     encoded = compress_message(message)
     assert message == decompress_message(encoded)
+
+
+def test_get_cached_api_keys(monkeypatch: pytest.MonkeyPatch) -> None:
+    get_cached_api_keys.cache_clear()
+    read_keys = Mock(wraps=APIKeys)
+    monkeypatch.setattr(utils, "APIKeys", read_keys)
+    try:
+        assert get_cached_api_keys() is get_cached_api_keys()
+    finally:
+        get_cached_api_keys.cache_clear()
+    assert read_keys.call_count == 1
@@ -0,0 +1,23 @@
+import time
+from datetime import timedelta
+
+from prediction_market_agent.tools.ttl_cache import TTLCache
+
+
+def test_ttl_cache_expires() -> None:
+    cache: TTLCache[str, int] = TTLCache(ttl=timedelta(seconds=0.05))
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    cache: TTLCache[str, int] = TTLCache(ttl=timedelta(hours=1), max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3